@@ -0,0 +1,112 @@
+"""Режим доски (bot/board.py) против ответа на каждую команду: сообщения в группе на партию.
+
+Одни и те же партии (одинаковые решения игроков) играются командами /play и
+/accuse и кнопками доски. Считаются новые сообщения в группе, все вызовы
+Bot API в группу (с правками и закреплением) и время обработки апдейта хода.
+BOARD_DEBOUNCE=0 — худший случай для доски: каждая правка уходит сразу; с --debounce
+и --think (пауза между ходами) видно, сколько правок сливается.
+
+    python -m benchmarks.bench_board [--games 30] [--debounce 0] [--think 0]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import time
+
+os.environ.setdefault("BOT_TOKEN", "123:BENCH")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("OUTBOX", "0")
+
+from telegram import Update  # noqa: E402
+
+from bot import board  # noqa: E402
+from bot import main as bot_main  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram, callback_update, command_update  # noqa: E402
+
+GROUP = -1001
+PLAYERS = (11, 12, 13, 14)
+
+
+async def play_games(board_mode: bool, games: int, debounce: float, think: float) -> dict:
+    bot_main.BOARD_MODE = board_mode
+    bot_main.BOARD.debounce = debounce
+    stub = StubTelegram()
+    bot_main.SEEN.clear()  # message_id снова с 1 — иначе команды отсекутся как повторы
+    app = bot_main.build_app(request=StubRequest(stub))
+    ids = itertools.count(1)
+    rnd = random.Random(7)
+    move_time = 0.0
+    moves = 0
+
+    async def send(uid, chat_id, text):
+        await app.process_update(Update.de_json(command_update(next(ids), uid, chat_id, text), app.bot))
+
+    async def press(uid, data):
+        mid = bot_main.BOARD_MSG[GROUP][0]
+        await app.process_update(Update.de_json(callback_update(next(ids), uid, GROUP, mid, data), app.bot))
+
+    await app.initialize()
+    try:
+        for _ in range(games):
+            await send(PLAYERS[0], GROUP, "/newgame")
+            await bot_main.BOARD.flush()  # доска должна появиться, чтобы было что нажимать
+            for uid in PLAYERS:
+                await (press(uid, "j") if board_mode else send(uid, GROUP, "/join"))
+            await (press(PLAYERS[0], "s") if board_mode else send(PLAYERS[0], GROUP, "/startgame"))
+            gs = bot_main.GAMES[GROUP]
+            while gs.started:
+                uid = gs.current_player().user_id
+                hand = gs.hands.get(uid)
+                t0 = time.perf_counter()
+                if gs.last_play is not None and (not hand or rnd.random() < 0.3):
+                    await (press(uid, "a") if board_mode else send(uid, GROUP, "/accuse"))
+                elif hand:
+                    i, rank = rnd.randrange(len(hand)), rnd.choice("KQJ")
+                    if board_mode:
+                        await press(uid, f"p{i}{rank}")
+                    else:
+                        await send(uid, GROUP, f"/play {i} {rank}")
+                else:
+                    await send(PLAYERS[0], GROUP, "/stop")
+                move_time += time.perf_counter() - t0
+                moves += 1
+                if board_mode and not debounce:
+                    await bot_main.BOARD.flush()
+                elif think:
+                    await asyncio.sleep(think)  # игроки думают; доска правится раз в debounce
+            await bot_main.BOARD.flush()
+    finally:
+        await app.shutdown()
+    group = [c.method for c in stub.calls if int(c.params.get("chat_id", 0) or 0) == GROUP]
+    return {
+        "new": group.count("sendMessage") / games,
+        "group_api": len(group) / games,
+        "all_api": sum(1 for c in stub.calls if c.method != "getMe") / games,
+        "move_us": move_time / moves * 1e6,
+    }
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--games", type=int, default=30)
+    ap.add_argument("--debounce", type=float, default=0.0)
+    ap.add_argument("--think", type=float, default=0.0, help="пауза между ходами, секунды")
+    args = ap.parse_args()
+    res = {}
+    for mode in (False, True):
+        bot_main.GAMES.clear()
+        bot_main.BOARD_MSG.clear()
+        res[mode] = await play_games(mode, args.games, args.debounce, args.think)
+    print(f"{args.games} партий по {len(PLAYERS)} игрока, на партию:")
+    print(f"{'':24} {'команды':>9} {'доска':>9}")
+    for key, title in [("new", "новых сообщений в группе"), ("group_api", "вызовов API в группу"),
+                       ("all_api", "вызовов API всего"), ("move_us", "мкс на апдейт хода")]:
+        print(f"{title:24} {res[False][key]:>9.1f} {res[True][key]:>9.1f}")
+    print(f"публикации доски: {dict(bot_main.BOARD.stats)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""Горячие пути ядра игры: start, play, accuse, редил, status, hand_str на 2–5 игроках.
+
+status/hand_str — повторный вызов без изменений партии (из кеша по version),
+*.render — первый вызов после изменения (полная отрисовка).
+
+    python -m benchmarks.bench_core [--save] [--engine compact]
+"""
+from __future__ import annotations
+
+from benchmarks import harness
+from liers.compact import CompactGameState
+from liers.game import GameState
+
+ENGINES = {"classic": GameState, "compact": CompactGameState}
+
+
+def new_game(cls, n: int, start: bool = True):
+    gs = cls(chat_id=1)
+    for i in range(n):
+        gs.add_player(100 + i, f"user{i}")
+    if start:
+        gs.start()
+    return gs
+
+
+class Table:
+    """Партия, которая сама начинается заново, когда ход сделать нельзя."""
+
+    def __init__(self, cls, n: int) -> None:
+        self.cls, self.n = cls, n
+        self.gs = new_game(cls, n)
+
+    def ensure(self, need_last_play: bool) -> None:
+        gs = self.gs
+        while True:
+            if gs.started and gs.hands.get(gs.current_player().user_id):
+                if not need_last_play or gs.last_play is not None:
+                    return
+                uid = gs.current_player().user_id
+                gs.play(uid, 0, gs.current_topic)
+                continue
+            gs = self.gs = new_game(self.cls, self.n)
+
+    def lobby(self) -> None:
+        self.gs = new_game(self.cls, self.n, start=False)
+
+    def start(self) -> None:
+        self.gs.start()
+
+    def play(self) -> None:
+        gs = self.gs
+        gs.play(gs.current_player().user_id, 0, gs.current_topic)
+
+    def accuse(self) -> None:
+        gs = self.gs
+        gs.accuse(gs.current_player().user_id)
+
+
+def touch(gs) -> None:
+    gs.version += 1  # как после хода: кеш отрисовки устарел
+
+
+def run(args) -> harness.Results:
+    cls = ENGINES[args.engine]
+    res: harness.Results = {}
+    for n in range(2, 6):
+        t = Table(cls, n)
+        res[f"start.p{n}.us"] = harness.best_of(lambda: harness.per_call(t.start, setup=t.lobby))
+        res[f"play.p{n}.us"] = harness.best_of(lambda: harness.per_call(t.play, setup=lambda: t.ensure(False)))
+        res[f"accuse.p{n}.us"] = harness.best_of(lambda: harness.per_call(t.accuse, setup=lambda: t.ensure(True)))
+        gs = new_game(cls, n)
+        res[f"redeal.p{n}.us"] = harness.best_of(lambda: harness.per_call(gs._redeal_alive_to_five))
+        t.ensure(True)
+        mid = t.gs
+        uid = mid.players[0].user_id
+        res[f"status.p{n}.us"] = harness.best_of(lambda: harness.per_call(mid.status, n=5000))
+        res[f"hand_str.p{n}.us"] = harness.best_of(lambda: harness.per_call(lambda: mid.hand_str(uid), n=5000))
+        res[f"status.render.p{n}.us"] = harness.best_of(lambda: harness.per_call(mid.status, setup=lambda: touch(mid)))
+        res[f"hand_str.render.p{n}.us"] = harness.best_of(
+            lambda: harness.per_call(lambda: mid.hand_str(uid), setup=lambda: touch(mid))
+        )
+    return res
+
+
+def configure(ap) -> None:
+    ap.add_argument("--engine", choices=sorted(ENGINES), default="classic")
+
+
+if __name__ == "__main__":
+    harness.main("core", run, configure)
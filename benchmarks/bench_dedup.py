@@ -0,0 +1,117 @@
+"""Отсечение повторов (bot/dedup.py): цена проверки апдейта и память окон.
+
+Поток — --updates апдейтов по --chats чатам, update_id по порядку с небольшим
+перемешиванием (как при параллельной доставке вебхуков), каждый --dup-every-й
+доставлен ещё раз. Сравнение — «наивный» кеш: set последних WINDOW update_id
+с deque для вытеснения и set последних CHAT_WINDOW message_id на чат.
+Память — прирост по tracemalloc после всего потока, КБ.
+
+    python -m benchmarks.bench_dedup [--save] [--updates 200000] [--chats 10000]
+"""
+from __future__ import annotations
+import random
+import time
+import tracemalloc
+from collections import deque
+from types import SimpleNamespace
+
+from benchmarks import harness
+from bot.dedup import CHAT_WINDOW, WINDOW, Deduplicator, ReplayWindow
+
+
+class NaiveDedup:
+    def __init__(self) -> None:
+        self.ids, self.order = set(), deque()
+        self.chats = {}
+
+    def duplicate(self, u) -> bool:
+        if u.update_id in self.ids:
+            return True
+        self.ids.add(u.update_id)
+        self.order.append(u.update_id)
+        if len(self.order) > WINDOW:
+            self.ids.discard(self.order.popleft())
+        seen = self.chats.get(u.message.chat_id)
+        if seen is None:
+            seen = self.chats[u.message.chat_id] = (set(), deque())
+        if u.message.message_id in seen[0]:
+            return True
+        seen[0].add(u.message.message_id)
+        seen[1].append(u.message.message_id)
+        if len(seen[1]) > CHAT_WINDOW:
+            seen[0].discard(seen[1].popleft())
+        return False
+
+
+def stream(updates: int, chats: int, dup_every: int, seed: int = 1):
+    """Апдейты с атрибутами, которые читает Deduplicator (как у telegram.Update)."""
+    rnd = random.Random(seed)
+    next_mid = [0] * chats
+    out = []
+    for uid in range(1, updates + 1):
+        chat = rnd.randrange(chats)
+        next_mid[chat] += 1
+        msg = SimpleNamespace(chat_id=-chat - 1, message_id=next_mid[chat])
+        out.append(SimpleNamespace(update_id=uid, message=msg, edited_message=None))
+    for i in range(0, len(out) - 8, 8):  # перемешать соседей: доставка не строго по порядку
+        block = out[i:i + 8]
+        rnd.shuffle(block)
+        out[i:i + 8] = block
+    return [u for i, u in enumerate(out) for _ in range(2 if i % dup_every == 0 else 1)]
+
+
+def measure(make, updates) -> tuple:
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    d = make()
+    t0 = time.perf_counter()
+    dups = sum(1 for u in updates if d.duplicate(u))
+    spent = time.perf_counter() - t0
+    mem = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return spent / len(updates) * 1e6, mem / 1024, dups
+
+
+def run(args) -> harness.Results:
+    updates = stream(args.updates, args.chats, args.dup_every)
+    res: harness.Results = {}
+    expected = None
+    for name, make in (("window", lambda: Deduplicator({})), ("naive", NaiveDedup)):
+        res[f"{name}.check.us"] = timed(make, updates)  # без tracemalloc, память — отдельным прогоном
+        _, res[f"{name}.memory.kb"], dups = measure(make, updates)
+        if expected is None:
+            expected = dups
+        assert dups == expected, (name, dups, expected)
+    w = ReplayWindow()
+    res["window.add.us"] = harness.best_of(lambda: add_many(w), repeat=5)
+    print(f"{len(updates)} доставок, {args.chats} чатов, повторов: {expected}")
+    return res
+
+
+def timed(make, updates) -> float:
+    best = float("inf")
+    for _ in range(3):
+        d = make()
+        t0 = time.perf_counter()
+        for u in updates:
+            d.duplicate(u)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(updates) * 1e6
+
+
+def add_many(w: ReplayWindow, n: int = 100000) -> float:
+    start = w.top + 1
+    t0 = time.perf_counter()
+    for i in range(start, start + n):
+        w.add(i)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def configure(ap) -> None:
+    ap.add_argument("--updates", type=int, default=200000)
+    ap.add_argument("--chats", type=int, default=10000)
+    ap.add_argument("--dup-every", type=int, default=10, help="каждый N-й апдейт доставлен дважды")
+
+
+if __name__ == "__main__":
+    harness.main("dedup", run, configure)
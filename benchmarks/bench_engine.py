@@ -0,0 +1,58 @@
+"""GameState (списки Card) против CompactGameState (bytearray): память на игру и скорость редила.
+
+    python -m benchmarks.bench_engine [--games 2000] [--redeals 20000]
+"""
+from __future__ import annotations
+import argparse
+import time
+import tracemalloc
+
+from liers.compact import CompactGameState
+from liers.game import GameState
+from liers.models import Rank
+
+ENGINES = (GameState, CompactGameState)
+
+
+def make_game(cls, chat_id: int, n: int):
+    gs = cls(chat_id=chat_id)
+    for i in range(n):
+        gs.add_player(chat_id * 10 + i, f"user{i}")
+    gs.start()
+    return gs
+
+
+def bench_memory(cls, games: int, n: int) -> float:
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    keep = [make_game(cls, cid, n) for cid in range(games)]
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del keep
+    return used / games
+
+
+def bench_redeal(cls, redeals: int, n: int) -> float:
+    gs = make_game(cls, 1, n)
+    t0 = time.perf_counter()
+    for _ in range(redeals):
+        gs._redeal_alive_to_five(last_play_rank=Rank.K)
+        gs.deck.pop()  # держим размер колоды постоянным
+    return redeals / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--games", type=int, default=2000)
+    ap.add_argument("--redeals", type=int, default=20000)
+    args = ap.parse_args()
+    print(f"{'движок':<18} {'игроков':>7} {'байт/игра':>10} {'редилов/с':>11}")
+    for n in (2, 5):
+        for cls in ENGINES:
+            mem = bench_memory(cls, args.games, n)
+            rate = bench_redeal(cls, args.redeals, n)
+            print(f"{cls.__name__:<18} {n:>7} {mem:>10.0f} {rate:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
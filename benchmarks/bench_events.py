@@ -0,0 +1,94 @@
+"""Журнал ходов (liers/events.py): скорость записи, размер и воспроизведение.
+
+Сравнивается восстановление партий при перезапуске двумя способами:
+replay по журналу (decode + повтор ходов) и from_dict по снимку JSON,
+как это делает sqlite-хранилище.
+
+    python -m benchmarks.bench_events [--games 2000] [--engine compact]
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from liers.compact import CompactGameState
+from liers.events import EventLog, replay
+from liers.game import GameState
+from liers.models import Rank
+from liers.rng import SeededRandomness
+
+TOPICS = [Rank.K, Rank.Q, Rank.J]
+
+
+def play(gs: GameState, moves: random.Random, max_moves: int) -> None:
+    for i in range(4):
+        gs.add_player(gs.chat_id * 10 + i, f"user{i}")
+    gs.start()
+    for _ in range(max_moves):
+        if not gs.started:
+            break
+        uid = gs.current_player().user_id
+        hand = gs.hands.get(uid)
+        if gs.last_play is not None and (not hand or moves.random() < 0.3):
+            gs.accuse(uid)
+        elif hand:
+            gs.play(uid, moves.randrange(len(hand)), moves.choice(TOPICS))
+        else:
+            gs.stop()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--games", type=int, default=2000)
+    ap.add_argument("--moves", type=int, default=60, help="ходов на партию (середина игры)")
+    ap.add_argument("--engine", choices=["classic", "compact"], default="compact")
+    args = ap.parse_args()
+    cls = CompactGameState if args.engine == "compact" else GameState
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EventLog(tmp)
+        moves = random.Random(1)
+        snapshots = {}
+        t0 = time.perf_counter()
+        for cid in range(1, args.games + 1):
+            gs = cls(chat_id=cid)
+            log.journal(cid, SeededRandomness(cid)).attach(gs).journal.record("new")
+            play(gs, moves, args.moves)
+            snapshots[cid] = json.dumps(gs.to_dict())
+        t_play = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        log.flush()
+        t_flush = time.perf_counter() - t0
+
+        sizes = [os.path.getsize(log.path(cid)) for cid in snapshots]
+        t0 = time.perf_counter()
+        logs = {cid: log.read(cid) for cid in snapshots}
+        t_read = time.perf_counter() - t0
+        events = sum(len(evs) for evs in logs.values())
+
+        t0 = time.perf_counter()
+        for cid, evs in logs.items():
+            replay(cid, evs, cls=cls)
+        t_replay = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for s in snapshots.values():
+            cls.from_dict(json.loads(s))
+        t_snap = time.perf_counter() - t0
+
+    n = args.games
+    print(f"{n} партий ({args.engine}), {events} событий, {events / n:.0f} на партию")
+    print(f"  игра с журналом:      {t_play / events * 1e6:.1f} мкс/событие")
+    print(f"  flush на диск:        {t_flush * 1000:.1f} мс ({n} файлов)")
+    print(f"  размер журнала:       {sum(sizes) / n:.0f} Б/партию, {sum(sizes) / events:.1f} Б/событие"
+          f" (снимок JSON: {sum(map(len, snapshots.values())) / n:.0f} Б)")
+    print(f"  чтение + decode:      {events / t_read / 1e3:.0f} тыс. событий/с")
+    print(f"  replay:               {events / t_replay / 1e3:.0f} тыс. событий/с, {n / t_replay:.0f} партий/с")
+    print(f"  восстановление всего: журнал {(t_read + t_replay) * 1000:.0f} мс,"
+          f" снимки from_dict {t_snap * 1000:.0f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Память при долгой работе: 100k чатов приходят, играют, бросают игры (bot/storage.py, Eviction).
+
+    python -m benchmarks.bench_eviction [--chats 100000] [--hours 48] [--ttl 3600] [--max-entries 10000]
+
+Время виртуальное: чаты появляются равномерно за --hours, команды в каждом чате
+идут в среднем раз в 2 минуты в течение его «жизни» (2 мин — 1 ч), после чего
+половина игр останавливается через /stop, а половина просто бросается.
+Состояние сохраняется раз в виртуальную минуту, там же запускается выгрузка.
+Каждый режим — в отдельном процессе, память — пиковый RSS этого процесса.
+"""
+from __future__ import annotations
+import argparse
+import heapq
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from bot.storage import Eviction, MemoryBackend, SQLiteBackend, StateStore
+from liers.game import GameState
+
+TICK = 60.0
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_game(chat_id: int, n: int) -> GameState:
+    gs = GameState(chat_id=chat_id)
+    for i in range(n):
+        gs.add_player(chat_id * 10 + i, f"user{i}")
+    gs.start()
+    return gs
+
+
+def peak_rss_mb() -> float:
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 2**20 if sys.platform == "darwin" else kb / 2**10  # на macOS — в байтах
+
+
+def churn(backend, policy: Optional[Eviction], chats: int, hours: float, seed: int = 1) -> dict:
+    clock = Clock()
+    store = StateStore(backend)
+    games = store.map(
+        "game", dump=GameState.to_dict, load=GameState.from_dict, is_active=lambda g: g.started, clock=clock
+    )
+    hand_msg = store.map("hand_msg", mutable=False, clock=clock)
+    rnd = random.Random(seed)
+    span = hours * 3600
+    # (время, chat_id, конец жизни чата); первое событие — создание игры
+    events = [(cid * span / chats, cid, cid * span / chats + rnd.uniform(120, 3600)) for cid in range(chats)]
+    heapq.heapify(events)
+    next_tick = TICK
+    commands = 0
+    t0 = time.perf_counter()
+    while events:
+        at, cid, end = heapq.heappop(events)
+        while at >= next_tick:
+            clock.now = next_tick
+            if policy is None:
+                store.flush()
+            else:
+                store.evict(policy)
+            next_tick += TICK
+        clock.now = at
+        commands += 1
+        if cid not in games:
+            games[cid] = make_game(cid, rnd.randint(2, 5))
+        else:
+            gs = games[cid]
+            if at >= end:
+                if rnd.random() < 0.5:
+                    gs.stop()
+                continue  # остановлена или брошена — больше команд нет
+            if gs.started:
+                uid = gs.current_player().user_id
+                if gs.last_play and (not gs.hands[uid] or rnd.random() < 0.3):
+                    gs.accuse(uid)
+                elif gs.hands[uid]:
+                    gs.play(uid, 0, gs.current_topic)
+                    hand_msg[uid] = commands
+            if not gs.started:
+                games[cid] = make_game(cid, rnd.randint(2, 5))  # новая партия в том же чате
+        heapq.heappush(events, (at + rnd.expovariate(1 / 120), cid, end))
+    store.flush()
+    elapsed = time.perf_counter() - t0
+    result = {
+        "commands": commands,
+        "elapsed": elapsed,
+        "rss_mb": peak_rss_mb(),
+        "loaded": games.loaded + hand_msg.loaded,
+        "keys": len(games) + len(hand_msg),
+        "spilled": games.evicted["spilled"] + hand_msg.evicted["spilled"],
+        "dropped": games.evicted["dropped"] + hand_msg.evicted["dropped"],
+    }
+    store.close()
+    return result
+
+
+def run_mode(mode: str, db: str, policy: Optional[Eviction], chats: int, hours: float) -> dict:
+    backend = SQLiteBackend(db) if mode == "sqlite" else MemoryBackend()
+    return churn(backend, policy, chats, hours)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--chats", type=int, default=100000)
+    ap.add_argument("--hours", type=float, default=48)
+    ap.add_argument("--ttl", type=float, default=3600)
+    ap.add_argument("--max-entries", type=int, default=10000)
+    args = ap.parse_args()
+    print(f"{args.chats} чатов за {args.hours:g} ч, ttl {args.ttl:g} с, max_entries {args.max_entries}")
+    print(f"{'режим':<22}{'RSS МБ':>8}{'в памяти':>10}{'ключей':>9}"
+          f"{'сохранено':>11}{'удалено':>9}{'команд':>9}{'мкс/команду':>13}")
+    modes = [
+        ("без выгрузки", "memory", None),
+        ("ttl+lru, memory", "memory", Eviction(args.ttl, args.max_entries, spill=False)),
+        ("ttl+lru+spill, sqlite", "sqlite", Eviction(args.ttl, args.max_entries, spill=True)),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, mode, policy in modes:
+            with ProcessPoolExecutor(max_workers=1) as pool:  # свежий процесс — честный пиковый RSS
+                r = pool.submit(run_mode, mode, os.path.join(tmp, "state.db"), policy, args.chats, args.hours).result()
+            print(f"{name:<22}{r['rss_mb']:8.0f}{r['loaded']:10}{r['keys']:9}{r['spilled']:11}{r['dropped']:9}"
+                  f"{r['commands']:9}{r['elapsed'] / r['commands'] * 1e6:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
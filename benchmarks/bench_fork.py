@@ -0,0 +1,68 @@
+"""Пробные ходы (GameState.fork/restore) против copy.deepcopy партии.
+
+Партия в середине игры (у текущего игрока есть карты и последний ход, который
+можно оспорить). Меряется точка отката, откат и полный «пробный» ход:
+gs.trial() с play или accuse, против deepcopy → тот же ход на копии.
+Генератор партии — SYSTEM_RNG-подобный Randomness (буфер в 1024 слова).
+
+    python -m benchmarks.bench_fork [--save] [--n 3000]
+"""
+from __future__ import annotations
+import copy
+
+from benchmarks import harness
+from liers.compact import CompactGameState
+from liers.game import GameState
+from liers.lobby import LargeLobbyGameState, decks_for
+from liers.rng import Randomness
+
+ENGINES = (("classic", GameState, 5), ("compact", CompactGameState, 5), ("large", LargeLobbyGameState, 20))
+
+
+def mid_game(cls, players: int):
+    extra = {"decks": decks_for(players)} if cls is LargeLobbyGameState else {}
+    while True:
+        gs = cls(chat_id=1, rng=Randomness(), **extra)
+        for i in range(players):
+            gs.add_player(100 + i, f"user{i}")
+        gs.start()
+        gs.play(gs.current_player().user_id, 0, gs.current_topic)
+        if gs.started and gs.hands.get(gs.current_player().user_id):
+            return gs
+
+
+def run(args) -> harness.Results:
+    res: harness.Results = {}
+    for name, cls, players in ENGINES:
+        gs = mid_game(cls, players)
+        f = gs.fork()
+
+        def play(g):
+            g.play(g.current_player().user_id, 0, g.current_topic)
+
+        def accuse(g):
+            g.accuse(g.current_player().user_id)
+
+        def trial(move):
+            with gs.trial():  # случайность — из одноразового генератора
+                move(gs)
+
+        res[f"{name}.fork.us"] = harness.best_of(lambda: harness.per_call(gs.fork, n=args.n))
+        res[f"{name}.restore.us"] = harness.best_of(lambda: harness.per_call(lambda: gs.restore(f), n=args.n))
+        res[f"{name}.deepcopy.us"] = harness.best_of(lambda: harness.per_call(lambda: copy.deepcopy(gs), n=args.n // 10))
+        for move in (play, accuse):
+            res[f"{name}.trial_{move.__name__}.us"] = harness.best_of(
+                lambda: harness.per_call(lambda: trial(move), n=args.n)
+            )
+            res[f"{name}.deepcopy_{move.__name__}.us"] = harness.best_of(
+                lambda: harness.per_call(lambda: move(copy.deepcopy(gs)), n=args.n // 10)
+            )
+    return res
+
+
+def configure(ap) -> None:
+    ap.add_argument("--n", type=int, default=3000, help="вызовов на замер")
+
+
+if __name__ == "__main__":
+    harness.main("fork", run, configure)
@@ -0,0 +1,68 @@
+"""Вызовы Bot API на целую партию: HAND_DM_MODE=resend (delete+send) против edit.
+
+Партии играются через обработчики bot/main.py на заглушке Bot API; игроки
+ходят первой картой и обвиняют с вероятностью --accuse (шторм /accuse — 1.0);
+застрявшая партия (ходить нечем, обвинять некого) останавливается через /stop.
+
+    python -m benchmarks.bench_hand_dm [--games 50] [--players 4] [--accuse 0.5]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import random
+from collections import Counter
+
+from benchmarks.bench_handlers import GROUP, Driver
+from bot import main as bot_main
+
+MODES = ("resend", "edit")
+
+
+async def play_games(mode: str, games: int, players: int, accuse: float, seed: int = 1) -> Counter:
+    bot_main.HAND_DM_MODE = mode
+    bot_main.HAND_DM_STATS.clear()
+    bot_main.LAST_HAND_MSG.clear()  # message_id из прошлого режима заглушке неизвестны
+    rnd = random.Random(seed)
+    uids = tuple(range(11, 11 + players))
+    d = Driver(latency=0.0)
+    await d.app.initialize()
+    try:
+        for _ in range(games):
+            await d.lobby(uids)
+            await d.send(uids[0], GROUP, "/startgame")
+            while (gs := bot_main.GAMES.get(GROUP)) and gs.started:
+                uid = gs.current_player().user_id
+                if gs.last_play and (not gs.hands[uid] or rnd.random() < accuse):
+                    await d.send(uid, GROUP, "/accuse")
+                elif not gs.hands[uid]:
+                    await d.send(uid, GROUP, "/stop")  # застряла: ходить нечем, обвинять некого
+                else:
+                    await d.send(uid, GROUP, f"/play 0 {gs.current_topic.value}")
+    finally:
+        await d.app.shutdown()
+    calls = Counter(c.method for c in d.stub.calls if c.method != "getMe")
+    calls.update({f"исход:{k}": v for k, v in bot_main.HAND_DM_STATS.items()})
+    return calls
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--games", type=int, default=50)
+    ap.add_argument("--players", type=int, default=4)
+    ap.add_argument("--accuse", type=float, default=0.5, help="вероятность обвинить вместо хода")
+    args = ap.parse_args()
+    per_mode = {m: asyncio.run(play_games(m, args.games, args.players, args.accuse)) for m in MODES}
+    keys = sorted(set().union(*per_mode.values()))
+    print(f"{args.games} партий, {args.players} игрока, вызовов на партию:")
+    print(f"{'':<24}" + "".join(f"{m:>10}" for m in MODES))
+    for key in keys:
+        print(f"{key:<24}" + "".join(f"{per_mode[m][key] / args.games:10.1f}" for m in MODES))
+    api = {m: sum(v for k, v in per_mode[m].items() if not k.startswith("исход:")) for m in MODES}
+    print(f"{'всего вызовов API':<24}" + "".join(f"{api[m] / args.games:10.1f}" for m in MODES))
+    saved = sum(bot_main.HAND_DM_SAVED[k[6:]] * v for k, v in per_mode["edit"].items() if k.startswith("исход:"))
+    print(f"edit экономит {saved / args.games:.1f} вызовов на партию "
+          f"({1 - api['edit'] / api['resend']:.0%} всех вызовов)")
+
+
+if __name__ == "__main__":
+    main()
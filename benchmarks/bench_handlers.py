@@ -0,0 +1,141 @@
+"""Обработчики cmd_* из bot/main.py целиком: апдейт → Application.process_update → ответы.
+
+Bot API подменён заглушкой (bot/stub_api.StubRequest), которая записывает вызовы
+и отвечает с заданной задержкой. Метрики: мкс на апдейт и вызовов API на апдейт.
+
+    python -m benchmarks.bench_handlers [--save] [--latency 0.005] [--n 30]
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+import os
+import time
+
+os.environ.setdefault("BOT_TOKEN", "123:BENCH")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("OUTBOX", "0")  # лимиты Telegram здесь только замедлили бы прогон
+
+from telegram import Update  # noqa: E402
+
+from benchmarks import harness  # noqa: E402
+from bot import main as bot_main  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram, command_update  # noqa: E402
+
+GROUP = -1001
+PLAYERS = (11, 12, 13, 14)
+DEALER = 21
+
+
+class Driver:
+    def __init__(self, latency: float) -> None:
+        self.stub = StubTelegram(latency=latency)
+        bot_main.SEEN.clear()  # message_id снова с 1 — иначе команды отсекутся как повторы
+        self.app = bot_main.build_app(request=StubRequest(self.stub))
+        self.ids = itertools.count(1)
+
+    async def send(self, uid: int, chat_id: int, text: str) -> None:
+        data = command_update(next(self.ids), uid, chat_id, text)
+        await self.app.process_update(Update.de_json(data, self.app.bot))
+
+    async def lobby(self, players=PLAYERS) -> None:
+        await self.send(players[0], GROUP, "/newgame")
+        for uid in players:
+            await self.send(uid, GROUP, "/join")
+
+    async def started(self, need_last_play: bool = False) -> int:
+        """Довести игру до состояния, где текущий игрок может ходить; вернуть его uid."""
+        while True:
+            gs = bot_main.GAMES.get(GROUP)
+            if gs and gs.started and gs.hands.get(gs.current_player().user_id):
+                uid = gs.current_player().user_id
+                if not need_last_play or gs.last_play is not None:
+                    return uid
+                await self.send(uid, GROUP, f"/play 0 {gs.current_topic.value}")
+                continue
+            await self.lobby()
+            await self.send(PLAYERS[0], GROUP, "/startgame")
+
+
+async def scenarios(d: Driver):
+    """(имя, подготовка, замеряемый апдейт) — подготовка не входит в замер."""
+    async def none():
+        return None
+
+    async def lobby():
+        await d.send(PLAYERS[0], GROUP, "/newgame")
+
+    async def started():
+        await d.started()
+
+    async def dealer():
+        await d.send(DEALER, DEALER, "/dealer_new")
+        await d.send(DEALER, DEALER, "/dealer_add A")
+        await d.send(DEALER, DEALER, "/dealer_add B")
+
+    state = {}
+
+    async def before_join():
+        await lobby()
+
+    async def before_startgame():
+        await d.lobby()
+
+    async def before_play():
+        state["uid"] = await d.started()
+
+    async def before_accuse():
+        state["uid"] = await d.started(need_last_play=True)
+
+    return [
+        ("start", none, lambda: d.send(DEALER, DEALER, "/start")),
+        ("help", none, lambda: d.send(DEALER, DEALER, "/help")),
+        ("newgame", none, lambda: d.send(PLAYERS[0], GROUP, "/newgame")),
+        ("join", before_join, lambda: d.send(PLAYERS[1], GROUP, "/join")),
+        ("startgame", before_startgame, lambda: d.send(PLAYERS[0], GROUP, "/startgame")),
+        ("hand", started, lambda: d.send(PLAYERS[0], PLAYERS[0], "/hand")),
+        ("play", before_play, lambda: d.send(state["uid"], GROUP, "/play 0 K")),
+        ("accuse", before_accuse, lambda: d.send(state["uid"], GROUP, "/accuse")),
+        ("status", started, lambda: d.send(PLAYERS[0], GROUP, "/status")),
+        ("topic", started, lambda: d.send(PLAYERS[0], GROUP, "/topic")),
+        ("stop", started, lambda: d.send(PLAYERS[0], GROUP, "/stop")),
+        ("dealer_new", none, lambda: d.send(DEALER, DEALER, "/dealer_new")),
+        ("dealer_add", lambda: d.send(DEALER, DEALER, "/dealer_new"), lambda: d.send(DEALER, DEALER, "/dealer_add A")),
+        ("dealer_list", dealer, lambda: d.send(DEALER, DEALER, "/dealer_list")),
+        ("dealer_shoot", dealer, lambda: d.send(DEALER, DEALER, "/dealer_shoot A")),
+        ("dealer_reset", dealer, lambda: d.send(DEALER, DEALER, "/dealer_reset")),
+    ]
+
+
+async def run_async(latency: float, n: int) -> harness.Results:
+    d = Driver(latency)
+    await d.app.initialize()
+    res: harness.Results = {}
+    try:
+        for name, setup, step in await scenarios(d):
+            spent = 0.0
+            calls = 0
+            for _ in range(n):
+                await setup()
+                before = d.stub.count()
+                t0 = time.perf_counter()
+                await step()
+                spent += time.perf_counter() - t0
+                calls += d.stub.count() - before
+            res[f"{name}.us"] = spent / n * 1e6
+            res[f"{name}.api_calls"] = calls / n
+    finally:
+        await d.app.shutdown()
+    return res
+
+
+def run(args) -> harness.Results:
+    return asyncio.run(run_async(args.latency, args.n))
+
+
+def configure(ap) -> None:
+    ap.add_argument("--latency", type=float, default=0.005, help="задержка Bot API, секунды")
+    ap.add_argument("--n", type=int, default=30, help="повторов на команду")
+
+
+if __name__ == "__main__":
+    harness.main("handlers", run, configure)
@@ -0,0 +1,83 @@
+"""Большие лобби (liers/lobby.py): цена хода на 5, 20 и 100 игроках.
+
+LargeLobbyGameState сравнивается с «наивной» многоколодной игрой — тот же
+CompactGameState с N колодами, но со списочными проходами GameState
+(_next_alive_idx, remove_dead, _name, проверка победителя).
+
+    python -m benchmarks.bench_lobby [--save] [--n 3000]
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+
+from benchmarks import harness
+from liers.compact import CompactGameState, _FRESH
+from liers.lobby import LargeLobbyGameState, decks_for
+from liers.rng import SeededRandomness
+
+SIZES = (5, 20, 100)
+
+
+@dataclass(slots=True)
+class NaiveMultiDeck(CompactGameState):
+    decks: int = 1
+
+    def _new_deck(self) -> bytearray:
+        return bytearray(_FRESH * self.decks)
+
+
+def new_game(cls, n: int, seed: int):
+    gs = cls(chat_id=1, rng=SeededRandomness(seed), decks=decks_for(n))
+    for i in range(n):
+        gs.add_player(100 + i, f"user{i}")
+    gs.start()
+    return gs
+
+
+class Table:
+    """Партия, которая начинается заново, когда ход сделать нельзя."""
+
+    def __init__(self, cls, n: int) -> None:
+        self.cls, self.n, self.seed = cls, n, 0
+        self.gs = new_game(cls, n, 0)
+
+    def ready(self, need_last_play: bool):
+        while True:
+            gs = self.gs
+            if gs.started and gs.hands.get(gs.current_player().user_id):
+                if not need_last_play or gs.last_play is not None:
+                    return gs
+                gs.play(gs.current_player().user_id, 0, gs.current_topic)
+                continue
+            self.seed += 1
+            self.gs = new_game(self.cls, self.n, self.seed)
+
+
+def run(args) -> harness.Results:
+    res: harness.Results = {}
+    for name, cls in (("naive", NaiveMultiDeck), ("large", LargeLobbyGameState)):
+        for n in SIZES:
+            t = Table(cls, n)
+
+            def play():
+                gs = t.gs
+                gs.play(gs.current_player().user_id, 0, gs.current_topic)
+
+            def accuse():
+                gs = t.gs
+                gs.accuse(gs.current_player().user_id)
+
+            res[f"{name}.play.{n}.us"] = harness.best_of(
+                lambda: harness.per_call(play, setup=lambda: t.ready(False), n=args.n), repeat=3)
+            res[f"{name}.accuse.{n}.us"] = harness.best_of(
+                lambda: harness.per_call(accuse, setup=lambda: t.ready(True), n=args.n // 3), repeat=3)
+            res[f"{name}.next_name.{n}.us"] = harness.best_of(
+                lambda: harness.per_call(lambda: t.gs._name(t.gs.players[-1].user_id), n=args.n), repeat=3)
+    return res
+
+
+def configure(ap) -> None:
+    ap.add_argument("--n", type=int, default=3000, help="ходов на замер")
+
+
+if __name__ == "__main__":
+    harness.main("lobby", run, configure)
@@ -0,0 +1,126 @@
+"""Логи и задержка event loop (bot/logs.py): всплески записей с конвейером и без.
+
+Тикер спит по 1 мс и меряет, насколько позже просыпается, — это задержка,
+которую видят все обработчики. Тем временем каждые --period секунд идёт
+всплеск из --burst записей (каждая --exc-every-я — с трассировкой), пачками
+по 50, как от многих обработчиков подряд. Вывод — файл; --sink-delay
+добавляет задержку на запись (медленный stderr, переполненный pipe к сборщику).
+    direct — logging пишет прямо в event loop (как было с basicConfig);
+    queue  — QueueHandler в loop, форматирование и запись в фоновом потоке.
+
+    python -m benchmarks.bench_logging [--burst 2000] [--bursts 10] [--sink-delay 20]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from bot import logs
+
+
+class SlowFile(logging.FileHandler):
+    def __init__(self, path: str, delay_us: float) -> None:
+        super().__init__(path, encoding="utf-8")
+        self.delay = delay_us / 1e6
+
+    def emit(self, record: logging.LogRecord) -> None:
+        super().emit(record)
+        if self.delay:
+            time.sleep(self.delay)
+
+
+async def scenario(args) -> dict:
+    log = logging.getLogger("liers-bot.bench")
+    lags = []
+    calls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - t0 - 0.001)
+
+    async def producer():
+        for b in range(args.bursts):
+            await asyncio.sleep(args.period)
+            for i in range(args.burst):
+                t0 = time.perf_counter()
+                if i % args.exc_every == 0:
+                    try:
+                        raise RuntimeError("Bad Request: chat not found")
+                    except RuntimeError:
+                        log.warning("Рука не доставлена", exc_info=True, extra={"event": "hand_dm_failed", "user_id": i})
+                else:
+                    log.info("/play", extra={"event": "command", "command": "play", "chat_id": -b, "user_id": i,
+                                             "latency_ms": 0.4, "outcome": "ok"})
+                calls.append(time.perf_counter() - t0)
+                if i % 50 == 49:
+                    await asyncio.sleep(0)
+        done.set()
+
+    await asyncio.gather(ticker(), producer())
+    lags.sort()
+    return {
+        "call_us": statistics.mean(calls) * 1e6,
+        "p50": lags[len(lags) // 2] * 1000,
+        "p99": lags[int(len(lags) * 0.99)] * 1000,
+        "max": lags[-1] * 1000,
+    }
+
+
+def run(mode: str, args, path: str) -> dict:
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    out = SlowFile(path, args.sink_delay)
+    pipeline = None
+    if mode == "queue":
+        pipeline = logs.setup("INFO", args.format, args.sample, maxsize=args.queue, outputs=[out], force=True)
+    else:
+        out.setFormatter(logs.JsonFormatter() if args.format == "json" else logs.TextFormatter())
+        root.handlers[:] = [out]
+        root.setLevel(logging.INFO)
+    try:
+        res = asyncio.run(scenario(args))
+        t0 = time.perf_counter()
+        if pipeline is not None:
+            pipeline.flush(timeout=600)
+            res["drain_s"] = time.perf_counter() - t0
+            stats = pipeline.stats
+            res["full"] = stats.pop("full")
+            res["sampled"] = sum(stats.values())
+        return res
+    finally:
+        if pipeline is not None:
+            pipeline.stop()
+        out.close()
+        root.handlers[:] = saved[0]
+        root.setLevel(saved[1])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--burst", type=int, default=2000)
+    ap.add_argument("--bursts", type=int, default=10)
+    ap.add_argument("--period", type=float, default=0.2)
+    ap.add_argument("--exc-every", type=int, default=20)
+    ap.add_argument("--sink-delay", type=float, default=20, help="мкс на запись в вывод")
+    ap.add_argument("--format", default="text", choices=("text", "json"))
+    ap.add_argument("--sample", default="", help='прореживание для queue, например "command=10"')
+    ap.add_argument("--queue", type=int, default=100000)
+    args = ap.parse_args()
+    print(f"{args.bursts} всплесков по {args.burst} записей, вывод +{args.sink_delay} мкс на запись, формат {args.format}")
+    print(f"{'режим':<8} {'вызов, мкс':>11} {'задержка loop p50/p99/max, мс':>31} {'дописано за, с':>15} {'прорежено':>10} {'потеряно':>9}")
+    with tempfile.TemporaryDirectory() as d:
+        for mode in ("direct", "queue"):
+            r = run(mode, args, os.path.join(d, f"{mode}.log"))
+            print(f"{mode:<8} {r['call_us']:>11.1f} {r['p50']:>13.2f} / {r['p99']:>6.2f} / {r['max']:>6.1f} "
+                  f"{r.get('drain_s', 0):>15.2f} {r.get('sampled', 0):>10} {r.get('full', 0):>9}")
+
+
+if __name__ == "__main__":
+    main()
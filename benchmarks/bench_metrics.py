@@ -0,0 +1,85 @@
+"""Цена инструментирования (bot/metrics.py, liers/timing.py) на апдейт.
+
+Каждая метрика — разница «с обёрткой» минус «без», мкс на вызов:
+обёртка обработчика команды, MeteredRequest на вызов Bot API, хук ядра
+с подключённым observer и без него; плюс время отдачи /metrics.
+
+    python -m benchmarks.bench_metrics [--save] [--n 20000]
+"""
+from __future__ import annotations
+import asyncio
+import os
+import time
+
+os.environ.setdefault("BOT_TOKEN", "123:BENCH")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("OUTBOX", "0")
+
+from benchmarks import harness  # noqa: E402
+from bot import main as bot_main  # noqa: E402
+from bot.metrics import COMMAND_SECONDS, REGISTRY, MeteredRequest, instrument, observe_core  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram  # noqa: E402
+from liers import timing  # noqa: E402
+
+
+async def _noop_handler(update, context):
+    return None
+
+
+def _async_per_call(make, n: int) -> float:
+    """мкс на `await make()` в уже запущенном цикле."""
+    async def loop():
+        t0 = time.perf_counter()
+        for _ in range(n):
+            await make()
+        return (time.perf_counter() - t0) / n * 1e6
+    return asyncio.run(loop())
+
+
+def _sync_per_call(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def run(args) -> harness.Results:
+    n = args.n
+    res: harness.Results = {}
+
+    wrapped = instrument("bench", _noop_handler)
+    raw = harness.best_of(lambda: _async_per_call(lambda: _noop_handler(None, None), n))
+    res["command_wrapper.us"] = harness.best_of(lambda: _async_per_call(lambda: wrapped(None, None), n)) - raw
+
+    stub_req = StubRequest(StubTelegram())
+    metered = MeteredRequest(stub_req)
+    url = "https://api.telegram.org/bot123:BENCH/getWebhookInfo"
+    raw = harness.best_of(lambda: _async_per_call(lambda: stub_req.do_request(url, "POST"), n // 4))
+    res["api_wrapper.us"] = harness.best_of(lambda: _async_per_call(lambda: metered.do_request(url, "POST"), n // 4)) - raw
+
+    def plain():
+        return None
+    hooked = timing.timed("bench")(plain)
+    raw = harness.best_of(lambda: _sync_per_call(plain, n))
+    timing.set_observer(None)
+    res["core_hook_off.us"] = harness.best_of(lambda: _sync_per_call(hooked, n)) - raw
+    timing.set_observer(observe_core)
+    res["core_hook_on.us"] = harness.best_of(lambda: _sync_per_call(hooked, n)) - raw
+    timing.set_observer(None)
+
+    res["observe.us"] = harness.best_of(lambda: _sync_per_call(lambda: COMMAND_SECONDS.observe(0.003, "bench"), n))
+    # апдейт = команда + в среднем ~2 вызова Bot API + 1–2 операции ядра
+    res["per_update.us"] = res["command_wrapper.us"] + 2 * res["api_wrapper.us"] + 2 * res["core_hook_on.us"]
+
+    for name in bot_main.COMMANDS:
+        COMMAND_SECONDS.observe(0.01, name)
+    res["render.us"] = harness.best_of(lambda: _sync_per_call(REGISTRY.render, 200), repeat=3)
+    return res
+
+
+def configure(ap) -> None:
+    ap.add_argument("--n", type=int, default=20000, help="вызовов на замер")
+
+
+if __name__ == "__main__":
+    harness.main("metrics", run, configure)
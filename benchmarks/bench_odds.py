@@ -0,0 +1,85 @@
+"""Движок шансов (liers/odds.py): первый запрос по состоянию, запрос из кеша и прогрев всех состояний.
+
+Состояние — сколько каких карт не видно и сколько карт у заявившего; все
+возможные руки до 5 карт дают 125 × 5 состояний. Для сравнения — перебор рук заявившего
+по отдельным картам (как в tests/test_odds.py).
+
+    python -m benchmarks.bench_odds [--save]
+"""
+from __future__ import annotations
+import itertools
+import random
+import time
+
+from benchmarks import harness
+from liers import odds
+from liers.models import Rank
+from liers.policy import COMPOSITIONS
+
+RANKS = (Rank.K, Rank.Q, Rank.J, Rank.TR)
+
+
+def hands():
+    for comp in COMPOSITIONS:
+        if comp[3] > 4:  # козырей в колоде всего 4
+            continue
+        yield [r for r, n in zip(RANKS, comp) for _ in range(n)]
+
+
+def clear() -> None:
+    odds.hand_distribution.cache_clear()
+    odds._claim.cache_clear()
+
+
+def enumerate_claim(hand, topic, claimed, h=5) -> float:
+    pool = [r for r, n in zip(RANKS, odds.unseen(hand)) for _ in range(n)]
+    lie = total = 0
+    for idx in itertools.combinations(range(len(pool)), h):
+        total += 1
+        lie += all(pool[i] != claimed for i in idx)
+    return lie / total
+
+
+def run(args) -> harness.Results:
+    rnd = random.Random(1)
+    queries = [(h, rnd.choice(RANKS[:3]), rnd.choice(RANKS), rnd.randint(1, 5)) for h in hands()] * 4
+    res: harness.Results = {}
+
+    def cold() -> float:
+        clear()
+        t0 = time.perf_counter()
+        for hand, topic, claimed, size in queries[:125]:
+            odds.odds(hand, topic, claimed, claimer_hand=size)
+        return (time.perf_counter() - t0) / 125 * 1e6
+
+    res["cold_query.us"] = harness.best_of(cold, repeat=5)
+
+    def warm() -> float:
+        t0 = time.perf_counter()
+        for hand, topic, claimed, size in queries:
+            odds.odds(hand, topic, claimed, claimer_hand=size)
+        return (time.perf_counter() - t0) / len(queries) * 1e6
+
+    warm()
+    res["warm_query.us"] = harness.best_of(warm)
+
+    def warm_all() -> float:
+        clear()
+        t0 = time.perf_counter()
+        for hand in hands():
+            for size in range(1, 6):
+                for topic in RANKS[:3]:
+                    for claimed in RANKS:
+                        odds.odds(hand, topic, claimed, claimer_hand=size)
+        return (time.perf_counter() - t0) * 1000
+
+    res["warm_all_states.ms"] = harness.best_of(warm_all, repeat=3)
+    res["cache_entries"] = odds.cache_size()
+    t0 = time.perf_counter()
+    enumerate_claim([Rank.K, Rank.Q], Rank.J, Rank.K)
+    res["enumeration_query.us"] = (time.perf_counter() - t0) * 1e6
+    return res
+
+
+if __name__ == "__main__":
+    harness.main("odds", run)
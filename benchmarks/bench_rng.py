@@ -0,0 +1,53 @@
+"""Пропускная способность случайности: secrets.* на каждый вызов против буферизованного Randomness.
+
+    python -m benchmarks.bench_rng [--n 200000]
+"""
+from __future__ import annotations
+import argparse
+import secrets
+import time
+
+from liers.game import GameState
+from liers.rng import Randomness, SeededRandomness
+
+
+def rate(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - t0)
+
+
+def secrets_shuffle(deck) -> None:
+    for i in range(len(deck) - 1, 0, -1):
+        j = secrets.randbelow(i + 1)
+        deck[i], deck[j] = deck[j], deck[i]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--n", type=int, default=200000)
+    args = ap.parse_args()
+    n = args.n
+    rng, seeded = Randomness(), SeededRandomness(1)
+    deck = list(range(28))
+    topics = ("K", "Q", "J")
+    rows = [
+        ("randbelow(28)", lambda: secrets.randbelow(28), lambda: rng.randbelow(28), lambda: seeded.randbelow(28)),
+        ("choice(темы)", lambda: secrets.choice(topics), lambda: rng.choice(topics), lambda: seeded.choice(topics)),
+        ("перетасовка 28", lambda: secrets_shuffle(deck), lambda: rng.shuffle(deck), lambda: seeded.shuffle(deck)),
+    ]
+    print(f"{'операция':<16} {'secrets, оп/с':>14} {'Randomness':>12} {'Seeded':>12}")
+    for name, a, b, c in rows:
+        k = n if "перетасовка" not in name else n // 20
+        print(f"{name:<16} {rate(a, k):>14.0f} {rate(b, k):>12.0f} {rate(c, k):>12.0f}")
+
+    gs = GameState(chat_id=1)
+    for i in range(5):
+        gs.add_player(i, f"user{i}")
+    gs.start()
+    print(f"редил GameState (5 игроков): {rate(lambda: gs._redeal_alive_to_five(), n // 20):.0f} /с")
+
+
+if __name__ == "__main__":
+    main()
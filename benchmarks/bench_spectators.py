@@ -0,0 +1,88 @@
+"""Лента зрителей (bot/spectators.py): цена одного события игры при 10, 100 и 1000 зрителях.
+
+Партия — --events событий с паузой --think секунд (время подставное, без сна);
+проход рассылки — раз в WATCH_WINDOW. Отправка — пустая корутина, поэтому
+измеряется только своя работа бота:
+    publish   — что платит обработчик хода (дописать строку в ленту);
+    fan-out   — проходы рассылки (сборка пачек, задачи на отправку), на событие;
+    наивно    — по задаче send_message на каждого зрителя на каждое событие.
+Сообщений — сколько ушло зрителям всего (наивно — события × зрители).
+
+    python -m benchmarks.bench_spectators [--events 200] [--think 0.5] [--watchers 10,100,1000]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+
+from bot.spectators import Broadcaster
+
+
+class NullBot:
+    rate_limiter = None
+
+    def __init__(self) -> None:
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, rate_limit_args=None):
+        self.sent += 1
+
+
+async def batched(watchers: int, events: int, think: float, window: float, interval: float) -> dict:
+    now = [0.0]
+    bot = NullBot()
+    b = Broadcaster(window=3600, interval=interval, concurrency=watchers, clock=lambda: now[0])
+    for uid in range(watchers):
+        b.watch(-1, uid)
+    publish = fan = 0.0
+    next_pump = window
+    for i in range(events):
+        line = f"@player{i % 4} заявил K (карт в руке: {i % 5})"
+        t0 = time.perf_counter()
+        b.publish(bot, -1, line)
+        publish += time.perf_counter() - t0
+        now[0] += think
+        while now[0] >= next_pump:
+            t0 = time.perf_counter()
+            b.pump()
+            fan += time.perf_counter() - t0
+            await asyncio.sleep(0)  # отправки завершаются
+            next_pump += window
+    if b._pump is not None:
+        b._pump.cancel()
+    return {"publish": publish / events, "fan": fan / events, "sent": bot.sent, "shared": b.stats["shared"]}
+
+
+async def naive(watchers: int, events: int) -> dict:
+    bot = NullBot()
+    spent = 0.0
+    for i in range(events):
+        line = f"@player{i % 4} заявил K (карт в руке: {i % 5})"
+        t0 = time.perf_counter()
+        for uid in range(watchers):
+            asyncio.create_task(bot.send_message(uid, line))
+        spent += time.perf_counter() - t0
+        await asyncio.sleep(0)
+    return {"fan": spent / events, "sent": bot.sent}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=200)
+    ap.add_argument("--think", type=float, default=0.5, help="секунд между событиями")
+    ap.add_argument("--window", type=float, default=1.0)
+    ap.add_argument("--interval", type=float, default=3.0)
+    ap.add_argument("--watchers", default="10,100,1000")
+    args = ap.parse_args()
+    print(f"{args.events} событий раз в {args.think} с, проход раз в {args.window} с, зрителю — раз в {args.interval} с")
+    print(f"{'зрителей':>9} {'publish, мкс':>13} {'fan-out, мкс':>13} {'на зрителя':>11} {'сообщений':>10} "
+          f"{'наивно, мкс':>12} {'сообщений':>10}")
+    for w in map(int, args.watchers.split(",")):
+        b = asyncio.run(batched(w, args.events, args.think, args.window, args.interval))
+        n = asyncio.run(naive(w, args.events))
+        print(f"{w:>9} {b['publish'] * 1e6:>13.2f} {b['fan'] * 1e6:>13.1f} {b['fan'] / w * 1e9:>9.0f}нс "
+              f"{b['sent']:>10} {n['fan'] * 1e6:>12.1f} {n['sent']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Хранилище состояния (bot/storage.py): время восстановления и цена записи на команду.
+
+    python -m benchmarks.bench_storage [--games 10000] [--commands 2000]
+"""
+from __future__ import annotations
+import argparse
+import os
+import tempfile
+import time
+
+from bot.storage import MemoryBackend, SQLiteBackend, StateStore
+from liers.game import GameState
+
+
+def make_game(chat_id: int, n: int = 4) -> GameState:
+    gs = GameState(chat_id=chat_id)
+    for i in range(n):
+        gs.add_player(chat_id * 10 + i, f"user{i}")
+    gs.start()
+    return gs
+
+
+def open_games(backend):
+    store = StateStore(backend)
+    return store, store.map("game", dump=GameState.to_dict, load=GameState.from_dict, is_active=lambda g: g.started)
+
+
+def bench_restore(path: str, games: int) -> None:
+    store, gm = open_games(SQLiteBackend(path))
+    for cid in range(games):
+        gm[cid] = make_game(cid)
+        if cid % 2:
+            gm[cid].stop()  # половина игр закончена — их восстанавливать не нужно
+    store.close()
+
+    t0 = time.perf_counter()
+    store, gm = open_games(SQLiteBackend(path))
+    t_index = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for cid in range(0, 200, 2):
+        gm[cid]
+    t_touch = (time.perf_counter() - t0) / 100
+    t0 = time.perf_counter()
+    for cid in list(gm):
+        gm[cid]
+    t_all = time.perf_counter() - t0
+    store.close()
+    print(f"Восстановление ({games} игр в базе, активных {len(gm)}):")
+    print(f"  старт (только индекс активных): {t_index * 1000:.1f} мс")
+    print(f"  ленивая загрузка одной игры:    {t_touch * 1e6:.0f} мкс")
+    print(f"  загрузить все активные сразу:    {t_all * 1000:.1f} мс")
+
+
+def bench_writes(name: str, backend, commands: int) -> None:
+    store, gm = open_games(backend)
+    for cid in range(1000):
+        gm[cid] = make_game(cid)
+    store.flush()
+    total = 0.0
+    cid = 0
+    for _ in range(commands):
+        gs = gm[cid]
+        uid = gs.current_player().user_id
+        if gs.last_play and gs.hands[uid]:
+            gs.accuse(uid)
+        elif gs.hands[uid]:
+            gs.play(uid, 0, gs.current_topic)
+        if not gs.started:
+            gm[cid] = make_game(cid)
+        t0 = time.perf_counter()
+        store.flush()
+        total += time.perf_counter() - t0
+        cid = (cid + 1) % 1000
+    store.close()
+    print(f"  {name:<7} {total / commands * 1e6:7.0f} мкс на команду")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--games", type=int, default=10000)
+    ap.add_argument("--commands", type=int, default=2000)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_restore(os.path.join(tmp, "restore.db"), args.games)
+        print("Запись после команды (flush одной изменённой игры):")
+        bench_writes("memory", MemoryBackend(), args.commands)
+        bench_writes("sqlite", SQLiteBackend(os.path.join(tmp, "writes.db")), args.commands)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Холодный старт webhook-режима: от запуска процесса до первого обработанного апдейта.
+
+Запускает `python -m bot.webhook` как отдельный процесс против локальной заглушки
+Bot API (bot/stub_api.py), шлёт в webhook апдейт с /start и ждёт, пока бот ответит.
+
+    python -m benchmarks.bench_webhook_startup [--runs 5] [--latency 0.05]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import time
+
+import httpx
+
+from bot.stub_api import StubTelegram, command_update, serve_stub
+
+SECRET = "bench-secret"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def one_run(latency: float) -> tuple:
+    stub = StubTelegram(latency=latency)
+    server, api_url = serve_stub(stub)
+    port = _free_port()
+    env = dict(
+        os.environ,
+        BOT_TOKEN="123:BENCH",
+        TELEGRAM_API_URL=api_url,
+        WEBHOOK_PUBLIC_URL=f"http://127.0.0.1:{port}",
+        WEBHOOK_SECRET=SECRET,
+        PORT=str(port),
+        LISTEN="127.0.0.1",
+        STATE_BACKEND="memory",
+    )
+    replied = stub.wait_for("sendMessage")
+    t0 = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "bot.webhook", env=env,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        async with httpx.AsyncClient() as client:
+            while True:
+                try:
+                    r = await client.post(
+                        f"http://127.0.0.1:{port}/telegram",
+                        json=command_update(1, 42, 42, "/start"),
+                        headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+                    )
+                    r.raise_for_status()
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.002)
+            accepted = time.perf_counter() - t0
+            call = await asyncio.wait_for(replied, 30)
+            handled = call.at - t0
+    finally:
+        proc.terminate()
+        await proc.wait()
+        server.stop()
+    return accepted, handled
+
+
+async def main(runs: int, latency: float) -> None:
+    accepted, handled = [], []
+    for _ in range(runs):
+        a, h = await one_run(latency)
+        accepted.append(a)
+        handled.append(h)
+    print(f"Заглушка Bot API: задержка {latency * 1000:.0f} мс на вызов, запусков: {runs}")
+    print(f"  апдейт принят (порт открыт): медиана {statistics.median(accepted) * 1000:.0f} мс, мин {min(accepted) * 1000:.0f} мс")
+    print(f"  первый апдейт обработан:     медиана {statistics.median(handled) * 1000:.0f} мс, мин {min(handled) * 1000:.0f} мс")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--latency", type=float, default=0.05, help="секунды на вызов Bot API")
+    args = ap.parse_args()
+    asyncio.run(main(args.runs, args.latency))
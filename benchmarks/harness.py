@@ -0,0 +1,106 @@
+"""Общее для бенчмарков с базовыми значениями: замер, сохранение и сравнение.
+
+Результат бенчмарка — плоский словарь {метрика: число}, где меньше — лучше
+(микросекунды на операцию, вызовы API на апдейт). Базовые значения лежат в
+benchmarks/baselines/<имя>.json; `--save` перезаписывает их, без флага
+текущий прогон сравнивается с сохранённым.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines")
+
+Results = Dict[str, float]
+
+
+def best_of(fn: Callable[[], float], repeat: int = 7) -> float:
+    """Лучший из repeat прогонов fn (fn сама возвращает время на операцию)."""
+    return min(fn() for _ in range(repeat))
+
+
+def per_call(op: Callable[[], object], setup: Optional[Callable[[], object]] = None, n: int = 2000) -> float:
+    """Среднее время op в микросекундах; setup (если есть) выполняется перед каждым вызовом и не учитывается."""
+    total = 0.0
+    for _ in range(n):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        op()
+        total += time.perf_counter() - t0
+    return total / n * 1e6
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINES, f"{name}.json")
+
+
+def save(name: str, results: Results) -> str:
+    os.makedirs(BASELINES, exist_ok=True)
+    path = baseline_path(name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "meta": {"python": platform.python_version(), "machine": platform.machine(), "saved": time.strftime("%Y-%m-%d")},
+                "results": {k: round(v, 3) for k, v in sorted(results.items())},
+            },
+            f, ensure_ascii=False, indent=1,
+        )
+        f.write("\n")
+    return path
+
+
+def load(name: str) -> Optional[Results]:
+    try:
+        with open(baseline_path(name), encoding="utf-8") as f:
+            return json.load(f)["results"]
+    except FileNotFoundError:
+        return None
+
+
+def compare(results: Results, baseline: Results, tolerance: float) -> List[Tuple[str, float, float]]:
+    """Метрики, ухудшившиеся больше чем на tolerance (доля): (метрика, было, стало)."""
+    worse = []
+    for key, now in results.items():
+        was = baseline.get(key)
+        if was is not None and now > was * (1 + tolerance) and now - was > 1e-3:
+            worse.append((key, was, now))
+    return worse
+
+
+def report(results: Results, baseline: Optional[Results]) -> None:
+    print(f"{'метрика':<34} {'сейчас':>10} {'база':>10} {'Δ':>8}")
+    for key in sorted(results):
+        now = results[key]
+        was = baseline.get(key) if baseline else None
+        delta = f"{(now / was - 1) * 100:+.0f}%" if was else ""
+        print(f"{key:<34} {now:>10.2f} {was if was is not None else '—':>10} {delta:>8}")
+
+
+def main(name: str, run: Callable[[argparse.Namespace], Results], configure: Optional[Callable] = None) -> None:
+    ap = argparse.ArgumentParser(description=f"Бенчмарк {name} с базовыми значениями")
+    ap.add_argument("--save", action="store_true", help="сохранить результат как новую базу")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="допустимое ухудшение (доля), по умолчанию 25%%")
+    ap.add_argument("--fail-on-regression", action="store_true", help="код выхода 1 при ухудшении")
+    if configure:
+        configure(ap)
+    args = ap.parse_args()
+    results = run(args)
+    baseline = load(name)
+    report(results, baseline)
+    if args.save:
+        print(f"База сохранена: {save(name, results)}")
+        return
+    if baseline is None:
+        print("Базы нет — запустите с --save.")
+        return
+    worse = compare(results, baseline, args.tolerance)
+    for key, was, now in worse:
+        print(f"РЕГРЕССИЯ {key}: {was:.2f} → {now:.2f}")
+    if worse and args.fail_on_regression:
+        sys.exit(1)
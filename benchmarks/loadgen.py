@@ -0,0 +1,185 @@
+"""Нагрузочный прогон: тысячи одновременных чатов против build_app() и заглушки Bot API.
+
+Каждая «группа» — отдельная корутина-клиент: /newgame → /join ×k → /startgame →
+/play и /accuse, пока партия не кончится, затем заново. Часть клиентов — игроки
+в личке с Dealer-режимом (/dealer_new, /dealer_add, /dealer_shoot, /dealer_reset).
+Клиент шлёт следующий апдейт, когда обработан предыдущий (плюс --think), через
+тот же update_processor, что и при работе бота, поэтому видны и очередь
+MAX_CONCURRENT_UPDATES, и блокировки по чатам.
+
+Для каждого N из --chats печатается: p50/p95/p99 времени обработки апдейта
+(от передачи в processor до конца всех обработчиков), апдейтов/с, вызовов
+Bot API/с, ошибки обработчиков и RSS процесса (вместе с заглушкой).
+
+    python -m benchmarks.loadgen [--chats 10,100,1000,3000] [--duration 10]
+        [--latency 0.05] [--think 0] [--players 4] [--dealers 0.1] [--outbox]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import resource
+import time
+from typing import Dict, List
+
+
+def parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chats", default="10,100,1000,3000", help="числа одновременных клиентов через запятую")
+    ap.add_argument("--duration", type=float, default=10.0, help="секунд на каждое N")
+    ap.add_argument("--latency", type=float, default=0.05, help="задержка Bot API, секунды")
+    ap.add_argument("--think", type=float, default=0.0, help="пауза клиента между апдейтами, секунды")
+    ap.add_argument("--players", type=int, default=4, help="игроков в группе (2–5)")
+    ap.add_argument("--dealers", type=float, default=0.1, help="доля клиентов в Dealer-режиме")
+    ap.add_argument("--accuse", type=float, default=0.3, help="вероятность обвинить вместо хода")
+    ap.add_argument("--max-concurrent", type=int, help="MAX_CONCURRENT_UPDATES (по умолчанию — как у бота)")
+    ap.add_argument("--outbox", action="store_true", help="включить очередь исходящих с лимитами Telegram")
+    ap.add_argument("--json", help="дописать результаты в файл (по строке JSON на N)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--verbose", action="store_true", help="оставить INFO-логи бота (по строке на раздачу)")
+    return ap.parse_args()
+
+
+ARGS = parse_args()
+os.environ.setdefault("BOT_TOKEN", "123:LOAD")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ["OUTBOX"] = "1" if ARGS.outbox else "0"
+if ARGS.max_concurrent:
+    os.environ["MAX_CONCURRENT_UPDATES"] = str(ARGS.max_concurrent)
+
+from telegram import Update  # noqa: E402
+
+from bot import main as bot_main  # noqa: E402
+from bot.metrics import COMMAND_ERRORS  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram, command_update  # noqa: E402
+
+if not ARGS.verbose:
+    logging.getLogger("liers-bot").setLevel(logging.WARNING)
+
+
+def rss_mb() -> float:
+    """Текущий RSS (Linux), иначе пиковый."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def quantile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class Load:
+    def __init__(self, app, stub: StubTelegram) -> None:
+        self.app = app
+        self.stub = stub
+        self.ids = itertools.count(1)
+        self.latencies: List[float] = []
+        self.rnd = random.Random(ARGS.seed)
+        self.deadline = 0.0
+
+    async def send(self, uid: int, chat_id: int, text: str) -> None:
+        update = Update.de_json(command_update(next(self.ids), uid, chat_id, text), self.app.bot)
+        t0 = time.perf_counter()
+        await self.app.update_processor.process_update(update, self.app.process_update(update))
+        self.latencies.append(time.perf_counter() - t0)
+        if ARGS.think:
+            await asyncio.sleep(ARGS.think * (0.5 + self.rnd.random()))
+
+    def running(self) -> bool:
+        return time.perf_counter() < self.deadline
+
+    async def group(self, n: int) -> None:
+        chat_id = -(1_000_000 + n)
+        players = [10_000_000 + n * 10 + i for i in range(ARGS.players)]
+        while self.running():
+            await self.send(players[0], chat_id, "/newgame")
+            for uid in players:
+                await self.send(uid, chat_id, "/join")
+            await self.send(players[0], chat_id, "/startgame")
+            while self.running():
+                gs = bot_main.GAMES.get(chat_id)
+                if gs is None or not gs.started:
+                    break
+                uid = gs.current_player().user_id
+                hand = gs.hands.get(uid)
+                if gs.last_play is not None and (not hand or self.rnd.random() < ARGS.accuse):
+                    await self.send(uid, chat_id, "/accuse")
+                elif hand:
+                    topic = self.rnd.choice("KQJ")
+                    await self.send(uid, chat_id, f"/play {self.rnd.randrange(len(hand))} {topic}")
+                else:  # ходить нечем и обвинять некого — так бывает в конце колоды
+                    await self.send(players[0], chat_id, "/stop")
+            if self.rnd.random() < 0.2:
+                await self.send(players[1], players[1], "/hand")
+
+    async def dealer(self, n: int) -> None:
+        uid = 20_000_000 + n
+        while self.running():
+            await self.send(uid, uid, "/dealer_new")
+            for name in ("A", "B", "C"):
+                await self.send(uid, uid, f"/dealer_add {name}")
+            for _ in range(6):
+                if not self.running():
+                    break
+                await self.send(uid, uid, f"/dealer_shoot {self.rnd.choice('ABC')}")
+            await self.send(uid, uid, "/dealer_list")
+            await self.send(uid, uid, "/dealer_reset")
+
+
+async def step(load: Load, chats: int) -> Dict[str, float]:
+    load.latencies = []
+    load.stub.calls.clear()
+    errors0 = sum(COMMAND_ERRORS.values.values())
+    dealers = int(chats * ARGS.dealers)
+    load.deadline = time.perf_counter() + ARGS.duration
+    t0 = time.perf_counter()
+    tasks = [load.dealer(i) if i < dealers else load.group(i) for i in range(chats)]
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - t0
+    lat = sorted(load.latencies)
+    res = {
+        "chats": chats,
+        "updates": len(lat),
+        "p50_ms": quantile(lat, 0.50) * 1000,
+        "p95_ms": quantile(lat, 0.95) * 1000,
+        "p99_ms": quantile(lat, 0.99) * 1000,
+        "updates_per_s": len(lat) / wall,
+        "api_per_s": len(load.stub.calls) / wall,
+        "errors": sum(COMMAND_ERRORS.values.values()) - errors0,
+        "rss_mb": rss_mb(),
+    }
+    # сообщения групп заглушке больше не нужны (их не редактируют), иначе RSS растёт от неё
+    load.stub.messages = {k: v for k, v in load.stub.messages.items() if k[0] > 0}
+    return res
+
+
+async def main() -> None:
+    stub = StubTelegram(latency=ARGS.latency)
+    app = bot_main.build_app(request=StubRequest(stub))
+    await app.initialize()
+    load = Load(app, stub)
+    print(f"Bot API {ARGS.latency * 1000:.0f} мс, {ARGS.duration:.0f} с на шаг, "
+          f"MAX_CONCURRENT_UPDATES={bot_main.MAX_CONCURRENT_UPDATES}, outbox={'on' if ARGS.outbox else 'off'}")
+    print(f"{'чатов':>6} {'апд/с':>8} {'API/с':>8} {'p50 мс':>8} {'p95 мс':>8} {'p99 мс':>8} {'ошибок':>6} {'RSS МБ':>7}")
+    try:
+        for chats in (int(x) for x in ARGS.chats.split(",")):
+            r = await step(load, chats)
+            print(f"{chats:>6} {r['updates_per_s']:>8.0f} {r['api_per_s']:>8.0f} {r['p50_ms']:>8.1f} "
+                  f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>6} {r['rss_mb']:>7.0f}")
+            if ARGS.json:
+                with open(ARGS.json, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({**r, "latency": ARGS.latency, "outbox": ARGS.outbox}) + "\n")
+    finally:
+        await app.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
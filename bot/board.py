@@ -0,0 +1,152 @@
+"""Доска игры: одно закреплённое сообщение в группе, которое правится после каждого хода.
+
+Ходы приходят нажатиями инлайн-кнопок (callback_data — 1–3 символа, см. encode/parse).
+Правки откладываются на debounce секунд: несколько ходов подряд дают одну правку,
+а если текст и клавиатура не изменились, Bot API не вызывается вовсе.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, MutableMapping, Optional, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, TelegramError
+
+from liers.game import HAND_SIZE
+from liers.models import Rank
+from bot.concurrency import KeyedLocks
+from bot.outbox import Superseded
+
+logger = logging.getLogger("liers-bot.board")
+
+# Клавиатуры доски: лобби, идущая игра; None — без кнопок (игра окончена)
+LOBBY, GAME = "lobby", "game"
+
+_RANK_CODE = {Rank.K: "K", Rank.Q: "Q", Rank.J: "J", Rank.TR: "T"}
+_CODE_RANK = {c: r for r, c in _RANK_CODE.items()}
+_ACTIONS = {"j": "join", "s": "start", "a": "accuse", "h": "hand"}
+_CODES = {a: c for c, a in _ACTIONS.items()}
+
+
+def encode(action: str, index: int = 0, rank: Optional[Rank] = None) -> str:
+    """callback_data кнопки: "p2K" — сыграть карту 2, заявив K; "a" — обвинить и т.п."""
+    if action == "play":
+        return f"p{index}{_RANK_CODE[rank]}"
+    return _CODES[action]
+
+
+def parse(data: Optional[str]) -> Tuple[str, int, Optional[Rank]]:
+    """(действие, индекс карты, заявленный ранг); ValueError — чужие или битые данные."""
+    if not data:
+        raise ValueError("пустые данные кнопки")
+    if data[0] == "p" and len(data) == 3 and data[1].isdigit() and data[2] in _CODE_RANK:
+        return "play", int(data[1]), _CODE_RANK[data[2]]
+    if data in _ACTIONS:
+        return _ACTIONS[data], 0, None
+    raise ValueError(f"неизвестная кнопка {data!r}")
+
+
+def _button(text: str, action: str, index: int = 0, rank: Optional[Rank] = None) -> InlineKeyboardButton:
+    return InlineKeyboardButton(text, callback_data=encode(action, index, rank))
+
+
+_KEYBOARDS = {
+    LOBBY: InlineKeyboardMarkup([[_button("➕ Присоединиться", "join"), _button("▶️ Начать", "start")]]),
+    GAME: InlineKeyboardMarkup(
+        [[_button(f"{i}→{rank.value}", "play", i, rank) for i in range(HAND_SIZE)] for rank in Rank.all_ranks()]
+        + [[_button("🔍 Обвинить", "accuse"), _button("🃏 Моя рука", "hand")]]
+    ),
+}
+
+
+def keyboard(kind: Optional[str]) -> Optional[InlineKeyboardMarkup]:
+    return _KEYBOARDS.get(kind) if kind else None
+
+
+# render() -> (текст доски, вид клавиатуры)
+Render = Callable[[], Tuple[str, Optional[str]]]
+
+
+class BoardUpdater:
+    """
+    Отложенные правки досок. touch() запоминает, как отрисовать доску чата, и
+    через debounce секунд публикует последнюю версию: правит сообщение из store
+    (chat_id -> [message_id, текст, вид клавиатуры]) или, если его нет или оно
+    пропало, присылает новое и закрепляет.
+    """
+
+    def __init__(self, store: MutableMapping[int, Any], debounce: float = 0.5, pin: bool = True) -> None:
+        self.store = store
+        self.debounce = debounce
+        self.pin = pin
+        self.stats: Counter = Counter()  # исход публикации -> сколько раз
+        self._pending: Dict[int, Render] = {}
+        self._tasks: Dict[int, "asyncio.Task[None]"] = {}
+        self._locks = KeyedLocks()
+
+    def touch(self, bot: Any, chat_id: int, render: Render) -> None:
+        if chat_id in self._pending:
+            self.stats["coalesced"] += 1
+        self._pending[chat_id] = render
+        if chat_id not in self._tasks:
+            self._tasks[chat_id] = asyncio.create_task(self._run(bot, chat_id))
+
+    def forget(self, chat_id: int) -> None:
+        """Следующая публикация пришлёт новую доску (например, после /newgame)."""
+        self.store.pop(chat_id, None)
+
+    def is_current(self, chat_id: int, message_id: int) -> bool:
+        prev = self.store.get(chat_id)
+        return prev is not None and prev[0] == message_id
+
+    async def flush(self) -> None:
+        """Дождаться всех запланированных правок (тесты, остановка бота)."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    async def _run(self, bot: Any, chat_id: int) -> None:
+        try:
+            if self.debounce:
+                await asyncio.sleep(self.debounce)
+        finally:
+            del self._tasks[chat_id]
+        render = self._pending.pop(chat_id)
+        async with self._locks.hold(chat_id):
+            try:
+                outcome = await self._publish(bot, chat_id, render)
+            except Superseded:
+                outcome = "coalesced"  # пока правка ждала очереди, запланирована новая
+            except Exception:
+                outcome = "error"
+                logger.exception("Не удалось обновить доску в чате %s", chat_id)
+        self.stats[outcome] += 1
+
+    async def _publish(self, bot: Any, chat_id: int, render: Render) -> str:
+        text, kind = render()
+        prev = self.store.get(chat_id)
+        rl = {"superseded": lambda: chat_id in self._pending} if bot.rate_limiter else None
+        if prev is not None:
+            if prev[1] == text and prev[2] == kind:
+                return "unchanged"
+            try:
+                await bot.edit_message_text(
+                    chat_id=chat_id, message_id=prev[0], text=text, reply_markup=keyboard(kind), rate_limit_args=rl
+                )
+                self.store[chat_id] = [prev[0], text, kind]
+                return "edited"
+            except BadRequest as e:
+                err = e.message.lower()
+                if "not modified" in err:
+                    self.store[chat_id] = [prev[0], text, kind]
+                    return "unchanged"
+                if "not found" not in err and "can't be edited" not in err:
+                    raise
+        msg = await bot.send_message(chat_id=chat_id, text=text, reply_markup=keyboard(kind), rate_limit_args=rl)
+        self.store[chat_id] = [msg.message_id, text, kind]
+        if self.pin:
+            try:
+                await bot.pin_chat_message(chat_id=chat_id, message_id=msg.message_id, disable_notification=True)
+            except TelegramError as e:  # нет прав закреплять — доска работает и так
+                logger.debug("Не удалось закрепить доску в чате %s: %s", chat_id, e)
+        return "sent" if prev is None else "resent"
@@ -0,0 +1,85 @@
+from __future__ import annotations
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, Hashable, List, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+# «Без предела» для семафора BaseUpdateProcessor (свой предел — в ChatSerializingProcessor)
+_UNBOUNDED = 1 << 30
+
+
+class KeyedLocks:
+    """asyncio.Lock на ключ; лок удаляется, когда его никто не держит и не ждёт."""
+
+    def __init__(self) -> None:
+        self._locks: Dict[Hashable, List[Any]] = {}  # key -> [lock, пользователей]
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def __contains__(self, key: object) -> bool:
+        """Лок ключа кто-то держит или ждёт."""
+        return key in self._locks
+
+
+def update_key(update: object) -> Optional[int]:
+    """Ключ сериализации: чат апдейта (в личке это user_id — сессия дилера), иначе пользователь."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return None
+
+
+class ChatSerializingProcessor(BaseUpdateProcessor):
+    """
+    Апдейты разных чатов обрабатываются параллельно, а одного чата — строго
+    по очереди: команды к одному GameState/DealerSession применяются в порядке
+    поступления, а медленная рассылка в одной группе не тормозит остальные.
+
+    Общий предел max_concurrent_updates занимается уже под локом чата: очередь
+    одного чата держит не больше одного слота и не вытесняет другие чаты.
+    Семафор базового класса поэтому без предела.
+    """
+
+    def __init__(self, max_concurrent_updates: int = 256) -> None:
+        super().__init__(_UNBOUNDED)
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        self._max_concurrent_updates = max_concurrent_updates  # настоящий предел — его и видит Application
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self.locks = KeyedLocks()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = update_key(update)
+        if key is None:
+            async with self._slots:
+                await coroutine
+            return
+        async with self.locks.hold(key), self._slots:
+            await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
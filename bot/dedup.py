@@ -0,0 +1,125 @@
+"""Повторная доставка апдейтов: отсечь дубликаты до обработчиков, не трогая игру.
+
+Два ключа:
+- update_id — общий для бота, растёт по порядку; помним последние WINDOW номеров;
+- (chat_id, message_id) — message_id растёт внутри чата; помним последние
+  CHAT_WINDOW сообщений каждого чата. Окна чатов пишутся вместе с изменёнными
+  играми (StateMap, тот же flush), поэтому повтор хода, пришедший после
+  перезапуска бота, тоже отсекается. Правка сообщения (edited_message) — новый
+  апдейт с тем же message_id: её сверяем только по update_id.
+
+Окно — как anti-replay в IPsec: наибольший номер и кольцо битов за ним, всё
+фиксированного размера: WINDOW бит — 8 КБ на процесс, CHAT_WINDOW — 8 байт на чат.
+"""
+from __future__ import annotations
+from collections import Counter
+from typing import List, MutableMapping, Optional
+
+from telegram import Update
+
+WINDOW = 1 << 16
+CHAT_WINDOW = 64
+
+
+class ReplayWindow:
+    """Отметки о номерах top-size+1..top. add() — проверить и отметить за один вызов."""
+
+    __slots__ = ("size", "restart", "top", "bits")
+
+    def __init__(self, size: int = WINDOW, restart: bool = False) -> None:
+        if size <= 0 or size % 8:
+            raise ValueError("размер окна должен быть кратен 8")
+        self.size = size
+        # restart: номер далеко позади окна — новая нумерация (update_id после недели
+        # простоя выбирается заново), иначе — устаревший повтор
+        self.restart = restart
+        self.top = -1
+        self.bits = bytearray(size // 8)
+
+    def add(self, n: int) -> bool:
+        """True — номер новый (теперь отмечен), False — уже был или старее окна."""
+        top = self.top
+        i = n % self.size
+        at, mask = i >> 3, 1 << (i & 7)
+        if n > top:
+            if top < 0 or n - top >= self.size:
+                self.bits[:] = bytes(len(self.bits))
+            elif n - top > 1:
+                self._clear(top + 1, n)
+            self.top = n
+            self.bits[at] |= mask
+            return True
+        if top - n >= self.size:
+            if not self.restart:
+                return False
+            self.bits[:] = bytes(len(self.bits))
+            self.top = n
+        elif self.bits[at] & mask:
+            return False
+        self.bits[at] |= mask
+        return True
+
+    def _clear(self, lo: int, hi: int) -> None:
+        """Снять отметки с номеров lo..hi-1: их места в кольце переходят к новым номерам."""
+        bits, size = self.bits, self.size
+        while lo < hi and lo & 7:
+            i = lo % size
+            bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+            lo += 1
+        while hi > lo and hi & 7:
+            hi -= 1
+            i = hi % size
+            bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+        n = (hi - lo) >> 3
+        if not n:
+            return
+        a = (lo % size) >> 3
+        head = min(n, len(bits) - a)
+        bits[a:a + head] = bytes(head)
+        if n > head:
+            bits[:n - head] = bytes(n - head)
+
+    def to_list(self) -> List:
+        return [self.top, self.bits.hex()]
+
+    @classmethod
+    def from_list(cls, d: List) -> "ReplayWindow":
+        w = cls(len(d[1]) * 4)
+        w.top = d[0]
+        w.bits[:] = bytes.fromhex(d[1])
+        return w
+
+
+def message_key(update: Update) -> Optional[tuple]:
+    """(chat_id, message_id) нового сообщения; у правок и нажатий кнопок ключа нет (message_id у них не новый)."""
+    msg = update.message
+    if msg is None:
+        return None
+    return msg.chat_id, msg.message_id
+
+
+class Deduplicator:
+    """chats — chat_id -> ReplayWindow (обычно StateMap, чтобы окна переживали перезапуск)."""
+
+    def __init__(self, chats: MutableMapping[int, ReplayWindow], window: int = WINDOW, chat_window: int = CHAT_WINDOW) -> None:
+        self.updates = ReplayWindow(window, restart=True)
+        self.chats = chats
+        self.chat_window = chat_window
+        self.stats: Counter = Counter()  # по какому ключу отсечён повтор
+
+    def duplicate(self, update: Update) -> Optional[str]:
+        """Ключ, по которому апдейт — повтор ("update_id" или "message"), иначе None (и апдейт запомнен)."""
+        if not self.updates.add(update.update_id):
+            self.stats["update_id"] += 1
+            return "update_id"
+        key = message_key(update)
+        if key is None:
+            return None
+        chat_id, message_id = key
+        w = self.chats.get(chat_id)
+        if w is None:
+            w = self.chats[chat_id] = ReplayWindow(self.chat_window)
+        if not w.add(message_id):
+            self.stats["message"] += 1
+            return "message"
+        return None
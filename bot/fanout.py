@@ -0,0 +1,52 @@
+from __future__ import annotations
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple
+
+
+@dataclass
+class FanoutResult:
+    """Итог рассылки: кому доставлено, у кого ошибка и сколько это заняло."""
+    delivered: List[int] = field(default_factory=list)
+    failed: Dict[int, BaseException] = field(default_factory=dict)
+    latency: Dict[int, float] = field(default_factory=dict)  # uid -> секунды на получателя
+    results: Dict[int, Any] = field(default_factory=dict)  # uid -> что вернула отправка
+    total: float = 0.0  # секунды на всю рассылку
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def summary(self) -> str:
+        slowest = max(self.latency.values(), default=0.0)
+        return (
+            f"доставлено {len(self.delivered)}, ошибок {len(self.failed)}, "
+            f"всего {self.total * 1000:.0f} мс (макс. на получателя {slowest * 1000:.0f} мс)"
+        )
+
+
+async def fanout(jobs: Iterable[Tuple[int, Callable[[], Awaitable]]], limit: int = 10) -> FanoutResult:
+    """
+    Запускает отправки параллельно, не больше `limit` одновременно.
+    jobs: пары (uid, фабрика корутины). Исключение одного получателя не мешает остальным.
+    """
+    sem = asyncio.Semaphore(max(1, limit))
+    result = FanoutResult()
+    started = time.perf_counter()
+
+    async def run(uid: int, make: Callable[[], Awaitable]) -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                result.results[uid] = await make()
+            except Exception as e:
+                result.failed[uid] = e
+            else:
+                result.delivered.append(uid)
+            finally:
+                result.latency[uid] = time.perf_counter() - t0
+
+    await asyncio.gather(*(run(uid, make) for uid, make in jobs))
+    result.total = time.perf_counter() - started
+    return result
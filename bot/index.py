@@ -0,0 +1,51 @@
+from __future__ import annotations
+from typing import Dict, FrozenSet, Iterable, List, Set
+
+from liers.game import GameState
+
+
+def members(gs: GameState) -> FrozenSet[int]:
+    """Кто сейчас участвует в игре: живые игроки (после /stop — никто)."""
+    return frozenset(p.user_id for p in gs.players if gs.alive.get(p.user_id, False))
+
+
+class PlayerIndex:
+    """Обратный индекс user_id -> {chat_id}: в каких играх участвует пользователь.
+
+    После любого изменения состава игры (add_player, accuse/remove_dead, stop,
+    перезапись /newgame) нужно вызвать sync(gs) — обновляется только разница.
+    """
+
+    def __init__(self) -> None:
+        self._games: Dict[int, Set[int]] = {}
+        self._members: Dict[int, FrozenSet[int]] = {}
+
+    def set(self, chat_id: int, uids: Iterable[int]) -> None:
+        new = frozenset(uids)
+        old = self._members.get(chat_id, frozenset())
+        if new == old:
+            return
+        for uid in old - new:
+            chats = self._games.get(uid)
+            if chats is not None:
+                chats.discard(chat_id)
+                if not chats:
+                    del self._games[uid]
+        for uid in new - old:
+            self._games.setdefault(uid, set()).add(chat_id)
+        if new:
+            self._members[chat_id] = new
+        else:
+            self._members.pop(chat_id, None)
+
+    def sync(self, gs: GameState) -> None:
+        self.set(gs.chat_id, members(gs))
+
+    def drop(self, chat_id: int) -> None:
+        self.set(chat_id, ())
+
+    def games_of(self, uid: int) -> List[int]:
+        return sorted(self._games.get(uid, ()))
+
+    def __len__(self) -> int:
+        return len(self._games)
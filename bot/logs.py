@@ -0,0 +1,204 @@
+"""Логи без задержек event loop: обработчики только кладут запись в очередь,
+форматирует и пишет её фоновый поток (QueueHandler + QueueListener).
+
+Записи структурные: поля из FIELDS передаются через extra= и выводятся
+отдельно — "k=v" в текстовом формате или ключами в JSON (LOG_FORMAT=json).
+Частые события (extra={"event": ...}) прореживаются: из каждых N записей
+события пишется одна (LOG_SAMPLE="command=10,hand_dm=10"); предупреждения и
+ошибки пишутся всегда. Очередь ограничена: при переполнении запись
+отбрасывается и считается в stats, а обработчик не ждёт.
+"""
+from __future__ import annotations
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+FIELDS = ("event", "chat_id", "user_id", "command", "latency_ms", "outcome", "reason", "update_id")
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+def parse_sample(spec: str) -> Dict[str, int]:
+    """"command=10,hand_dm=5" -> {"command": 10, "hand_dm": 5}."""
+    rates: Dict[str, int] = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        event, _, every = part.partition("=")
+        rates[event.strip()] = max(1, int(every))
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает каждую N-ю запись события; WARNING и выше — все."""
+
+    def __init__(self, every: Dict[str, int]) -> None:
+        super().__init__()
+        self.every = every
+        self.seen: Counter = Counter()
+        self.dropped: Counter = Counter()
+
+    def take(self, event: str) -> int:
+        """Очередная запись события: 0 — прорежена, иначе n (пишется одна за n; 1 — все)."""
+        n = self.every.get(event)
+        if n is None or n == 1:
+            return 1
+        i = self.seen[event]
+        self.seen[event] = i + 1
+        if i % n:
+            self.dropped[event] += 1
+            return 0
+        return n
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "sampled", None):  # уже решено через sample() до создания записи
+            return True
+        event = getattr(record, "event", None)
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+        n = self.take(event)
+        if n > 1:
+            record.sampled = n  # одна запись за n
+        return n > 0
+
+
+def fields_of(record: logging.LogRecord) -> Dict[str, object]:
+    """Структурные поля записи (только заданные)."""
+    out = {k: getattr(record, k) for k in FIELDS if getattr(record, k, None) is not None}
+    if getattr(record, "sampled", None):
+        out["sampled"] = record.sampled
+    return out
+
+
+class TextFormatter(logging.Formatter):
+    """Обычная строка лога и поля "k=v" после сообщения."""
+
+    def __init__(self) -> None:
+        super().__init__(TEXT_FORMAT)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        fields = fields_of(record)
+        return line + "".join(f" {k}={v}" for k, v in fields.items()) if fields else line
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись — одна строка JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **fields_of(record),
+        }
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class _Enqueue(logging.handlers.QueueHandler):
+    """QueueHandler без форматирования в потоке event loop и без ожидания места в очереди."""
+
+    def __init__(self, q: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Подставить аргументы сейчас (они могут измениться), а трассировку и
+        # всё остальное форматирует фоновый поток
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class Pipeline:
+    """Установленный конвейер: очередь, фоновый поток и счётчики потерь."""
+
+    def __init__(self, handler: _Enqueue, listener: logging.handlers.QueueListener, sampler: SamplingFilter) -> None:
+        self.handler = handler
+        self.listener = listener
+        self.sampler = sampler
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"full": self.handler.dropped, **{f"sampled_out.{k}": v for k, v in self.sampler.dropped.items()}}
+
+    @property
+    def depth(self) -> int:
+        return self.handler.queue.qsize()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Дождаться, пока фоновый поток разберёт очередь (тесты, бенчмарки)."""
+        deadline = time.monotonic() + timeout
+        while self.handler.queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def stop(self) -> None:
+        """Записать всё, что в очереди, и остановить поток; корневой логгер отвязывается."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+        logging.getLogger().removeHandler(self.handler)
+
+
+_PIPELINE: Optional[Pipeline] = None
+
+
+def setup(
+    level: str = "INFO", fmt: str = "text", sample: str = "", maxsize: int = 10000,
+    outputs: Optional[List[logging.Handler]] = None, force: bool = False,
+) -> Optional[Pipeline]:
+    """
+    Повесить конвейер на корневой логгер. Как logging.basicConfig: если у
+    корневого логгера уже есть обработчики (логи настроил кто-то другой),
+    ничего не делает, пока не передан force=True. outputs — куда писать
+    (по умолчанию stderr).
+    """
+    global _PIPELINE
+    root = logging.getLogger()
+    if root.handlers and not force:
+        return None
+    if _PIPELINE is not None:
+        _PIPELINE.stop()
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+    formatter = JsonFormatter() if fmt == "json" else TextFormatter()
+    outputs = outputs or [logging.StreamHandler(sys.stderr)]
+    for out in outputs:
+        out.setFormatter(formatter)
+    handler = _Enqueue(queue.Queue(maxsize))
+    sampler = SamplingFilter(parse_sample(sample))
+    handler.addFilter(sampler)
+    listener = logging.handlers.QueueListener(handler.queue, *outputs, respect_handler_level=True)
+    listener.start()
+    root.addHandler(handler)
+    root.setLevel(level)
+    _PIPELINE = Pipeline(handler, listener, sampler)
+    atexit.register(_PIPELINE.stop)  # поток фоновый: без этого хвост очереди пропал бы при выходе
+    return _PIPELINE
+
+
+def pipeline() -> Optional[Pipeline]:
+    return _PIPELINE
+
+
+def sample(event: str) -> int:
+    """Прореживание до создания записи (для самых частых событий: прореженная ничего не стоит).
+
+    0 — не писать; иначе передать extra={"sampled": n} при n > 1, чтобы фильтр не прореживал второй раз.
+    """
+    return _PIPELINE.sampler.take(event) if _PIPELINE is not None else 1
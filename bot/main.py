@@ -1,50 +1,388 @@
 from __future__ import annotations
 import asyncio
+import itertools
 import logging
 import os
-from typing import Dict
-import secrets
+import time
+from collections import Counter
+from typing import Container, Dict, Iterable, List, Optional, Set, Tuple
 
 from dotenv import load_dotenv
-from telegram import Update
+from telegram import ReplyParameters, Update
 from telegram.constants import ChatType, ParseMode
+from telegram.error import BadRequest, Forbidden, TelegramError
+from telegram.request import BaseRequest, HTTPXRequest
 from telegram.ext import (
-    Application, CommandHandler, ContextTypes, MessageHandler, filters
+    Application, ApplicationHandlerStop, CallbackContext, CallbackQueryHandler, CommandHandler, ContextTypes, MessageHandler,
+    TypeHandler, filters,
 )
 
 from liers.game import GameState
+from liers.compact import CompactGameState
+from liers.lobby import LargeLobbyGameState
+from liers.events import EventLog
 from liers.models import Rank
+from liers import policy
+from liers.odds import odds
+from liers.rng import SYSTEM_RNG
+from liers.timing import set_observer
+from bot import board, logs, snapshot
+from bot.spectators import Broadcaster, accuse_line, play_line, start_line
+from bot.dedup import Deduplicator, ReplayWindow
+from bot.fanout import fanout
+from bot.storage import Eviction, StateMap, StateStore, open_backend
+from bot.index import PlayerIndex, members
+from bot.concurrency import ChatSerializingProcessor, KeyedLocks
+from bot.outbox import OutboxLimiter, Superseded
+from bot.metrics import REGISTRY, MeteredRequest, instrument, observe_core, serve_metrics
 
 load_dotenv()
-logging.basicConfig(level=logging.INFO)
+# Логи пишет фоновый поток (bot/logs.py); LOG_SAMPLE — «событие=N»: из N записей пишется одна.
+# Запись на каждую успешную команду — только при LOG_LEVEL=DEBUG
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "command=10,hand_dm=10")
+LOG_QUEUE = int(os.getenv("LOG_QUEUE", "10000"))
+logs.setup(LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE, LOG_QUEUE)
+# httpx пишет строку INFO на каждый запрос к Bot API
+logging.getLogger("httpx").setLevel(max(logging.getLevelName(LOG_LEVEL), logging.WARNING))
 logger = logging.getLogger("liers-bot")
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 if not BOT_TOKEN:
     raise SystemExit("BOT_TOKEN не задан. Создайте .env на основе .env.example")
 
+# Адрес Bot API (для локальной заглушки в бенчмарках), по умолчанию — api.telegram.org
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
+
+# Сколько личных сообщений с руками отправлять одновременно
+HAND_DM_CONCURRENCY = int(os.getenv("HAND_DM_CONCURRENCY", "10"))
+
+# Как обновлять руку в личке: edit — править прошлое сообщение (1 вызов API, 0 если текст
+# не изменился), resend — удалить прошлое и прислать новое (2 вызова, как раньше)
+HAND_DM_MODE = os.getenv("HAND_DM_MODE", "edit")
+# Сообщение старше этого не правим, а присылаем новое: правку далеко вверху переписки не видно
+HAND_EDIT_MAX_AGE = float(os.getenv("HAND_EDIT_MAX_AGE", str(47 * 3600)))
+
+# Сколько вызовов API экономит каждый исход _send_hand_dm по сравнению с delete+send
+HAND_DM_SAVED = {"sent": 0, "replaced": 0, "edited": 1, "unchanged": 2, "resent": -1, "coalesced": 2}
+HAND_DM_STATS: Counter = Counter()  # исход -> сколько раз ("error" — отправка не удалась)
+HAND_DM_SECONDS = REGISTRY.histogram("liers_hand_dm_seconds", "Время показа руки в личке", ["outcome"])
+REGISTRY.collected(
+    "liers_hand_dm_total", "Показы руки в личке по исходам (error — ошибка отправки)", "counter",
+    lambda: {(k,): v for k, v in HAND_DM_STATS.items()}, ["outcome"],
+)
+
+# Очередь исходящих (bot/outbox.py): лимиты Telegram — ~30 сообщений/с всего и 20/мин в группу.
+# OUTBOX=0 — отправлять напрямую, как раньше (бенчмарки на заглушке)
+OUTBOX = os.getenv("OUTBOX", "1") == "1"
+OUTBOX_GLOBAL_RATE = float(os.getenv("OUTBOX_GLOBAL_RATE", "30"))
+OUTBOX_GROUP_PER_MINUTE = float(os.getenv("OUTBOX_GROUP_PER_MINUTE", "20"))
+OUTBOX_PRIVATE_RATE = float(os.getenv("OUTBOX_PRIVATE_RATE", "1"))
+
+# Режим доски (bot/board.py): вместо сообщения на каждый ход — одно закреплённое сообщение
+# в группе, которое правится не чаще раза в BOARD_DEBOUNCE секунд; ходы — инлайн-кнопками
+BOARD_MODE = os.getenv("BOARD_MODE", "0") == "1"
+BOARD_DEBOUNCE = float(os.getenv("BOARD_DEBOUNCE", "0.7"))
+# Зрители (/watch): строки ленты копятся WATCH_WINDOW с и уходят одним сообщением,
+# зрителю — не чаще раза в WATCH_INTERVAL с, одновременно — не больше WATCH_CONCURRENCY отправок
+WATCH_WINDOW = float(os.getenv("WATCH_WINDOW", "1"))
+WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", "3"))
+WATCH_CONCURRENCY = int(os.getenv("WATCH_CONCURRENCY", "8"))
+# /status не повторяется, если игра не менялась, а прошлый ответ /status ещё на экране:
+# после него в чате не больше STATUS_REPEAT_GAP сообщений (0 — отвечать всегда).
+# Вместо повтора — короткий ответ со ссылкой на прошлый статус
+STATUS_REPEAT_GAP = int(os.getenv("STATUS_REPEAT_GAP", "4"))
+
+# Компьютерных игроков (/addbot) в одной игре — не больше; ходов компьютеров подряд за апдейт
+MAX_COMPUTERS = int(os.getenv("MAX_COMPUTERS", "4"))
+MAX_COMPUTER_MOVES = int(os.getenv("MAX_COMPUTER_MOVES", "60"))
+# Ходы компьютеров подряд объявляются одним сообщением; дольше COMPUTER_SEND_BUDGET секунд
+# чат его не ждёт (отправка продолжается в фоне, а следующая команда чата уже обрабатывается)
+COMPUTER_SEND_BUDGET = float(os.getenv("COMPUTER_SEND_BUDGET", "3"))
+
+# Метрики Prometheus: GET http://METRICS_LISTEN:METRICS_PORT/metrics (0 — не поднимать сервер)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+
+# Сколько апдейтов обрабатывать одновременно (одного чата — всё равно по очереди)
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "256"))
+
+# Представление колоды и рук: classic (списки Card), compact (bytearray, меньше памяти)
+# или large (compact на 20+ игроков: несколько колод, ход и выбывание за O(1))
+GAME_ENGINE = os.getenv("GAME_ENGINE", "classic")
+Engine = {"compact": CompactGameState, "large": LargeLobbyGameState}.get(GAME_ENGINE, GameState)
+
+# Где хранить состояние между перезапусками: sqlite (по умолчанию) или memory
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite")
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "liers_state.db")
+
+STORE = StateStore(open_backend(STATE_BACKEND, STATE_DB_PATH))
+
+# Выгрузка простаивающих игр/сессий из памяти: через STATE_TTL секунд без обращений
+# или сверх STATE_MAX_ENTRIES объектов на вид (LRU). Проверка раз в EVICT_INTERVAL секунд.
+# STATE_SPILL=1 — активные игры остаются в хранилище и загрузятся при следующей команде.
+EVICTION = Eviction(
+    ttl=float(os.getenv("STATE_TTL", str(24 * 3600))),
+    max_entries=int(os.getenv("STATE_MAX_ENTRIES", "10000")),
+    spill=os.getenv("STATE_SPILL", "1" if STATE_BACKEND == "sqlite" else "0") == "1",
+)
+EVICT_INTERVAL = float(os.getenv("EVICT_INTERVAL", "60"))
+
+# Журнал ходов по чатам (liers/events.py): каталог с файлами <chat_id>.lev, пустое значение — выключен.
+# По умолчанию ведётся вместе с sqlite-хранилищем; партию можно восстановить replay() на любой ход.
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR", "liers_events" if STATE_BACKEND == "sqlite" else "")
+EVENTS: Optional[EventLog] = EventLog(EVENT_LOG_DIR) if EVENT_LOG_DIR else None
+
+# Остановка (SIGTERM): сколько ждать обработчиков и досылки очереди исходящих, секунды.
+# Затем состояние и недоставленные руки пишутся в SNAPSHOT_PATH (пустое значение — без снимка);
+# при старте снимок загружается, а руки досылаются.
+SHUTDOWN_STOP_TIMEOUT = float(os.getenv("SHUTDOWN_STOP_TIMEOUT", "15"))
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "8"))
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "liers_snapshot.bin")
+
+
+def _new_game(chat_id: int) -> GameState:
+    gs = Engine(chat_id=chat_id)
+    if EVENTS is not None:
+        EVENTS.journal(chat_id, SYSTEM_RNG).attach(gs).journal.record("new")
+    return gs
+
+
+def _load_game(d: dict) -> GameState:
+    gs = Engine.from_dict(d)
+    if EVENTS is not None:
+        EVENTS.journal(gs.chat_id, SYSTEM_RNG).attach(gs)
+    return gs
+
+
+def _game_active(gs: GameState) -> bool:
+    """Идёт игра или собирается лобби (а не закончена/остановлена)."""
+    if gs.started:
+        return True
+    if gs.hands:
+        return False  # игра закончилась победой
+    return not gs.players or any(gs.alive.values())
+
+
+def _game_evicted(chat_id: int, gs: GameState, spilled: bool) -> None:
+    BOARD_NOTES.pop(chat_id, None)  # строка доски — только для игры в памяти
+    SPECTATORS.close(chat_id)  # игра простаивает: зрители, если нужно, подпишутся снова
+    if not spilled:
+        PLAYER_GAMES.drop(chat_id)
+
 
 # Игры по chat_id
-GAMES: Dict[int, GameState] = {}
+GAMES: StateMap = STORE.map(
+    "game", dump=Engine.to_dict, load=_load_game, is_active=_game_active,
+    meta=lambda gs: sorted(members(gs)), on_evict=_game_evicted,
+)
 
-# Последние сообщения с рукой в личке (user_id -> message_id)
-LAST_HAND_MSG: Dict[int, int] = {}
+# user_id -> игры, где он участвует (для /hand без перебора всех GAMES).
+# Для ещё не восстановленных игр состав берётся из meta хранилища.
+PLAYER_GAMES = PlayerIndex()
+for _chat_id, _uids in GAMES.stored_meta().items():
+    PLAYER_GAMES.set(_chat_id, _uids)
 
-async def _send_hand_dm(context: ContextTypes.DEFAULT_TYPE, uid: int, text: str):
-    """Удаляет прошлое сообщение с рукой в личке и отправляет новое, сохраняя message_id."""
-    # Сначала пробуем удалить прошлое сообщение (если было)
-    prev_id = LAST_HAND_MSG.get(uid)
-    if prev_id is not None:
-        try:
-            await context.bot.delete_message(chat_id=uid, message_id=prev_id)
-        except Exception:
-            pass  # игнорируем если нельзя удалить/нет доступа
-    # Отправляем новое
+# Последние сообщения с рукой в личке: user_id -> [message_id, текст, время отправки]
+LAST_HAND_MSG: StateMap = STORE.map("hand_msg", mutable=False)
+
+# Доски игр: chat_id -> [message_id, текст, вид клавиатуры]
+BOARD_MSG: StateMap = STORE.map("board", mutable=False)
+BOARD = board.BoardUpdater(BOARD_MSG, debounce=BOARD_DEBOUNCE)
+# chat_id -> последнее событие игры (строка внизу доски); забывается, когда доска
+# оконченной игры отрисована или игра выгружена из памяти
+BOARD_NOTES: Dict[int, str] = {}
+# chat_id -> [message_id, текст] последнего ответа на /status (выгружается вместе с остальным состоянием)
+STATUS_MSG: StateMap = STORE.map("status_msg", mutable=False)
+STATUS_STATS: Counter = Counter()
+REGISTRY.collected(
+    "liers_status_replies_total", "Ответы на /status (unchanged — короткая ссылка на прошлый, он ещё виден)", "counter",
+    lambda: {(k,): v for k, v in STATUS_STATS.items()}, ["outcome"],
+)
+REGISTRY.collected(
+    "liers_board_updates_total", "Публикации досок по исходам (coalesced — слиты с более новой)", "counter",
+    lambda: {(k,): v for k, v in BOARD.stats.items()}, ["outcome"],
+)
+
+SPECTATORS = Broadcaster(WATCH_WINDOW, WATCH_INTERVAL, concurrency=WATCH_CONCURRENCY)
+REGISTRY.collected(
+    "liers_spectator_messages_total", "Ленты зрителей по исходам (shared — пачка собрана для другого зрителя)",
+    "counter", lambda: {(k,): v for k, v in SPECTATORS.stats.items()}, ["outcome"],
+)
+
+
+def _publish_outcome(bot, gs: GameState, line: str) -> None:
+    """Исход обвинения или остановка — в ленту зрителей; кончившуюся игру они больше не смотрят."""
+    SPECTATORS.publish(bot, gs.chat_id, line)
+    if not gs.started:
+        SPECTATORS.close(gs.chat_id)
+
+
+# Повторно доставленные апдейты: окно update_id и окна message_id по чатам
+# (chat_id -> ReplayWindow, пишутся вместе с изменёнными играми и загружаются после перезапуска;
+# простаивающие при выгрузке удаляются — столько Telegram повторы не присылает)
+SEEN: StateMap = STORE.map("seen", dump=ReplayWindow.to_list, load=ReplayWindow.from_list, spill=False, deferred=True)
+DEDUP = Deduplicator(SEEN)  # build_app() заводит новый: нумерация update_id своя у каждого запуска
+REGISTRY.collected(
+    "liers_duplicate_updates_total", "Отсечённые повторы апдейтов по ключу", "counter",
+    lambda: {(k,): v for k, v in DEDUP.stats.items()}, ["key"],
+)
+
+# Игрок может быть в нескольких группах: руки ему шлём по одной, чтобы не потерять LAST_HAND_MSG
+HAND_LOCKS = KeyedLocks()
+# uid -> номер последней поставленной в очередь руки: более старые не отправляем
+HAND_GEN: Dict[int, int] = {}
+_HAND_SEQ = itertools.count(1)
+# (chat_id, user_id) рук, которые поставлены в рассылку, но ещё не отправлены: попадают в снимок
+HAND_PENDING: Set[Tuple[int, int]] = set()
+
+
+def _last_hand(uid: int) -> Tuple[Optional[int], Optional[str], float]:
+    prev = LAST_HAND_MSG.get(uid)
+    if prev is None:
+        return None, None, 0.0
+    if isinstance(prev, int):  # сохранено до появления правки — только message_id
+        return prev, None, time.time()
+    return prev[0], prev[1], prev[2]
+
+
+def _message_gone(e: BadRequest) -> bool:
+    """Сообщение удалено пользователем или его уже нельзя править."""
+    text = e.message.lower()
+    return "not found" in text or "can't be edited" in text
+
+
+async def _send_hand_dm(context: ContextTypes.DEFAULT_TYPE, uid: int, text: str, fresh: bool = False) -> str:
+    """Показывает руку в личке; возвращает исход (ключ HAND_DM_SAVED).
+
+    В режиме edit правит прошлое сообщение, а если текст тот же — ничего не шлёт.
+    Новое сообщение присылается, если прошлого нет, оно пропало или слишком старое,
+    либо fresh=True (игрок сам попросил /hand); старое при этом удаляется параллельно
+    с отправкой. Если, пока рука ждала очереди, игроку уже поставлена более новая,
+    старая не отправляется вовсе ("coalesced"). Ошибка отправки пробрасывается.
+    """
+    t0 = time.perf_counter()
+    gen = HAND_GEN[uid] = next(_HAND_SEQ)
+    stale = None if fresh else (lambda: HAND_GEN.get(uid) != gen)
+    outcome = "error"
     try:
-        msg = await context.bot.send_message(chat_id=uid, text=text)
-        LAST_HAND_MSG[uid] = msg.message_id
-    except Exception:
-        pass
+        async with HAND_LOCKS.hold(uid):
+            if stale is not None and stale():
+                outcome = "coalesced"
+            else:
+                try:
+                    outcome = await _deliver_hand(context, uid, text, fresh, stale)
+                except Superseded:
+                    outcome = "coalesced"
+    finally:
+        if HAND_GEN.get(uid) == gen:
+            del HAND_GEN[uid]
+        seconds = time.perf_counter() - t0
+        HAND_DM_STATS[outcome] += 1
+        HAND_DM_SECONDS.observe(seconds, outcome)
+        logger.info("Рука в личке", extra={
+            "event": "hand_dm", "user_id": uid, "outcome": outcome, "latency_ms": round(seconds * 1000, 2),
+        })
+    return outcome
+
+
+def _log_hand_failure(uid: int, chat_id: Optional[int], e: BaseException) -> None:
+    """Почему рука не дошла: не начинал диалог с ботом, ошибка Bot API или ошибка в коде."""
+    fields = {"event": "hand_dm_failed", "user_id": uid, "chat_id": chat_id,
+              "outcome": type(e).__name__, "reason": str(e)}
+    if isinstance(e, Forbidden):  # Telegram не даёт написать первым — обычное дело
+        logger.info("Рука не доставлена", extra=fields)
+    elif isinstance(e, TelegramError):
+        logger.warning("Рука не доставлена", extra=fields)
+    else:
+        logger.error("Рука не доставлена", extra=fields, exc_info=e)
+
+
+async def _show_hand(context: ContextTypes.DEFAULT_TYPE, uid: int, text: str, chat_id: Optional[int] = None,
+                     fresh: bool = False) -> None:
+    """_send_hand_dm одному игроку из команды: ошибка не прерывает команду, а пишется в лог."""
+    key = (chat_id, uid)
+    if chat_id is not None:
+        HAND_PENDING.add(key)
+    try:
+        await _send_hand_dm(context, uid, text, fresh=fresh)
+    except Exception as e:
+        _log_hand_failure(uid, chat_id, e)
+    HAND_PENDING.discard(key)  # при отмене (остановка бота) остаётся в снимке
+
+
+async def _deliver_hand(context: ContextTypes.DEFAULT_TYPE, uid: int, text: str, fresh: bool, stale) -> str:
+    bot = context.bot
+    rl = {"superseded": stale} if stale is not None and bot.rate_limiter else None
+    prev_id, prev_text, sent_at = _last_hand(uid)
+    outcome = "sent" if prev_id is None else "replaced"
+    editable = HAND_DM_MODE == "edit" and not fresh and time.time() - sent_at < HAND_EDIT_MAX_AGE
+    if prev_id is not None and editable:
+        outcome = "unchanged" if text == prev_text else "edited"
+        if outcome == "edited":
+            try:
+                await bot.edit_message_text(chat_id=uid, message_id=prev_id, text=text, rate_limit_args=rl)
+            except BadRequest as e:
+                if "not modified" in e.message.lower():
+                    outcome = "unchanged"
+                elif _message_gone(e):
+                    outcome = "resent"
+                else:
+                    raise
+        if outcome != "resent":
+            LAST_HAND_MSG[uid] = [prev_id, text, sent_at]
+            return outcome
+
+    delete = None
+    if outcome == "replaced":
+        delete = asyncio.ensure_future(bot.delete_message(chat_id=uid, message_id=prev_id))
+    try:
+        msg = await bot.send_message(chat_id=uid, text=text, rate_limit_args=rl)
+        LAST_HAND_MSG[uid] = [msg.message_id, text, time.time()]
+    finally:
+        if delete is not None:
+            try:
+                await delete
+            except Exception as e:  # уже удалено или нет доступа — новое сообщение всё равно есть
+                logger.debug("Не удалось удалить руку %s у %s: %s", prev_id, uid, e)
+    return outcome
+
+
+def is_computer(uid: int) -> bool:
+    """Компьютерные игроки — отрицательные id (у пользователей Telegram id положительные)."""
+    return uid < 0
+
+
+async def _send_hands(context: ContextTypes.DEFAULT_TYPE, gs: GameState, header: str,
+                      only: Optional[Set[int]] = None):
+    """Рассылает руки всем живым игрокам игры (или только игрокам из only)
+    параллельно, с ограничением HAND_DM_CONCURRENCY."""
+    def job(uid: int):
+        async def send():
+            # ошибка — тоже исход (повторять после перезапуска незачем); при отмене
+            # (остановка бота) рука остаётся в HAND_PENDING и попадёт в снимок
+            try:
+                outcome = await _send_hand_dm(context, uid, f"{header}\n{gs.hand_str(uid)}")
+            except Exception:
+                HAND_PENDING.discard((gs.chat_id, uid))
+                raise
+            HAND_PENDING.discard((gs.chat_id, uid))
+            return outcome
+        return send
+
+    uids = [p.user_id for p in gs.players
+            if gs.alive.get(p.user_id, False) and not is_computer(p.user_id) and (only is None or p.user_id in only)]
+    HAND_PENDING.update((gs.chat_id, uid) for uid in uids)
+    res = await fanout(((uid, job(uid)) for uid in uids), limit=HAND_DM_CONCURRENCY)
+    for uid, e in res.failed.items():
+        _log_hand_failure(uid, gs.chat_id, e)
+    saved = sum(HAND_DM_SAVED[o] for o in res.results.values())
+    logger.info(
+        "Руки в чат %s: %s, сэкономлено вызовов API: %s", gs.chat_id, res.summary(), saved,
+        extra={"event": "hands", "chat_id": gs.chat_id, "latency_ms": round(res.total * 1000, 2)},
+    )
+    return res
 
 # === Dealer mode (работает в личке с ботом) ===
 class DealerSession:
@@ -53,6 +391,16 @@ class DealerSession:
         self.players: dict[str, bool] = {}  # name -> alive
         self.revolvers: dict[str, int] = {}
 
+    def to_dict(self) -> dict:
+        return {"players": list(self.players.items()), "revolvers": list(self.revolvers.items())}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "DealerSession":
+        sess = cls()
+        sess.players = {n: a for n, a in d["players"]}
+        sess.revolvers = {n: r for n, r in d["revolvers"]}
+        return sess
+
     def reset_revolver(self, name: str | None = None) -> None:
         """Перезарядить барабан(ы). Если name передан — только для этого игрока, иначе для всех."""
         if name is None:
@@ -100,7 +448,7 @@ class DealerSession:
         remaining = self.revolvers.get(name, 6)
         if remaining < 1:
             remaining = 1
-        bullet = (secrets.randbelow(remaining) == 0)
+        bullet = (SYSTEM_RNG.randbelow(remaining) == 0)
 
         if bullet:
             self.players[name] = False
@@ -115,7 +463,9 @@ class DealerSession:
             return (msg, False)
 
 # Хранилище сессий дилера: по user_id (личка)
-DEALERS: Dict[int, DealerSession] = {}
+DEALERS: StateMap = STORE.map(
+    "dealer", dump=DealerSession.to_dict, load=DealerSession.from_dict, is_active=lambda s: bool(s.players)
+)
 
 def _is_dm(update: Update) -> bool:
     chat = update.effective_chat
@@ -183,6 +533,151 @@ def in_group(update: Update) -> bool:
     return chat and chat.type in (ChatType.GROUP, ChatType.SUPERGROUP)
 
 
+def _board_view(chat_id: int) -> Tuple[str, Optional[str]]:
+    """Текст доски и её клавиатура: лобби, игра или никакой (игра окончена)."""
+    gs = GAMES.get(chat_id)
+    if gs is None:
+        BOARD_NOTES.pop(chat_id, None)
+        return "Игра завершена. /newgame — новое лобби.", None
+    kind = board.GAME if gs.started else (board.LOBBY if _game_active(gs) else None)
+    # итог оконченной игры остаётся на доске, а в памяти больше не нужен
+    note = BOARD_NOTES.get(chat_id) if kind else BOARD_NOTES.pop(chat_id, None)
+    return "🃏 Liar's Deck\n" + gs.status() + (f"\n\n{note}" if note else ""), kind
+
+
+async def _announce(update: Update, context: ContextTypes.DEFAULT_TYPE, gs: GameState, text: str, note: Optional[str] = None):
+    """Событие игры: ответом в группе или, в режиме доски, строкой note (по умолчанию text) на доске."""
+    if not BOARD_MODE:
+        return await update.effective_message.reply_text(text)
+    BOARD_NOTES[gs.chat_id] = note or text
+    BOARD.touch(context.bot, gs.chat_id, lambda: _board_view(gs.chat_id))
+
+
+def _started_note(gs: GameState) -> str:
+    return f"Игра началась! Тема: {gs.current_topic.value}\nПервый ход: @{gs.current_player().username}"
+
+
+def _played_note(gs: GameState, name: str, claimed: Rank) -> str:
+    return f"@{name} положил карту и заявил {claimed.value}. Обвинить может @{gs.current_player().username}."
+
+
+# Предел длины сообщения Telegram
+MESSAGE_LIMIT = 4096
+# Объявления ходов компьютеров, которые досылаются в фоне (ссылки, чтобы задачи не собрал GC)
+COMPUTER_SENDS: Set[asyncio.Future] = set()
+
+
+def _chunks(lines: List[str], limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Склеить строки в сообщения не длиннее limit."""
+    out: List[str] = []
+    for line in lines:
+        if out and len(out[-1]) + 2 + len(line) <= limit:
+            out[-1] += "\n\n" + line
+        else:
+            out.append(line[:limit])
+    return out
+
+
+async def _computer_turns(update: Update, context: ContextTypes.DEFAULT_TYPE, gs: GameState):
+    """Ходы компьютеров (liers/policy.py), пока очередь не дойдёт до человека или партия не кончится.
+
+    Ходы считаются сразу, а объявляются одним сообщением (и одной рассылкой рук,
+    если было обвинение): иначе при лимите ~20 сообщений в минуту на группу стол
+    компьютеров держал бы чат, в том числе /stop, минутами. Отправку чат ждёт не
+    дольше COMPUTER_SEND_BUDGET секунд.
+    """
+    lines: List[str] = []
+    note = None
+    redealt = False
+    for _ in range(MAX_COMPUTER_MOVES):
+        if not gs.started:
+            break
+        me = gs.current_player()
+        if not is_computer(me.user_id):
+            break
+        decision = policy.decide(gs, me.user_id)
+        if decision is None:  # ходить нечем и обвинять некого — как и людям, поможет /stop
+            break
+        action, idx, claimed = decision
+        if action == "play":
+            SPECTATORS.publish(context.bot, gs.chat_id, play_line(gs, gs.play(me.user_id, idx, claimed)))
+            lines.append(
+                f"@{me.username} положил карту лицом вниз и заявил {claimed.value}.\n"
+                f"Обвинить может следующий игрок: @{gs.current_player().username}."
+            )
+            note = _played_note(gs, me.username, claimed)
+            continue
+        msg, _, _ = gs.accuse(me.user_id)
+        redealt = True
+        PLAYER_GAMES.sync(gs)
+        _publish_outcome(context.bot, gs, accuse_line(gs, msg))
+        lines.append(msg + f"\nНовая тема: {gs.current_topic.value}" if gs.started else msg)
+        note = None
+    if not lines:
+        return
+    sends = [_announce(update, context, gs, text, note=note) for text in _chunks(lines)]
+    if redealt and gs.started:
+        sends.append(_send_hands(context, gs, f"Группа {gs.chat_id}. Тема: {gs.current_topic.value}"))
+    done = asyncio.ensure_future(asyncio.gather(*sends))
+    COMPUTER_SENDS.add(done)
+    done.add_done_callback(COMPUTER_SENDS.discard)
+    try:
+        await asyncio.wait_for(asyncio.shield(done), COMPUTER_SEND_BUDGET)
+    except asyncio.TimeoutError:
+        logger.info("Ходы компьютеров в чате %s объявляются в фоне", gs.chat_id,
+                    extra={"event": "computer_turns", "chat_id": gs.chat_id, "outcome": "background"})
+
+
+async def on_board_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Кнопка на доске: те же действия, что /join, /startgame, /play, /accuse, /hand."""
+    q = update.callback_query
+    try:
+        action, idx, claimed = board.parse(q.data)
+    except ValueError:
+        return await q.answer("Неизвестная кнопка.")
+    chat_id = q.message.chat.id if q.message else None
+    gs = GAMES.get(chat_id) if chat_id is not None else None
+    if gs is None or not BOARD.is_current(chat_id, q.message.message_id):
+        return await q.answer("Эта доска устарела.", show_alert=True)
+    uid = q.from_user.id
+    name = q.from_user.username or q.from_user.full_name
+    if action == "hand":  # рука видна только нажавшему
+        return await q.answer(gs.hand_str(uid)[:200], show_alert=True)
+    try:
+        if action == "join":
+            if gs.started:
+                raise ValueError("Игра уже идёт.")
+            gs.add_player(uid, name)
+            PLAYER_GAMES.sync(gs)
+            BOARD_NOTES[chat_id] = f"@{name} присоединился."
+        elif action == "start":
+            gs.start()
+            BOARD_NOTES[chat_id] = _started_note(gs)
+            SPECTATORS.publish(context.bot, chat_id, start_line(gs))
+        elif action == "play":
+            lp = gs.play(uid, idx, claimed)
+            BOARD_NOTES[chat_id] = _played_note(gs, name, claimed)
+            SPECTATORS.publish(context.bot, chat_id, play_line(gs, lp))
+        else:
+            msg, _, _ = gs.accuse(uid)
+            PLAYER_GAMES.sync(gs)
+            BOARD_NOTES[chat_id] = accuse_line(gs, msg)
+            _publish_outcome(context.bot, gs, BOARD_NOTES[chat_id])
+    except ValueError as e:
+        return await q.answer(f"Нельзя: {e}", show_alert=True)
+    BOARD.touch(context.bot, chat_id, lambda: _board_view(chat_id))
+
+    if action == "play":
+        await q.answer()
+        await _show_hand(context, uid, gs.hand_str(uid), chat_id)
+    elif action != "join" and gs.started:
+        await asyncio.gather(q.answer(), _send_hands(context, gs, f"Группа {chat_id}. Тема: {gs.current_topic.value}"))
+    else:
+        await q.answer()
+    if action != "join":
+        await _computer_turns(update, context, gs)
+
+
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.effective_message.reply_text(
         "Привет! Я Liar’s Deck бот.\n"
@@ -195,8 +690,13 @@ async def cmd_newgame(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not in_group(update):
         return await update.effective_message.reply_text("Создавать игру нужно в группе.")
     chat_id = update.effective_chat.id
-    GAMES[chat_id] = GameState(chat_id=chat_id)
-    await update.effective_message.reply_text("Создано новое лобби. Игроки: используйте /join. Организатор: /startgame.")
+    GAMES[chat_id] = _new_game(chat_id)
+    PLAYER_GAMES.sync(GAMES[chat_id])
+    BOARD.forget(chat_id)
+    await _announce(
+        update, context, GAMES[chat_id], "Создано новое лобби. Игроки: используйте /join. Организатор: /startgame.",
+        note="Создано новое лобби: нажмите «Присоединиться».",
+    )
 
 
 async def cmd_join(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -207,8 +707,30 @@ async def cmd_join(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not gs:
         return await update.effective_message.reply_text("Сначала создайте игру: /newgame")
     user = update.effective_user
-    gs.add_player(user.id, user.username or user.full_name)
-    await update.effective_message.reply_text(f"@{user.username or user.full_name} присоединился.\n{gs.status()}")
+    name = user.username or user.full_name
+    gs.add_player(user.id, name)
+    PLAYER_GAMES.sync(gs)
+    await _announce(update, context, gs, f"@{name} присоединился.\n{gs.status()}", note=f"@{name} присоединился.")
+
+
+async def cmd_addbot(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not in_group(update):
+        return await update.effective_message.reply_text("Добавлять компьютер нужно в группе.")
+    chat_id = update.effective_chat.id
+    gs = GAMES.get(chat_id)
+    if not gs:
+        return await update.effective_message.reply_text("Сначала создайте игру: /newgame")
+    if gs.started:
+        return await update.effective_message.reply_text("Игра уже идёт — компьютер сядет в следующую.")
+    taken = {p.user_id for p in gs.players}
+    uid = next((-n for n in range(1, MAX_COMPUTERS + 1) if -n not in taken), None)
+    if uid is None:
+        return await update.effective_message.reply_text(f"Компьютеров уже {MAX_COMPUTERS}.")
+    gs.add_player(uid, f"Компьютер{-uid}")
+    PLAYER_GAMES.sync(gs)
+    await _announce(
+        update, context, gs, f"@Компьютер{-uid} присоединился.\n{gs.status()}", note=f"@Компьютер{-uid} присоединился."
+    )
 
 
 async def cmd_startgame(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -222,42 +744,72 @@ async def cmd_startgame(update: Update, context: ContextTypes.DEFAULT_TYPE):
         gs.start()
     except ValueError as e:
         return await update.effective_message.reply_text(f"Нельзя начать: {e}")
+    SPECTATORS.publish(context.bot, chat_id, start_line(gs))
 
-    # Разослать руки в личку
-    for p in gs.players:
-        try:
-            await _send_hand_dm(
-                context,
-                p.user_id,
-                f"Игра в группе {chat_id}\nТема: {gs.current_topic.value}\n{gs.hand_str(p.user_id)}",
-            )
-        except Exception:
-            pass  # если не писал боту — Telegram не даст написать первым
-
-    await update.effective_message.reply_text(
-        f"Игра началась! Тема: {gs.current_topic.value}\nПервый ход: @{gs.current_player().username}\n"
-        "Ход: /play <индекс_карты> <заявленный_ранг>, например: /play 0 K\n"
-        "Следующий после хода может сказать /accuse (обвинить)."
+    # Разослать руки в личку одновременно с ответом в группу
+    await asyncio.gather(
+        _send_hands(context, gs, f"Игра в группе {chat_id}\nТема: {gs.current_topic.value}"),
+        _announce(
+            update, context, gs,
+            f"Игра началась! Тема: {gs.current_topic.value}\nПервый ход: @{gs.current_player().username}\n"
+            "Ход: /play <индекс_карты> <заявленный_ранг>, например: /play 0 K\n"
+            "Следующий после хода может сказать /accuse (обвинить).",
+            note=_started_note(gs),
+        ),
     )
+    await _computer_turns(update, context, gs)
 
 
 async def cmd_hand(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # В личке: показать руку. В группе: подсказка.
     if in_group(update):
         return await update.effective_message.reply_text("Напишите мне в личку /hand — пришлю вашу руку.")
-    # в личке — нужен chat_id игры. Храним по последней?
-    # MVP: покажем руки во всех текущих играх, где вы участник (их обычно мало).
-    found = False
-    for gs in GAMES.values():
-        if any(p.user_id == update.effective_user.id for p in gs.players):
-            found = True
-            await _send_hand_dm(
-                context,
-                update.effective_user.id,
-                f"Группа {gs.chat_id}. Тема: {gs.current_topic.value if gs.current_topic else '—'}\n{gs.hand_str(update.effective_user.id)}",
-            )
-    if not found:
-        await update.effective_message.reply_text("Вы пока ни в одной игре. Присоединитесь в группе через /join.")
+    # в личке — одно сообщение с руками во всех играх, где вы участник
+    uid = update.effective_user.id
+    parts = []
+    for chat_id in PLAYER_GAMES.games_of(uid):
+        gs = GAMES.get(chat_id)
+        if gs is None:
+            continue
+        parts.append(
+            f"Группа {gs.chat_id}. Тема: {gs.current_topic.value if gs.current_topic else '—'}\n{gs.hand_str(uid)}"
+        )
+    if not parts:
+        return await update.effective_message.reply_text("Вы пока ни в одной игре. Присоединитесь в группе через /join.")
+    await _show_hand(context, uid, "\n\n".join(parts), fresh=True)
+
+
+def _odds_text(gs: GameState, uid: int) -> str:
+    chambers = gs.revolvers.get(uid, 6)
+    head = f"Группа {gs.chat_id}. Тема: {gs.current_topic.value if gs.current_topic else '—'}. Ваш барабан: 1/{chambers}"
+    lp = gs.last_play
+    if not gs.started or lp is None or lp.player_id == uid:
+        return head + "\nСейчас оспаривать нечего."
+    o = odds(
+        [gs._rank(c) for c in gs.hands.get(uid, ())], gs.current_topic, lp.claimed_rank, chambers,
+        claimer_hand=lp.hand_size, claimer_chambers=gs.revolvers.get(lp.player_id, 6),
+        full=gs.deck_composition(),
+    )
+    return (
+        f"{head}\n@{gs._name(lp.player_id)} заявил {lp.claimed_rank.value}.\n"
+        f"Точно: {lp.claimed_rank.value} у него был с вероятностью {o.held:.0%}.\n"
+        f"Оценка, если он блефует только без нужной карты:\n"
+        f"• заявка ложная: {o.lie:.0%}\n"
+        f"• при обвинении стреляете вы: {o.accuser_punished:.0%}\n"
+        f"• риск погибнуть, если обвините: {o.accuser_death:.1%}\n"
+        f"• риск для @{gs._name(lp.player_id)}, если обвините: {o.claimer_death:.1%}"
+    )
+
+
+async def cmd_odds(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Оценка шансов (модель liers/odds.py) по текущей заявке в каждой игре пользователя — в личке."""
+    if in_group(update):
+        return await update.effective_message.reply_text("Напишите мне в личку /odds — посчитаю ваши шансы.")
+    uid = update.effective_user.id
+    parts = [_odds_text(gs, uid) for gs in filter(None, map(GAMES.get, PLAYER_GAMES.games_of(uid)))]
+    if not parts:
+        return await update.effective_message.reply_text("Вы пока ни в одной игре. Присоединитесь в группе через /join.")
+    await update.effective_message.reply_text("\n\n".join(parts))
 
 
 async def cmd_play(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -281,16 +833,18 @@ async def cmd_play(update: Update, context: ContextTypes.DEFAULT_TYPE):
         lp = gs.play(uid, idx, claimed)
     except ValueError as e:
         return await update.effective_message.reply_text(f"Нельзя: {e}")
+    SPECTATORS.publish(context.bot, chat_id, play_line(gs, lp))
 
-    await update.effective_message.reply_text(
-        f"@{update.effective_user.username or update.effective_user.full_name} положил карту лицом вниз и заявил {claimed.value}.\n"
-        f"Обвинить может следующий игрок: @{gs.current_player().username}. Используйте /accuse"
+    name = update.effective_user.username or update.effective_user.full_name
+    await _announce(
+        update, context, gs,
+        f"@{name} положил карту лицом вниз и заявил {claimed.value}.\n"
+        f"Обвинить может следующий игрок: @{gs.current_player().username}. Используйте /accuse",
+        note=_played_note(gs, name, claimed),
     )
     # Попробуем прислать руку сыгравшему
-    try:
-        await _send_hand_dm(context, uid, gs.hand_str(uid))
-    except Exception:
-        pass
+    await _show_hand(context, uid, gs.hand_str(uid), chat_id)
+    await _computer_turns(update, context, gs)
 
 
 async def cmd_accuse(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -305,22 +859,17 @@ async def cmd_accuse(update: Update, context: ContextTypes.DEFAULT_TYPE):
         msg, shot, died_uid = gs.accuse(uid)
     except ValueError as e:
         return await update.effective_message.reply_text(f"Нельзя: {e}")
+    PLAYER_GAMES.sync(gs)
+    _publish_outcome(context.bot, gs, accuse_line(gs, msg))
 
-    # Показать новую тему после обвинения
-    await update.effective_message.reply_text(msg + f"\nНовая тема: {gs.current_topic.value}")
-
-    # Разослать новые руки всем живым игрокам (после полного редила в accuse)
+    # Показать новую тему после обвинения и одновременно
+    # разослать новые руки всем живым игрокам (после полного редила в accuse)
+    reply = _announce(update, context, gs, msg + f"\nНовая тема: {gs.current_topic.value}")
     if gs.started:
-        for p in gs.players:
-            if gs.alive.get(p.user_id, False):
-                try:
-                    await _send_hand_dm(
-                        context,
-                        p.user_id,
-                        f"Группа {chat_id}. Тема: {gs.current_topic.value}\n{gs.hand_str(p.user_id)}",
-                    )
-                except Exception:
-                    pass
+        await asyncio.gather(reply, _send_hands(context, gs, f"Группа {chat_id}. Тема: {gs.current_topic.value}"))
+    else:
+        await reply
+    await _computer_turns(update, context, gs)
 
 
 async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -329,7 +878,18 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     gs = GAMES.get(update.effective_chat.id)
     if not gs:
         return await update.effective_message.reply_text("Нет активной игры. /newgame")
-    await update.effective_message.reply_text(gs.status())
+    text = gs.status()
+    chat_id, asked = update.effective_chat.id, update.effective_message.message_id
+    prev = STATUS_MSG.get(chat_id)
+    if prev is not None and prev[1] == text and 0 < asked - prev[0] <= STATUS_REPEAT_GAP:
+        STATUS_STATS["unchanged"] += 1
+        return await context.bot.send_message(
+            chat_id, "Без изменений — статус выше.",
+            reply_parameters=ReplyParameters(prev[0], allow_sending_without_reply=True),
+        )
+    msg = await update.effective_message.reply_text(text)
+    STATUS_MSG[chat_id] = [msg.message_id, text]
+    STATUS_STATS["sent"] += 1
 
 
 
@@ -350,20 +910,47 @@ async def cmd_stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not gs:
         return await update.effective_message.reply_text("Нет активной игры.")
     msg = gs.stop()
-    await update.effective_message.reply_text(msg)
+    PLAYER_GAMES.sync(gs)
+    _publish_outcome(context.bot, gs, msg)
+    await _announce(update, context, gs, msg)
+
+
+async def cmd_watch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Подписаться на ленту игры этой группы: ходы без карт, обвинения, рулетка — в личку."""
+    if not in_group(update):
+        return await update.effective_message.reply_text("Напишите /watch в группе, за игрой которой хотите следить.")
+    chat_id = update.effective_chat.id
+    if not SPECTATORS.watch(chat_id, update.effective_user.id):
+        return await update.effective_message.reply_text("Вы уже следите за этой игрой. /unwatch — отписаться.")
+    await update.effective_message.reply_text(
+        "Лента игры придёт вам в личку (если молчит — напишите мне /start в личке). /unwatch — отписаться."
+    )
+
+
+async def cmd_unwatch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """В группе — отписаться от её игры, в личке — от всех."""
+    uid = update.effective_user.id
+    if in_group(update):
+        done = SPECTATORS.unwatch(update.effective_chat.id, uid)
+    else:
+        done = bool(SPECTATORS.unwatch_all(uid))
+    await update.effective_message.reply_text("Вы больше не следите." if done else "Вы ни за чем не следите.")
 
 
 async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.effective_message.reply_text(
         "/newgame — создать лобби в группе\n"
         "/join — присоединиться\n"
+        "/addbot — посадить компьютерного игрока\n"
         "/startgame — начать (2+ игроков)\n"
         "/hand — ваша рука (в личке)\n"
+        "/odds — шансы по текущей заявке (в личке): точный расклад и оценка по модели блефа\n"
         "/play <i> <ранг> — положить карту по индексу и заявить ранг (K,Q,J,TR)\n"
         "/accuse — обвинить предыдущего игрока (может только следующий по ходу)\n"
         "/status — текущее состояние\n"
         "/topic — текущая тема\n"
         "/stop — завершить текущую игру\n"
+        "/watch — следить за игрой группы (лента в личку), /unwatch — перестать\n"
         "\nDealer (в личке):\n"
         "/dealer_new — создать Dealer\n"
         "/dealer_add <имя> — добавить игрока\n"
@@ -373,26 +960,280 @@ async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
-def build_app() -> Application:
-    app = Application.builder().token(BOT_TOKEN).build()
-    app.add_handler(CommandHandler("start", cmd_start))
-    app.add_handler(CommandHandler("help", cmd_help))
-    app.add_handler(CommandHandler("newgame", cmd_newgame))
-    app.add_handler(CommandHandler("join", cmd_join))
-    app.add_handler(CommandHandler("startgame", cmd_startgame))
-    app.add_handler(CommandHandler("hand", cmd_hand))
-    app.add_handler(CommandHandler("play", cmd_play))
-    app.add_handler(CommandHandler("accuse", cmd_accuse))
-    app.add_handler(CommandHandler("status", cmd_status))
-    app.add_handler(CommandHandler("topic", cmd_topic))
-    app.add_handler(CommandHandler("stop", cmd_stop))
-    app.add_handler(CommandHandler("dealer_new", cmd_dealer_new))
-    app.add_handler(CommandHandler("dealer_add", cmd_dealer_add))
-    app.add_handler(CommandHandler("dealer_list", cmd_dealer_list))
-    app.add_handler(CommandHandler("dealer_shoot", cmd_dealer_shoot))
-    app.add_handler(CommandHandler("dealer_reset", cmd_dealer_reset))
+async def _drop_duplicates(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Повтор (тот же update_id или то же сообщение чата) не доходит до обработчиков и не пишется."""
+    key = DEDUP.duplicate(update)
+    if key is not None:
+        logger.debug("Повтор апдейта %s (по %s) пропущен", update.update_id, key)
+        raise ApplicationHandlerStop
+
+
+async def _persist_state(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """После каждого апдейта записать изменённые игры/сессии (только изменившиеся).
+
+    Окна повторов (SEEN) пишутся вместе с изменёнными играми, а апдейт, который
+    ничего не поменял, их не пишет — их допишет периодический flush (_evict_loop).
+    """
+    try:
+        STORE.flush(defer=True)
+        if EVENTS is not None:
+            EVENTS.flush()
+    except Exception:
+        logger.exception("Не удалось сохранить состояние")
+
+
+def _evict_idle(pinned: Container[int] = ()) -> int:
+    """Выгрузить простаивающее; pinned — чаты, чей апдейт сейчас обрабатывается (их игры не трогаем)."""
+    n = STORE.evict(EVICTION, pinned)
+    if n:
+        counts = ", ".join(f"{m.kind}: {m.evicted['spilled']}/{m.evicted['dropped']}" for m in STORE.maps)
+        logger.info("Выгружено из памяти: %s (всего сохранено/удалено — %s)", n, counts)
+    return n
+
+
+def _game_gauges() -> Dict[str, int]:
+    games = players = 0
+    for gs in GAMES.resident():
+        if _game_active(gs):
+            games += 1
+            players += len(members(gs))
+    # не загруженные игры — всегда активные, их состав берём из meta
+    stored = GAMES.stored_meta()
+    return {"games": games + len(stored), "players": players + sum(len(uids) for uids in stored.values())}
+
+
+REGISTRY.collected("liers_active_games", "Идущие игры и лобби", "gauge", lambda: {(): _game_gauges()["games"]})
+REGISTRY.collected("liers_live_players", "Живые игроки в идущих играх", "gauge", lambda: {(): _game_gauges()["players"]})
+REGISTRY.collected(
+    "liers_dealer_sessions", "Сессии дилера с игроками", "gauge",
+    lambda: {(): sum(1 for s in DEALERS.resident() if s.players) + len(DEALERS) - DEALERS.loaded},
+)
+REGISTRY.collected(
+    "liers_state_loaded", "Объекты состояния в памяти", "gauge", lambda: {(m.kind,): m.loaded for m in STORE.maps}, ["kind"]
+)
+REGISTRY.collected(
+    "liers_state_evicted_total", "Выгружено из памяти (spilled — осталось в хранилище)", "counter",
+    lambda: {(m.kind, how): n for m in STORE.maps for how, n in m.evicted.items()}, ["kind", "how"],
+)
+
+_OUTBOX: Optional[OutboxLimiter] = None
+
+
+def _outbox_stat(attr: str):
+    return lambda: {(): getattr(_OUTBOX.stats, attr)} if _OUTBOX is not None else {}
+
+
+REGISTRY.collected(
+    "liers_outbox_depth", "Запросы в очереди исходящих", "gauge", lambda: {(): _OUTBOX.depth} if _OUTBOX else {}
+)
+for _attr, _kind, _help in (
+    ("max_depth", "gauge", "Наибольшая длина очереди исходящих"),
+    ("sent", "counter", "Отправлено через очередь"),
+    ("retried", "counter", "Повторы после RetryAfter"),
+    ("superseded", "counter", "Выброшено из очереди как устаревшее"),
+    ("wait_total", "counter", "Суммарное ожидание в очереди, секунды"),
+    ("granted", "counter", "Выдано разрешений на отправку (знаменатель для wait_total)"),
+    ("wait_max", "gauge", "Наибольшее ожидание в очереди, секунды"),
+):
+    REGISTRY.collected(f"liers_outbox_{_attr}", _help, _kind, _outbox_stat(_attr))
+
+REGISTRY.collected(
+    "liers_log_records_dropped_total", "Записи лога, не дошедшие до вывода (full — очередь полна, "
+    "sampled_out.<событие> — прорежены)", "counter",
+    lambda: {(k,): v for k, v in logs.pipeline().stats.items()} if logs.pipeline() else {}, ["reason"],
+)
+
+
+def _log_outbox(app: Application) -> None:
+    limiter = app.bot.rate_limiter
+    if isinstance(limiter, OutboxLimiter) and limiter.stats.granted:
+        m = limiter.metrics()
+        logger.info(
+            "Очередь исходящих: сейчас %d (макс. %d), отправлено %d, повторов %d, вытеснено %d, "
+            "ожидание ср. %.0f мс / макс. %.0f мс",
+            m["depth"], m["max_depth"], m["sent"], m["retried"], m["superseded"],
+            m["wait_avg"] * 1000, m["wait_max"] * 1000,
+        )
+
+
+async def _evict_loop(app: Application):
+    while True:
+        await asyncio.sleep(EVICT_INTERVAL)
+        processor = app.update_processor
+        try:
+            _evict_idle(processor.locks if isinstance(processor, ChatSerializingProcessor) else ())
+        except Exception:
+            logger.exception("Не удалось выгрузить простаивающие игры")
+        _log_outbox(app)
+
+
+_EVICTOR: Optional[asyncio.Task] = None
+_METRICS_SERVER = None
+
+
+_RESEND: Optional[asyncio.Task] = None
+
+
+def _save_snapshot() -> None:
+    """Все StateMap (включая выгруженные в хранилище) и HAND_PENDING — в SNAPSHOT_PATH."""
+    if not SNAPSHOT_PATH:
+        return
+    t0 = time.perf_counter()
+    try:
+        size = snapshot.save(SNAPSHOT_PATH, {m.kind: m.export() for m in STORE.maps}, HAND_PENDING)
+    except Exception:
+        logger.exception("Не удалось записать снимок %s", SNAPSHOT_PATH)
+        return
+    logger.info("Снимок %s: %d байт, недоставленных рук %d, %.0f мс", SNAPSHOT_PATH, size, len(HAND_PENDING),
+                (time.perf_counter() - t0) * 1000)
+
+
+def _restore_snapshot() -> List[Tuple[int, int]]:
+    """Загрузить снимок прошлой остановки; возвращает недоставленные руки.
+
+    Записи, которые уже есть в хранилище, не трогаются (хранилище не старше снимка).
+    Файл удаляется: второй раз тот же снимок не применяется.
+    """
+    if not SNAPSHOT_PATH:
+        return []
+    t0 = time.perf_counter()
+    try:
+        snap = snapshot.load(SNAPSHOT_PATH)
+    except (OSError, ValueError):
+        logger.exception("Снимок %s не прочитан, старт без него", SNAPSHOT_PATH)
+        return []
+    if snap is None:
+        return []
+    added = 0
+    for m in STORE.maps:
+        entries = snap.maps.get(m.kind, {})
+        added += m.restore(entries)
+        if m is GAMES:
+            for chat_id in entries:
+                if chat_id in GAMES:
+                    PLAYER_GAMES.sync(GAMES[chat_id])
+    STORE.flush()  # снимок удаляется, только когда его записи уже в хранилище
+    os.remove(SNAPSHOT_PATH)
+    logger.info("Снимок %s загружен: записей %d, недоставленных рук %d, %.0f мс", SNAPSHOT_PATH, added,
+                len(snap.pending_hands), (time.perf_counter() - t0) * 1000)
+    return snap.pending_hands
+
+
+async def _resend_hands(context: ContextTypes.DEFAULT_TYPE, pending: Iterable[Tuple[int, int]]) -> None:
+    """Дослать руки, не дошедшие до остановки, — если игра ещё идёт (живость проверит _send_hands).
+
+    Как и команды, рассылка идёт под локом чата (ChatSerializingProcessor): ход,
+    пришедший сразу после запуска, не разойдётся с досылаемыми руками. Лок руки
+    каждого игрока (HAND_LOCKS) берёт _send_hand_dm.
+    """
+    processor = context.application.update_processor
+    locks = processor.locks if isinstance(processor, ChatSerializingProcessor) else KeyedLocks()
+    by_chat: Dict[int, Set[int]] = {}
+    for chat_id, uid in pending:
+        by_chat.setdefault(chat_id, set()).add(uid)
+    for chat_id, uids in by_chat.items():
+        async with locks.hold(chat_id):
+            gs = GAMES.get(chat_id)
+            if gs is None or not gs.started:
+                continue
+            await _send_hands(context, gs, f"Группа {chat_id}. Тема: {gs.current_topic.value}", only=uids)
+
+
+async def _post_stop(app: Application):
+    """После app.stop(): дослать доски, ленты и исходящие (не дольше SHUTDOWN_DRAIN_TIMEOUT), записать снимок."""
+    deadline = time.monotonic() + SHUTDOWN_DRAIN_TIMEOUT
+    try:
+        await asyncio.wait_for(asyncio.gather(BOARD.flush(), SPECTATORS.drain()), SHUTDOWN_DRAIN_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Доски и ленты зрителей не дописаны за %.0f с", SHUTDOWN_DRAIN_TIMEOUT)
+    if _OUTBOX is not None:
+        left = await _OUTBOX.drain(max(0.0, deadline - time.monotonic()))
+        if left:
+            logger.warning("Остановка: в очереди исходящих осталось %d запросов", left)
+    _save_snapshot()
+
+
+async def _post_init(app: Application):
+    global _EVICTOR, _METRICS_SERVER, _RESEND
+    pending = _restore_snapshot()
+    if pending:
+        _RESEND = asyncio.create_task(_resend_hands(CallbackContext(app), pending))
+    _EVICTOR = asyncio.create_task(_evict_loop(app))
+    if METRICS_PORT:
+        try:
+            _METRICS_SERVER = serve_metrics(METRICS_PORT, METRICS_LISTEN)
+            logger.info("Метрики: http://%s:%s/metrics", METRICS_LISTEN, METRICS_PORT)
+        except OSError:
+            logger.exception("Не удалось открыть порт метрик %s", METRICS_PORT)
+
+
+async def _post_shutdown(app: Application):
+    if _EVICTOR is not None:
+        _EVICTOR.cancel()
+    if _RESEND is not None:
+        _RESEND.cancel()
+    if _METRICS_SERVER is not None:
+        _METRICS_SERVER.stop()
+    if EVENTS is not None:
+        EVENTS.flush()
+    STORE.close()
+
+
+COMMANDS = {
+    "start": cmd_start,
+    "help": cmd_help,
+    "newgame": cmd_newgame,
+    "join": cmd_join,
+    "addbot": cmd_addbot,
+    "startgame": cmd_startgame,
+    "hand": cmd_hand,
+    "odds": cmd_odds,
+    "play": cmd_play,
+    "accuse": cmd_accuse,
+    "status": cmd_status,
+    "topic": cmd_topic,
+    "stop": cmd_stop,
+    "watch": cmd_watch,
+    "unwatch": cmd_unwatch,
+    "dealer_new": cmd_dealer_new,
+    "dealer_add": cmd_dealer_add,
+    "dealer_list": cmd_dealer_list,
+    "dealer_shoot": cmd_dealer_shoot,
+    "dealer_reset": cmd_dealer_reset,
+}
+
+
+def build_app(request: Optional[BaseRequest] = None) -> Application:
+    """request — свой транспорт к Bot API (например, заглушка в бенчмарках)."""
+    global _OUTBOX, DEDUP
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(ChatSerializingProcessor(MAX_CONCURRENT_UPDATES))
+        # счётчики вызовов Bot API; пул как у транспорта PTB по умолчанию
+        .request(MeteredRequest(request or HTTPXRequest(connection_pool_size=256)))
+        .post_init(_post_init)
+        .post_stop(_post_stop)
+        .post_shutdown(_post_shutdown)
+    )
+    _OUTBOX = None
+    if OUTBOX:
+        _OUTBOX = OutboxLimiter(OUTBOX_GLOBAL_RATE, OUTBOX_GROUP_PER_MINUTE, OUTBOX_PRIVATE_RATE)
+        builder = builder.rate_limiter(_OUTBOX)
+    if TELEGRAM_API_URL:
+        builder = builder.base_url(TELEGRAM_API_URL)
+    app = builder.build()
+    set_observer(observe_core)
+    DEDUP = Deduplicator(SEEN)
+    # Группа -1 — до всех обработчиков: повторы отсекаются, не трогая игру
+    app.add_handler(TypeHandler(Update, _drop_duplicates), group=-1)
+    for name, callback in COMMANDS.items():
+        app.add_handler(CommandHandler(name, instrument(name, callback)))
+    app.add_handler(CallbackQueryHandler(instrument("board", on_board_button)))
     # Отсекать лишние сообщения, но можно логировать при желании
     app.add_handler(MessageHandler(filters.ALL, lambda u, c: None))
+    # Группа 1 — после обработчиков команд
+    app.add_handler(TypeHandler(Update, _persist_state), group=1)
     return app
 
 
@@ -0,0 +1,245 @@
+"""Метрики бота в текстовом формате Prometheus (без внешних зависимостей).
+
+Счётчики и гистограммы обновляются на горячем пути, поэтому устроены просто:
+значения лежат в dict по кортежу меток, корзина гистограммы ищется bisect'ом.
+Значения, которые и так где-то хранятся (число игр, статистика очереди),
+не дублируются, а снимаются при каждом запросе /metrics через callback.
+"""
+from __future__ import annotations
+import bisect
+import functools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from telegram.request import BaseRequest
+
+from bot import logs
+
+logger = logging.getLogger("liers-bot.metrics")
+
+Labels = Tuple[str, ...]
+
+# Границы корзин латентности, секунды: от 100 мкс (ядро игры) до 10 с (Bot API под нагрузкой)
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_num(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # метки -> [счётчики по корзинам (последняя — +Inf), сумма]
+        self.values: Dict[Labels, List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> Iterable[str]:
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="' + _num(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_num(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Collected(Metric):
+    """Значения снимаются при выдаче: collect() -> {кортеж меток: число}."""
+
+    def __init__(
+        self, name: str, help: str, kind: str, collect: Callable[[], Dict[Labels, float]],
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self.collect().items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_num(value)}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Metric] = {}
+
+    def add(self, metric: Metric) -> Any:
+        if metric.name in self.metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), **kwargs: Any) -> Histogram:
+        return self.add(Histogram(name, help, labelnames, **kwargs))
+
+    def collected(
+        self, name: str, help: str, kind: str, collect: Callable[[], Dict[Labels, float]],
+        labelnames: Sequence[str] = (),
+    ) -> Collected:
+        return self.add(Collected(name, help, kind, collect, labelnames))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception:  # одна сломанная метрика не должна ронять весь /metrics
+                logger.exception("Не удалось собрать метрику %s", metric.name)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+COMMAND_SECONDS = REGISTRY.histogram(
+    "liers_command_seconds", "Время обработки команды (включая вызовы Bot API)", ["command"]
+)
+COMMAND_ERRORS = REGISTRY.counter("liers_command_errors_total", "Команды, завершившиеся исключением", ["command"])
+API_SECONDS = REGISTRY.histogram("liers_api_seconds", "Время вызова метода Bot API", ["method"])
+API_CALLS = REGISTRY.counter("liers_api_calls_total", "Вызовы Bot API по методам и HTTP-кодам", ["method", "code"])
+CORE_SECONDS = REGISTRY.histogram("liers_core_seconds", "Операции ядра игры (liers.timing)", ["op"])
+
+
+# Запись на каждую команду (event="command", прореживается LOG_SAMPLE): успешные — DEBUG
+# (по умолчанию не пишутся: даже прореженная запись дороже самой обёртки), ошибки — INFO
+command_log = logging.getLogger("liers-bot.commands")
+
+
+def instrument(command: str, handler: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Обёртка обработчика команды: гистограмма времени, счётчик ошибок и запись в лог."""
+    @functools.wraps(handler)
+    async def wrapper(update: Any, context: Any) -> Any:
+        t0 = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await handler(update, context)
+        except Exception:
+            outcome = "error"
+            COMMAND_ERRORS.inc(command)
+            raise
+        finally:
+            seconds = time.perf_counter() - t0
+            COMMAND_SECONDS.observe(seconds, command)
+            level = logging.INFO if outcome == "error" else logging.DEBUG
+            # прореживание LOG_SAMPLE — до создания записи
+            n = logs.sample("command") if command_log.isEnabledFor(level) else 0
+            if n:
+                chat = getattr(update, "effective_chat", None)
+                user = getattr(update, "effective_user", None)
+                command_log.log(level, "/%s", command, extra={
+                    "event": "command", "command": command, "outcome": outcome,
+                    "chat_id": chat.id if chat else None, "user_id": user.id if user else None,
+                    "update_id": getattr(update, "update_id", None), "latency_ms": round(seconds * 1000, 2),
+                    "sampled": n if n > 1 else None,
+                })
+    return wrapper
+
+
+def observe_core(op: str, seconds: float) -> None:
+    """observer для liers.timing.set_observer."""
+    CORE_SECONDS.observe(seconds, op)
+
+
+def serve_metrics(port: int, address: str = "127.0.0.1", registry: Optional[Registry] = None) -> Any:
+    """HTTP-сервер с GET /metrics в текущем event loop (tornado, как и webhook)."""
+    from tornado.httpserver import HTTPServer
+    from tornado.web import Application as WebApp, RequestHandler
+
+    reg = registry or REGISTRY
+
+    class MetricsHandler(RequestHandler):
+        def get(self) -> None:
+            self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.write(reg.render())
+
+    server = HTTPServer(WebApp([(r"/metrics", MetricsHandler)]))
+    server.listen(port, address=address)
+    return server
+
+
+class MeteredRequest(BaseRequest):
+    """Транспорт PTB поверх другого: считает вызовы Bot API по методам и кодам ответа."""
+
+    def __init__(self, inner: BaseRequest) -> None:
+        self.inner = inner
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return self.inner.read_timeout
+
+    async def initialize(self) -> None:
+        await self.inner.initialize()
+
+    async def shutdown(self) -> None:
+        await self.inner.shutdown()
+
+    async def do_request(self, url: str, method: str, *args: Any, **kwargs: Any) -> Tuple[int, bytes]:
+        endpoint = url.rsplit("/", 1)[-1]
+        t0 = time.perf_counter()
+        code = "error"  # сеть/таймаут — ответа не было
+        try:
+            result = await self.inner.do_request(url, method, *args, **kwargs)
+            code = str(result[0])
+            return result
+        finally:
+            API_SECONDS.observe(time.perf_counter() - t0, endpoint)
+            API_CALLS.inc(endpoint, code)
@@ -0,0 +1,312 @@
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger("liers-bot.outbox")
+
+# Приоритеты: меньше — раньше. Ответы в группах важнее рук в личке, руки — ленты зрителей.
+GROUP, PRIVATE, SPECTATOR = 0, 1, 2
+
+
+class Superseded(Exception):
+    """Запрос отменён до отправки: его заменил более новый (например, свежая рука)."""
+
+
+class TokenBucket:
+    """rate токенов в секунду, не больше burst про запас."""
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+        self.blocked_until = 0.0  # после RetryAfter
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def delay(self, now: float) -> float:
+        """Через сколько секунд будет доступен токен (0 — уже есть)."""
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def full_at(self) -> float:
+        """Когда запас снова будет полным (ведро ничем не отличается от нового)."""
+        return max(self.stamp + (self.burst - self.tokens) / self.rate, self.blocked_until)
+
+
+@dataclass(order=True)
+class _Item:
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    future: "asyncio.Future[None]" = field(compare=False)
+    superseded: Optional[Callable[[], bool]] = field(compare=False, default=None)
+    enqueued: float = field(compare=False, default=0.0)
+
+
+@dataclass
+class OutboxStats:
+    granted: int = 0       # выдано токенов (включая повторы)
+    sent: int = 0
+    retried: int = 0       # повторов после RetryAfter
+    superseded: int = 0    # выброшено из очереди, не отправляя
+    max_depth: int = 0
+    wait_total: float = 0.0  # секунды в очереди, суммарно по выданным токенам
+    wait_max: float = 0.0
+
+
+class OutboxLimiter(BaseRateLimiter[Dict[str, Any]]):
+    """
+    Единая очередь исходящих запросов к Bot API (rate_limiter для ApplicationBuilder).
+
+    Запрос с chat_id ждёт токен своего чата (группы — group_per_minute в минуту,
+    личка — private_rate в секунду) и общий токен (global_rate в секунду);
+    из ждущих первыми уходят ответы в группы, затем личка, внутри — по порядку.
+    RetryAfter от Telegram блокирует чат на указанное время, запрос повторяется
+    (не больше max_retries раз, с растущей добавкой backoff).
+
+    Очередь — куча запросов на каждый чат и две кучи чатов: с токеном (по
+    первому запросу) и ждущих токен (по времени, когда он появится), так что
+    выдача токена — O(log n) при любом числе ждущих. Вёдра чатов с полным
+    запасом забываются лениво, когда их больше max_buckets.
+
+    rate_limit_args (ExtBot): {"priority": int} — свой приоритет;
+    {"superseded": callable} — если перед отправкой вернёт True, запрос не
+    отправляется, а вызывающий получает Superseded.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        group_per_minute: float = 20,
+        private_rate: float = 1,
+        private_burst: float = 3,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_buckets: int = 10000,
+    ) -> None:
+        self.global_rate = global_rate
+        self.group_per_minute = group_per_minute
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_buckets = max_buckets
+        self.stats = OutboxStats()
+        self._pending: Dict[int, List[_Item]] = {}  # чат -> куча его запросов
+        self._depth = 0
+        # Чат с запросами стоит ровно в одной из куч; запись действительна, пока
+        # её номер совпадает с _slot[чат] (иначе её заменила более свежая)
+        self._ready: List[Tuple[int, int, int, int]] = []  # (priority, seq первого запроса, номер, чат)
+        self._sleeping: List[Tuple[float, int, int]] = []  # (когда будет токен, номер, чат)
+        self._slot: Dict[int, int] = {}
+        self._slots = itertools.count()
+        self._chats: Dict[int, TokenBucket] = {}
+        self._idle: List[Tuple[float, int]] = []  # (когда ведро было бы полным, чат) — для забывания
+        self._global: Optional[TokenBucket] = None
+        self._seq = itertools.count()
+        self._wake: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _now() -> float:
+        return time.monotonic()
+
+    async def initialize(self) -> None:
+        if self._dispatcher is None:
+            self._global = TokenBucket(self.global_rate, self.global_rate, self._now())
+            self._wake = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for heap in self._pending.values():
+            for item in heap:
+                if not item.future.done():
+                    item.future.cancel()
+        self._pending.clear()
+        self._ready.clear()
+        self._sleeping.clear()
+        self._slot.clear()
+        self._depth = 0
+
+    async def drain(self, timeout: float) -> int:
+        """Дождаться, пока очередь опустеет (остановка бота), но не дольше timeout с; сколько осталось."""
+        deadline = self._now() + timeout
+        while self._depth and self._now() < deadline:
+            await asyncio.sleep(min(0.01, max(0.0, deadline - self._now())))
+        return self._depth
+
+    @property
+    def depth(self) -> int:
+        """Сколько запросов ждёт отправки."""
+        return self._depth
+
+    def metrics(self) -> Dict[str, float]:
+        s = self.stats
+        return {
+            "depth": self.depth,
+            "max_depth": s.max_depth,
+            "sent": s.sent,
+            "retried": s.retried,
+            "superseded": s.superseded,
+            "wait_avg": s.wait_total / s.granted if s.granted else 0.0,
+            "wait_max": s.wait_max,
+        }
+
+    def _bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.max_buckets:
+                self._forget_full(now)
+            if chat_id < 0:
+                bucket = TokenBucket(self.group_per_minute / 60, self.group_per_minute, now)
+            else:
+                bucket = TokenBucket(self.private_rate, self.private_burst, now)
+            self._chats[chat_id] = bucket
+            heapq.heappush(self._idle, (bucket.full_at(), chat_id))
+        return bucket
+
+    def _forget_full(self, now: float) -> None:
+        """Забыть вёдра с полным запасом — для них новое ведро ничем не отличается."""
+        later = []
+        while self._idle and self._idle[0][0] <= now:
+            _, chat_id = heapq.heappop(self._idle)
+            bucket = self._chats.get(chat_id)
+            if bucket is None:
+                continue
+            full_at = bucket.full_at()
+            if full_at <= now and chat_id not in self._pending:
+                del self._chats[chat_id]
+            else:  # ведро тратили после записи — проверить, когда оно наполнится
+                later.append((max(full_at, now + 1 / bucket.rate), chat_id))
+        for entry in later:
+            heapq.heappush(self._idle, entry)
+
+    def _schedule(self, chat_id: int, now: float) -> None:
+        """Поставить чат в кучу готовых или ждущих по его ведру (прежняя запись чата устаревает)."""
+        slot = next(self._slots)
+        self._slot[chat_id] = slot
+        delay = self._bucket(chat_id, now).delay(now)
+        if delay == 0:
+            head = self._pending[chat_id][0]
+            heapq.heappush(self._ready, (head.priority, head.seq, slot, chat_id))
+        else:
+            heapq.heappush(self._sleeping, (now + delay, slot, chat_id))
+
+    async def _dispatch(self) -> None:
+        while True:
+            timeout = self._grant()
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _grant(self) -> Optional[float]:
+        """Выдаёт токены всем, кому можно; возвращает, через сколько проверить снова."""
+        while True:
+            now = self._now()
+            while self._sleeping and self._sleeping[0][0] <= now:
+                _, slot, chat_id = heapq.heappop(self._sleeping)
+                if self._slot.get(chat_id) == slot:
+                    self._schedule(chat_id, now)
+            if not self._ready:
+                return max(0.0, self._sleeping[0][0] - now) if self._sleeping else None
+            wait = self._global.delay(now)
+            if wait > 0:
+                return wait
+            _, _, slot, chat_id = heapq.heappop(self._ready)
+            if self._slot.get(chat_id) != slot:
+                continue
+            heap = self._pending[chat_id]
+            item = heapq.heappop(heap)
+            if item.future.done():  # вызывающий отменён
+                self._depth -= 1
+            elif item.superseded is not None and item.superseded():
+                self._depth -= 1
+                self.stats.superseded += 1
+                item.future.set_exception(Superseded())
+            elif self._bucket(chat_id, now).delay(now) > 0:  # чат заблокирован RetryAfter
+                heapq.heappush(heap, item)
+            else:
+                self._depth -= 1
+                self._chats[chat_id].take()
+                self._global.take()
+                waited = now - item.enqueued
+                self.stats.granted += 1
+                self.stats.wait_total += waited
+                self.stats.wait_max = max(self.stats.wait_max, waited)
+                item.future.set_result(None)
+            if heap:
+                self._schedule(chat_id, now)
+            else:
+                del self._pending[chat_id]
+                del self._slot[chat_id]
+
+    async def _acquire(
+        self, chat_id: int, priority: int, seq: int, superseded: Optional[Callable[[], bool]]
+    ) -> None:
+        now = self._now()
+        item = _Item(priority, seq, chat_id, asyncio.get_running_loop().create_future(), superseded, now)
+        heap = self._pending.setdefault(chat_id, [])
+        heapq.heappush(heap, item)
+        self._depth += 1
+        self.stats.max_depth = max(self.stats.max_depth, self._depth)
+        if heap[0] is item:  # новый первый запрос чата — переставить чат в куче
+            self._schedule(chat_id, now)
+        self._wake.set()
+        await item.future
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ) -> Any:
+        chat_id = data.get("chat_id")
+        if chat_id is None or self._dispatcher is None:
+            return await callback(*args, **kwargs)  # getMe, setWebhook и т.п. не ограничиваем
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):  # @username канала
+            chat_id = 0
+        opts = rate_limit_args or {}
+        priority = opts.get("priority", GROUP if chat_id < 0 else PRIVATE)
+        superseded = opts.get("superseded")
+        seq = next(self._seq)  # повтор встаёт на прежнее место в очереди
+        attempt = 0
+        while True:
+            await self._acquire(chat_id, priority, seq, superseded)
+            try:
+                result = await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                pause = float(e.retry_after) + self.backoff * 2 ** attempt
+                attempt += 1
+                self._bucket(chat_id, self._now()).blocked_until = self._now() + pause
+                self.stats.retried += 1
+                logger.warning("%s в %s: RetryAfter %s с, повтор %s", endpoint, chat_id, e.retry_after, attempt)
+                continue
+            self.stats.sent += 1
+            return result
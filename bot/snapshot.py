@@ -0,0 +1,68 @@
+"""Снимок состояния при остановке: все StateMap и руки, которые не успели дойти.
+
+Формат: MAGIC, затем JSON, сжатый zlib:
+    {"saved": unix-время, "maps": {kind: {key: dump(value)}}, "pending_hands": [[chat_id, user_id], ...]}
+Файл пишется во временный и переименовывается — оборванная запись не портит
+прошлый снимок. При загрузке ключи JSON снова становятся int.
+"""
+from __future__ import annotations
+import json
+import os
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MAGIC = b"LSN1"
+
+
+@dataclass
+class Snapshot:
+    maps: Dict[str, Dict[int, Any]] = field(default_factory=dict)
+    pending_hands: List[Tuple[int, int]] = field(default_factory=list)  # (chat_id, user_id)
+    saved: float = 0.0
+
+
+def encode(snap: Snapshot) -> bytes:
+    body = {
+        "saved": snap.saved or time.time(),
+        "maps": {kind: {str(k): v for k, v in entries.items()} for kind, entries in snap.maps.items()},
+        "pending_hands": [list(p) for p in snap.pending_hands],
+    }
+    return MAGIC + zlib.compress(json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode(), 6)
+
+
+def decode(data: bytes) -> Snapshot:
+    if not data.startswith(MAGIC):
+        raise ValueError("не снимок бота или другая версия формата")
+    try:
+        body = json.loads(zlib.decompress(data[len(MAGIC):]))
+    except (zlib.error, ValueError) as e:
+        raise ValueError(f"снимок повреждён: {e}") from e
+    return Snapshot(
+        maps={kind: {int(k): v for k, v in entries.items()} for kind, entries in body["maps"].items()},
+        pending_hands=[(c, u) for c, u in body["pending_hands"]],
+        saved=body["saved"],
+    )
+
+
+def save(path: str, maps: Dict[str, Dict[int, Any]], pending_hands: Iterable[Tuple[int, int]]) -> int:
+    """Записать снимок; возвращает размер в байтах."""
+    data = encode(Snapshot(maps, sorted(pending_hands)))
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(data)
+
+
+def load(path: str) -> Optional[Snapshot]:
+    """Снимок из файла или None, если файла нет; ValueError — файл битый."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    return decode(data)
@@ -0,0 +1,250 @@
+"""Зрители: /watch — лента игры в личку (заявки, исходы обвинений, рулетка; рук — никогда).
+
+Обработчик хода только дописывает строку в ленту игры (publish — O(1), без сети).
+Раз в window секунд проход (pump) собирает каждому отставшему зрителю новые
+строки всех игр, которые он смотрит, в одно сообщение. Повтор последней строки
+ленты отбрасывается, а одинаковая пачка (та же игра, тот же курсор) собирается
+один раз на всех зрителей. Зрителю — не чаще сообщения в interval секунд и не
+больше одного в пути: пока медленному получателю не дошло предыдущее, строки
+копятся (из ленты хранятся последние max_lines, остальное — «пропущено N»).
+Заблокировавшие бота отписываются. Подписки живут в памяти процесса; когда
+игра кончилась или выгружена из памяти (close), лента и подписки на неё
+удаляются, как только зрители получили последние строки.
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+import logging
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from telegram.error import Forbidden
+
+from liers.game import GameState, LastPlay
+from bot.outbox import SPECTATOR
+
+logger = logging.getLogger("liers-bot.spectators")
+
+MAX_TEXT = 4096  # предел длины сообщения Bot API
+
+
+def play_line(gs: GameState, lp: LastPlay) -> str:
+    """Ход без фактической карты и без сведений о руке: кто и что заявил."""
+    return f"@{gs._name(lp.player_id)} заявил {lp.claimed_rank.value}"
+
+
+def accuse_line(gs: GameState, msg: str) -> str:
+    """Итог обвинения (вскрытая карта и рулетка — их видит и группа) и новая тема."""
+    return msg + (f"\nНовая тема: {gs.current_topic.value}" if gs.started else "")
+
+
+def start_line(gs: GameState) -> str:
+    names = ", ".join(f"@{p.username}" for p in gs.players)
+    return f"Игра началась: {names}. Тема: {gs.current_topic.value}"
+
+
+class _Feed:
+    __slots__ = ("lines", "seq")
+
+    def __init__(self, max_lines: int) -> None:
+        self.lines: Deque[str] = deque(maxlen=max_lines)
+        self.seq = 0  # сколько строк опубликовано за всё время
+
+
+class Broadcaster:
+    """Подписки зрителей и рассылка лент; bot — как у BoardUpdater, берётся из publish()."""
+
+    def __init__(
+        self, window: float = 1.0, interval: float = 3.0, max_lines: int = 30, concurrency: int = 8,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.window = window
+        self.interval = interval
+        self.max_lines = max_lines
+        self.concurrency = concurrency
+        self.stats: Counter = Counter()
+        self._clock = clock
+        self._bot: Any = None
+        self._feeds: Dict[int, _Feed] = {}
+        self._watchers: Dict[int, Set[int]] = {}      # chat_id -> зрители
+        self._cursors: Dict[int, Dict[int, int]] = {}  # uid -> {chat_id: сколько строк уже отправлено}
+        self._dirty: Set[int] = set()   # игры с новыми строками с прошлого прохода
+        self._closing: Set[int] = set()  # кончившиеся игры: удалить, когда зрители получат всё
+        self._behind: Set[int] = set()  # зрители, которым не отправили из-за лимитов
+        self._next_at: Dict[int, float] = {}
+        self._inflight: Set[int] = set()
+        self._sends: Set["asyncio.Task[None]"] = set()
+        self._pump: Optional["asyncio.Task[None]"] = None
+
+    # --- Подписки ---
+    def watch(self, chat_id: int, uid: int) -> bool:
+        """Подписать uid на игру; лента начинается с текущего момента. False — уже подписан."""
+        watchers = self._watchers.setdefault(chat_id, set())
+        if uid in watchers:
+            return False
+        watchers.add(uid)
+        self._closing.discard(chat_id)  # в группе уже новая игра
+        feed = self._feeds.setdefault(chat_id, _Feed(self.max_lines))
+        self._cursors.setdefault(uid, {})[chat_id] = feed.seq
+        return True
+
+    def unwatch(self, chat_id: int, uid: int) -> bool:
+        watchers = self._watchers.get(chat_id)
+        if not watchers or uid not in watchers:
+            return False
+        watchers.discard(uid)
+        if not watchers:
+            del self._watchers[chat_id]
+            self._feeds.pop(chat_id, None)
+            self._dirty.discard(chat_id)
+            self._closing.discard(chat_id)
+        cursors = self._cursors.get(uid, {})
+        cursors.pop(chat_id, None)
+        if not cursors:
+            self._cursors.pop(uid, None)
+            self._next_at.pop(uid, None)
+            self._behind.discard(uid)
+        return True
+
+    def unwatch_all(self, uid: int) -> List[int]:
+        chats = list(self._cursors.get(uid, ()))
+        for chat_id in chats:
+            self.unwatch(chat_id, uid)
+        return chats
+
+    def close(self, chat_id: int) -> None:
+        """Игра кончилась или выгружена: отписать всех её зрителей, дослав им последние строки."""
+        self._closing.add(chat_id)
+        self._retire()
+
+    def _retire(self) -> None:
+        for chat_id in list(self._closing):
+            feed = self._feeds.get(chat_id)
+            watchers = list(self._watchers.get(chat_id, ()))
+            if feed is not None and any(self._cursors[uid][chat_id] != feed.seq for uid in watchers):
+                continue  # строки ещё не ушли — их дошлёт запланированный проход
+            for uid in watchers:
+                self.unwatch(chat_id, uid)
+            self._closing.discard(chat_id)
+
+    def watching(self, uid: int) -> List[int]:
+        return list(self._cursors.get(uid, ()))
+
+    def watchers(self, chat_id: int) -> int:
+        return len(self._watchers.get(chat_id, ()))
+
+    # --- Публикация (из обработчика игры) ---
+    def publish(self, bot: Any, chat_id: int, line: str) -> None:
+        """Дописать строку в ленту игры. Без зрителей — ничего не делает."""
+        feed = self._feeds.get(chat_id)
+        if feed is None:
+            return
+        if feed.lines and feed.lines[-1] == line:
+            self.stats["duplicate"] += 1
+            return
+        feed.lines.append(line)
+        feed.seq += 1
+        self._bot = bot
+        self._dirty.add(chat_id)
+        self._schedule(self.window)
+
+    def _schedule(self, delay: float) -> None:
+        if self._pump is None:
+            self._pump = asyncio.create_task(self._run(delay))
+
+    async def _run(self, delay: float) -> None:
+        try:
+            if delay > 0:
+                await asyncio.sleep(delay)
+        finally:
+            if self._pump is asyncio.current_task():
+                self._pump = None
+        self.pump()
+
+    # --- Рассылка ---
+    def pump(self) -> int:
+        """Один проход: отправить накопившееся всем, кому уже можно. Возвращает число отправок."""
+        now = self._clock()
+        due = self._behind
+        for chat_id in self._dirty:
+            due |= self._watchers.get(chat_id, set())
+        self._dirty = set()
+        self._behind = set()
+        batches: Dict[Tuple[int, int], str] = {}
+        started = 0
+        for uid in due:
+            if uid in self._inflight or now < self._next_at.get(uid, 0.0) or len(self._inflight) >= self.concurrency:
+                self._behind.add(uid)
+                continue
+            text = self._compose(uid, batches)
+            if not text:
+                continue
+            self._next_at[uid] = now + self.interval
+            self._inflight.add(uid)
+            task = asyncio.create_task(self._deliver(self._bot, uid, text))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+            started += 1
+        if self._closing:
+            self._retire()
+        if self._behind:
+            soonest = min(self._next_at.get(uid, now) for uid in self._behind) - now
+            self._schedule(max(self.window, soonest))
+        return started
+
+    def _compose(self, uid: int, batches: Dict[Tuple[int, int], str]) -> str:
+        parts = []
+        cursors = self._cursors.get(uid, {})
+        for chat_id, seen in cursors.items():
+            feed = self._feeds.get(chat_id)
+            if feed is None or feed.seq == seen:
+                continue
+            key = (chat_id, seen)
+            part = batches.get(key)
+            if part is None:
+                new = feed.seq - seen
+                kept = min(new, len(feed.lines))
+                lines = itertools.islice(feed.lines, len(feed.lines) - kept, None)
+                head = f"👀 Группа {chat_id}" + (f" (пропущено событий: {new - kept})" if new > kept else "")
+                part = batches[key] = "\n".join([head, *lines])
+            else:
+                self.stats["shared"] += 1
+            parts.append(part)
+            cursors[chat_id] = feed.seq
+        text = "\n\n".join(parts)
+        return text if len(text) <= MAX_TEXT else text[:MAX_TEXT - 1] + "…"
+
+    async def _deliver(self, bot: Any, uid: int, text: str) -> None:
+        rl = {"priority": SPECTATOR} if bot.rate_limiter else None
+        try:
+            await bot.send_message(chat_id=uid, text=text, rate_limit_args=rl)
+            self.stats["sent"] += 1
+        except Forbidden:  # заблокировал бота или не начинал с ним диалог
+            self.stats["blocked"] += 1
+            self.unwatch_all(uid)
+        except Exception:
+            self.stats["error"] += 1
+            logger.warning("Не удалось отправить ленту зрителю %s", uid, exc_info=True)
+        finally:
+            self._inflight.discard(uid)
+
+    async def drain(self) -> None:
+        """Остановка бота: отправить накопленное сразу, не дожидаясь окна, и дождаться отправок.
+
+        Зрители, которым ещё нельзя писать (interval), ленту не получат.
+        """
+        if self._pump is not None:
+            self._pump.cancel()
+            self._pump = None
+        self.pump()
+        if self._pump is not None:  # остались только зрители за лимитом
+            self._pump.cancel()
+            self._pump = None
+        while self._sends:
+            await asyncio.gather(*self._sends, return_exceptions=True)
+
+    async def flush(self) -> None:
+        """Дождаться запланированных проходов и отправок (тесты, остановка бота)."""
+        while self._pump is not None or self._sends:
+            await asyncio.gather(*filter(None, [self._pump, *self._sends]), return_exceptions=True)
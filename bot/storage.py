@@ -0,0 +1,363 @@
+from __future__ import annotations
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Container, Dict, Iterable, Iterator, List, MutableMapping, Optional, Set, Tuple
+
+# Строка для записи: (kind, key, active, data, meta). data=None — удалить запись.
+# meta — короткая JSON-строка, которую можно прочитать при старте без загрузки самих объектов.
+Row = Tuple[str, int, bool, Optional[str], Optional[str]]
+
+
+@dataclass(frozen=True)
+class Eviction:
+    """Когда выгружать объект из памяти.
+
+    ttl — секунд без обращений; max_entries — сколько объектов держать в памяти
+    (лишние вытесняются по LRU). spill — активные объекты перед выгрузкой
+    сохраняются в хранилище и потом загружаются лениво; без spill (или если
+    объект неактивен) запись удаляется совсем.
+    """
+    ttl: float = 24 * 3600
+    max_entries: int = 10000
+    spill: bool = True
+
+
+class StateBackend(ABC):
+    """Хранилище состояния бота. Значения — JSON-строки, ключи — (kind, int)."""
+
+    @abstractmethod
+    def active_keys(self, kind: str) -> Dict[int, Optional[str]]:
+        """Ключи активных записей вида kind и их meta."""
+
+    @abstractmethod
+    def load(self, kind: str, key: int) -> Optional[str]:
+        """Сохранённое значение или None."""
+
+    @abstractmethod
+    def write(self, rows: List[Row]) -> None:
+        """Атомарно применить пачку изменений."""
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryBackend(StateBackend):
+    """Без сохранения на диск (как было раньше) — для тестов и локального запуска."""
+
+    def __init__(self) -> None:
+        self.rows: Dict[Tuple[str, int], Tuple[bool, str, Optional[str]]] = {}
+
+    def active_keys(self, kind: str) -> Dict[int, Optional[str]]:
+        return {k: meta for (kd, k), (active, _, meta) in self.rows.items() if kd == kind and active}
+
+    def load(self, kind: str, key: int) -> Optional[str]:
+        row = self.rows.get((kind, key))
+        return row[1] if row else None
+
+    def write(self, rows: List[Row]) -> None:
+        for kind, key, active, data, meta in rows:
+            if data is None:
+                self.rows.pop((kind, key), None)
+            else:
+                self.rows[(kind, key)] = (active, data, meta)
+
+
+class SQLiteBackend(StateBackend):
+    """SQLite в режиме WAL: запись одной транзакцией на пачку, чтение не блокируется записью."""
+
+    def __init__(self, path: str) -> None:
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL в WAL не теряет целостность при падении процесса, только последние коммиты при падении ОС
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            " kind TEXT NOT NULL, key INTEGER NOT NULL, active INTEGER NOT NULL,"
+            " data TEXT NOT NULL, updated REAL NOT NULL, meta TEXT, PRIMARY KEY (kind, key)"
+            ") WITHOUT ROWID"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(state)")}
+        if "meta" not in columns:  # база, созданная до появления meta
+            self.conn.execute("ALTER TABLE state ADD COLUMN meta TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS state_active ON state (kind, active)")
+
+    def active_keys(self, kind: str) -> Dict[int, Optional[str]]:
+        cur = self.conn.execute("SELECT key, meta FROM state WHERE kind = ? AND active = 1", (kind,))
+        return dict(cur.fetchall())
+
+    def load(self, kind: str, key: int) -> Optional[str]:
+        row = self.conn.execute("SELECT data FROM state WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        return row[0] if row else None
+
+    def write(self, rows: List[Row]) -> None:
+        if not rows:
+            return
+        now = time.time()
+        upserts = [
+            (kind, key, int(active), data, now, meta) for kind, key, active, data, meta in rows if data is not None
+        ]
+        deletes = [(kind, key) for kind, key, _, data, _ in rows if data is None]
+        with self.conn:
+            self.conn.execute("BEGIN")
+            if upserts:
+                self.conn.executemany(
+                    "INSERT INTO state (kind, key, active, data, updated, meta) VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (kind, key) DO UPDATE SET active = excluded.active,"
+                    " data = excluded.data, updated = excluded.updated, meta = excluded.meta",
+                    upserts,
+                )
+            if deletes:
+                self.conn.executemany("DELETE FROM state WHERE kind = ? AND key = ?", deletes)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class StateMap(MutableMapping):
+    """
+    dict-подобное хранилище объектов одного вида поверх StateBackend.
+
+    При создании читаются только ключи активных записей; сами объекты
+    восстанавливаются при первом обращении. Запись инкрементальная: flush()
+    сохраняет лишь ключи, к которым обращались с прошлого flush(), и только
+    если сериализованное значение действительно изменилось.
+    """
+
+    def __init__(
+        self,
+        backend: StateBackend,
+        kind: str,
+        dump: Callable[[Any], Any] = lambda v: v,
+        load: Callable[[Any], Any] = lambda d: d,
+        is_active: Callable[[Any], bool] = lambda v: True,
+        meta: Optional[Callable[[Any], Any]] = None,
+        mutable: bool = True,
+        on_evict: Optional[Callable[[int, Any, bool], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        spill: bool = True,
+        deferred: bool = False,
+    ) -> None:
+        self.backend = backend
+        self.kind = kind
+        self._dump = dump
+        self._load = load
+        self._is_active = is_active
+        self._meta = meta
+        # Изменяемые объекты (GameState и т.п.) правятся «на месте» — любое чтение делает ключ грязным
+        self._mutable = mutable
+        self._cache: Dict[int, Any] = {}
+        # есть в хранилище, ещё не загружены: key -> meta
+        self._stored: Dict[int, Optional[str]] = backend.active_keys(kind)
+        self._written: Dict[int, str] = {}  # последнее записанное значение
+        self._dirty: Set[int] = set()
+        self._deleted: Set[int] = set()
+        # загруженные ключи от давно не используемых к недавним: key -> время обращения
+        self._touched: "OrderedDict[int, float]" = OrderedDict()
+        self._clock = clock
+        # on_evict(key, value, spilled) — после выгрузки (например, чтобы поправить индексы)
+        self._on_evict = on_evict
+        # spill=False — выгруженная запись удаляется из хранилища, даже если активна и policy.spill
+        self._spill = spill
+        # deferred — изменения пишет только StateStore.flush() без defer или вместе с чужими строками
+        self.deferred = deferred
+        self.evicted = {"spilled": 0, "dropped": 0}
+
+    def _touch(self, key: int) -> None:
+        self._touched[key] = self._clock()
+        self._touched.move_to_end(key)
+
+    def _fetch(self, key: int) -> Any:
+        if key in self._cache:
+            self._touch(key)
+            return self._cache[key]
+        if key in self._stored:
+            del self._stored[key]
+            data = self.backend.load(self.kind, key)
+            if data is not None:
+                value = self._load(json.loads(data))
+                self._cache[key] = value
+                self._written[key] = data
+                self._touch(key)
+                return value
+        raise KeyError(key)
+
+    def __getitem__(self, key: int) -> Any:
+        value = self._fetch(key)
+        if self._mutable:
+            self._dirty.add(key)
+        return value
+
+    def __setitem__(self, key: int, value: Any) -> None:
+        self._stored.pop(key, None)
+        self._deleted.discard(key)
+        self._cache[key] = value
+        self._touch(key)
+        self._dirty.add(key)
+
+    def __delitem__(self, key: int) -> None:
+        if key not in self._cache and key not in self._stored:
+            raise KeyError(key)
+        self._cache.pop(key, None)
+        self._touched.pop(key, None)
+        self._stored.pop(key, None)
+        self._dirty.discard(key)
+        self._written.pop(key, None)
+        self._deleted.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._cache or key in self._stored
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self._cache) + list(self._stored))
+
+    def __len__(self) -> int:
+        return len(self._cache) + len(self._stored)
+
+    def stored_meta(self) -> Dict[int, Any]:
+        """meta ещё не загруженных записей (как её вернул `meta` при сохранении)."""
+        return {k: json.loads(m) for k, m in self._stored.items() if m is not None}
+
+    @property
+    def loaded(self) -> int:
+        """Сколько объектов уже восстановлено в память."""
+        return len(self._cache)
+
+    def resident(self) -> List[Any]:
+        """Объекты, уже загруженные в память (без загрузки остальных и без пометки «грязными»)."""
+        return list(self._cache.values())
+
+    def export(self) -> Dict[int, Any]:
+        """Все записи в сериализованном виде (dump), включая не загруженные — для снимка."""
+        out = {key: self._dump(value) for key, value in self._cache.items()}
+        for key in self._stored:
+            data = self.backend.load(self.kind, key)
+            if data is not None:
+                out[key] = json.loads(data)
+        return out
+
+    def restore(self, entries: Dict[int, Any]) -> int:
+        """Добавить активные записи из снимка, которых нет в хранилище (хранилище новее снимка); сколько добавлено.
+
+        Неактивные (например, оконченные игры) не возвращаются: в хранилище их
+        ключей нет, поэтому без проверки снимок воскрешал бы их.
+        """
+        added = 0
+        for key, data in entries.items():
+            if key in self:
+                continue
+            value = self._load(data)
+            if not self._is_active(value):
+                continue
+            self[key] = value
+            added += 1
+        return added
+
+    def pending_rows(self) -> List[Row]:
+        """Изменения с прошлого flush(); после успешной записи вызвать mark_written()."""
+        rows: List[Row] = [(self.kind, key, False, None, None) for key in self._deleted]
+        for key in self._dirty:
+            if key not in self._cache:
+                continue
+            value = self._cache[key]
+            data = json.dumps(self._dump(value), ensure_ascii=False, separators=(",", ":"))
+            if self._written.get(key) == data:
+                continue
+            meta = json.dumps(self._meta(value), separators=(",", ":")) if self._meta else None
+            rows.append((self.kind, key, self._is_active(value), data, meta))
+        return rows
+
+    def mark_written(self, rows: Iterable[Row]) -> None:
+        for _, key, _, data, _ in rows:
+            if data is not None:
+                self._written[key] = data
+        self._dirty.clear()
+        self._deleted.clear()
+
+    def evict(self, policy: Eviction, pinned: Container[int] = ()) -> int:
+        """
+        Выгружает из памяти объекты старше policy.ttl и лишние сверх
+        policy.max_entries. Перед вызовом все изменения должны быть записаны
+        (StateStore.evict сначала делает flush), удаления запишет следующий flush.
+        Ключи из pinned (их сейчас меняет обработчик) остаются в памяти.
+        """
+        deadline = self._clock() - policy.ttl
+        over = len(self._touched) - policy.max_entries
+        victims = []
+        for key, at in self._touched.items():  # от давно не используемых
+            if at > deadline and over <= 0:
+                break
+            if key in pinned:
+                continue
+            victims.append(key)
+            over -= 1
+        for key in victims:
+            value = self._cache.pop(key)
+            del self._touched[key]
+            self._dirty.discard(key)
+            spilled = policy.spill and self._spill and self._is_active(value) and key in self._written
+            if spilled:
+                # значение уже в хранилище — оставляем только ключ для ленивой загрузки
+                self._stored[key] = json.dumps(self._meta(value), separators=(",", ":")) if self._meta else None
+                self._written.pop(key)
+            else:
+                self._written.pop(key, None)
+                self._deleted.add(key)
+            self.evicted["spilled" if spilled else "dropped"] += 1
+            if self._on_evict is not None:
+                self._on_evict(key, value, spilled)
+        return len(victims)
+
+
+class StateStore:
+    """Набор StateMap поверх одного хранилища; flush() пишет всё одной транзакцией."""
+
+    def __init__(self, backend: StateBackend) -> None:
+        self.backend = backend
+        self.maps: List[StateMap] = []
+
+    def map(self, kind: str, **kwargs: Any) -> StateMap:
+        m = StateMap(self.backend, kind, **kwargs)
+        self.maps.append(m)
+        return m
+
+    def flush(self, defer: bool = False) -> int:
+        """
+        Сохраняет изменения; возвращает число записанных строк. defer=True —
+        карты с deferred пишутся, только если есть что писать и в остальных
+        (тогда одной транзакцией с ними), иначе ждут следующего flush().
+        """
+        maps = self.maps
+        if defer:
+            maps = [m for m in maps if not m.deferred]
+        per_map = [(m, m.pending_rows()) for m in maps]
+        if defer and any(rs for _, rs in per_map):
+            per_map += [(m, m.pending_rows()) for m in self.maps if m.deferred]
+        rows = [r for _, rs in per_map for r in rs]
+        self.backend.write(rows)
+        for m, rs in per_map:
+            m.mark_written(rs)
+        return len(rows)
+
+    def evict(self, policy: Eviction, pinned: Container[int] = ()) -> int:
+        """flush(), выгрузка простаивающих объектов из всех map (кроме ключей pinned) и запись удалений."""
+        self.flush()
+        n = sum(m.evict(policy, pinned) for m in self.maps)
+        if n:
+            self.flush()
+        return n
+
+    def close(self) -> None:
+        self.flush()
+        self.backend.close()
+
+
+def open_backend(kind: str = "sqlite", path: str = "liers_state.db") -> StateBackend:
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(path)
+    raise ValueError(f"Неизвестный STATE_BACKEND: {kind} (доступно: sqlite, memory)")
@@ -0,0 +1,202 @@
+"""Локальная заглушка Telegram Bot API для бенчмарков и тестов.
+
+Отвечает на методы, которыми пользуется бот, правдоподобными JSON-ответами,
+записывает каждый вызов и умеет имитировать сетевую задержку. Два варианта:
+- HTTP-сервер (serve_stub): TELEGRAM_API_URL=http://127.0.0.1:<port>/bot;
+- без сети (StubRequest): build_app(request=StubRequest(stub)).
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram.request import BaseRequest, RequestData
+from tornado.httpserver import HTTPServer
+from tornado.netutil import bind_sockets
+from tornado.web import Application as WebApp, RequestHandler
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Liar's Deck", "username": "liers_test_bot"}
+
+
+@dataclass
+class ApiCall:
+    method: str
+    params: Dict[str, Any]
+    at: float  # time.perf_counter() момента получения
+
+
+class StubError(Exception):
+    """Ошибка метода: заглушка ответит {"ok": false, "error_code": ..., "description": ...}."""
+
+    def __init__(self, description: str, code: int = 400) -> None:
+        super().__init__(description)
+        self.description = description
+        self.code = code
+
+
+@dataclass
+class StubTelegram:
+    """Состояние заглушки: журнал вызовов, отправленные сообщения и счётчик message_id."""
+    latency: float = 0.0  # секунды на каждый вызов
+    calls: List[ApiCall] = field(default_factory=list)
+    messages: Dict[Tuple[int, int], str] = field(default_factory=dict)  # (chat_id, message_id) -> текст
+    _ids: Any = field(default_factory=lambda: itertools.count(1))
+    _waiters: List[tuple] = field(default_factory=list)
+
+    def respond(self, method: str, params: Dict[str, Any]) -> Any:
+        """Результат метода Bot API (поле `result` ответа); ошибки — StubError."""
+        self.calls.append(ApiCall(method, params, time.perf_counter()))
+        self._wake(method)
+        m = method.lower()
+        if m == "getme":
+            return BOT_USER
+        if m == "deletemessage":
+            if self.messages.pop((int(params["chat_id"]), int(params["message_id"])), None) is None:
+                raise StubError("Bad Request: message to delete not found")
+            return True
+        if m in ("sendmessage", "editmessagetext"):
+            chat_id = int(params.get("chat_id", 0))
+            text = params.get("text", "")
+            if m == "editmessagetext":
+                key = (chat_id, int(params["message_id"]))
+                if key not in self.messages:
+                    raise StubError("Bad Request: message to edit not found")
+                if self.messages[key] == text:
+                    raise StubError(
+                        "Bad Request: message is not modified: specified new message content and reply "
+                        "markup are exactly the same as a current content and reply markup of the message"
+                    )
+                message_id = key[1]
+            else:
+                message_id = next(self._ids)
+            self.messages[(chat_id, message_id)] = text
+            return {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"},
+                "from": BOT_USER,
+                "text": text,
+            }
+        if m == "getwebhookinfo":
+            return {"url": "", "has_custom_certificate": False, "pending_update_count": 0}
+        return True
+
+    def count(self, method: Optional[str] = None) -> int:
+        if method is None:
+            return len(self.calls)
+        return sum(1 for c in self.calls if c.method.lower() == method.lower())
+
+    def wait_for(self, method: str) -> "asyncio.Future[ApiCall]":
+        """Future, которая завершится при следующем вызове `method`."""
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((method.lower(), fut))
+        return fut
+
+    def _wake(self, method: str) -> None:
+        keep = []
+        for m, fut in self._waiters:
+            if m == method.lower() and not fut.done():
+                fut.set_result(self.calls[-1])
+            elif not fut.done():
+                keep.append((m, fut))
+        self._waiters = keep
+
+    def reply(self, method: str, params: Dict[str, Any]) -> Tuple[int, str]:
+        """HTTP-код и тело ответа Bot API на вызов метода."""
+        try:
+            return 200, json.dumps({"ok": True, "result": self.respond(method, params)})
+        except StubError as e:
+            return e.code, json.dumps({"ok": False, "error_code": e.code, "description": e.description})
+
+
+class StubRequest(BaseRequest):
+    """Транспорт PTB, который вместо HTTP отвечает из StubTelegram (с той же задержкой)."""
+
+    def __init__(self, stub: StubTelegram) -> None:
+        self.stub = stub
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(
+        self, url: str, method: str, request_data: Optional[RequestData] = None, *args: Any, **kwargs: Any
+    ) -> tuple:
+        if self.stub.latency:
+            await asyncio.sleep(self.stub.latency)
+        params = request_data.parameters if request_data else {}
+        code, body = self.stub.reply(url.rsplit("/", 1)[-1], params)
+        return code, body.encode()
+
+
+def command_update(update_id: int, uid: int, chat_id: int, text: str, username: Optional[str] = None) -> dict:
+    """JSON апдейта с командой (как его присылает Telegram)."""
+    cmd = text.split()[0]
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+            "from": {"id": uid, "is_bot": False, "first_name": f"user{uid}", "username": username or f"user{uid}"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(cmd)}],
+        },
+    }
+
+
+def callback_update(update_id: int, uid: int, chat_id: int, message_id: int, data: str) -> dict:
+    """JSON апдейта с нажатием инлайн-кнопки под сообщением бота message_id."""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "chat_instance": str(chat_id),
+            "from": {"id": uid, "is_bot": False, "first_name": f"user{uid}", "username": f"user{uid}"},
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+                "from": BOT_USER,
+                "text": "",
+            },
+            "data": data,
+        },
+    }
+
+
+def _parse_params(handler: RequestHandler) -> Dict[str, Any]:
+    body = handler.request.body
+    if handler.request.headers.get("Content-Type", "").startswith("application/json") and body:
+        return json.loads(body)
+    return {k: v[-1].decode() for k, v in handler.request.body_arguments.items()}
+
+
+class _MethodHandler(RequestHandler):
+    def initialize(self, stub: StubTelegram) -> None:
+        self.stub = stub
+
+    async def post(self, token: str, method: str) -> None:
+        if self.stub.latency:
+            await asyncio.sleep(self.stub.latency)
+        code, body = self.stub.reply(method, _parse_params(self))
+        self.set_status(code)
+        self.set_header("Content-Type", "application/json")
+        self.write(body)
+
+    get = post
+
+
+def serve_stub(stub: StubTelegram, port: int = 0, address: str = "127.0.0.1") -> tuple:
+    """Запускает HTTP-заглушку в текущем event loop. Возвращает (server, base_url)."""
+    app = WebApp([(r"/bot([^/]+)/(\w+)", _MethodHandler, {"stub": stub})])
+    server = HTTPServer(app)
+    sockets = bind_sockets(port, address=address)
+    server.add_sockets(sockets)
+    real_port = sockets[0].getsockname()[1]
+    return server, f"http://{address}:{real_port}/bot"
@@ -0,0 +1,137 @@
+"""Webhook-режим: `python -m bot.webhook` (см. render.yaml).
+
+Порт открывается сразу при старте, ещё до обращения к Telegram, поэтому
+keep-alive пинг и первые апдейты после пробуждения не ждут инициализации:
+апдейты складываются в очередь приложения и обрабатываются, как только оно
+запустится. setWebhook выполняется в фоне и не задерживает первый ответ.
+"""
+from __future__ import annotations
+import asyncio
+import hmac
+import json
+import logging
+import os
+import signal
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+from telegram import Update
+from telegram.ext import Application
+from tornado.httpserver import HTTPServer
+from tornado.web import Application as WebApp, RequestHandler
+
+from bot.main import SHUTDOWN_STOP_TIMEOUT, build_app
+
+logger = logging.getLogger("liers-bot.webhook")
+
+STARTED_AT = time.perf_counter()
+
+WEBHOOK_PUBLIC_URL = os.getenv("WEBHOOK_PUBLIC_URL", "")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+PORT = int(os.getenv("PORT", "8080"))
+LISTEN = os.getenv("LISTEN", "0.0.0.0")
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class HealthHandler(RequestHandler):
+    """Дешёвый ответ для keep-alive пинга (.github/workflows/ping.yaml): без обращения к Telegram."""
+
+    def get(self) -> None:
+        self.write("ok")
+
+    def head(self) -> None:
+        self.set_status(200)
+
+
+class TelegramHandler(RequestHandler):
+    """Принимает апдейты от Telegram, проверяя секрет в каждом запросе."""
+
+    def initialize(self, app: Application, secret: str) -> None:
+        self.app = app
+        self.secret = secret
+
+    async def post(self) -> None:
+        got = self.request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(got.encode(), self.secret.encode()):
+            self.set_status(403)
+            return
+        try:
+            data = json.loads(self.request.body)
+            update = Update.de_json(data, self.app.bot)
+        except Exception:
+            logger.warning("Не удалось разобрать апдейт", exc_info=True)
+            self.set_status(400)
+            return
+        # Отвечаем сразу: обработка идёт в приложении, а не в HTTP-запросе
+        await self.app.update_queue.put(update)
+        self.set_status(200)
+
+
+def make_web_app(app: Application, secret: str, path: str = WEBHOOK_PATH) -> WebApp:
+    return WebApp([
+        (r"/", HealthHandler),
+        (r"/healthz", HealthHandler),
+        (path, TelegramHandler, {"app": app, "secret": secret}),
+    ])
+
+
+def webhook_url(public_url: str, path: str = WEBHOOK_PATH) -> str:
+    base = public_url.rstrip("/")
+    # если путь уже указан в WEBHOOK_PUBLIC_URL — не дублируем
+    if urlsplit(base).path.endswith(path):
+        return base
+    return base + path
+
+
+async def _set_webhook(app: Application, url: str, secret: str) -> None:
+    try:
+        await app.bot.set_webhook(url=url, secret_token=secret, allowed_updates=Update.ALL_TYPES)
+        logger.info("Webhook установлен: %s", url)
+    except Exception:
+        logger.exception("Не удалось установить webhook")
+
+
+async def serve(stop: Optional[asyncio.Event] = None) -> None:
+    if not WEBHOOK_PUBLIC_URL or not WEBHOOK_SECRET:
+        raise SystemExit("Нужны WEBHOOK_PUBLIC_URL и WEBHOOK_SECRET.")
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    app = build_app()
+    server = HTTPServer(make_web_app(app, WEBHOOK_SECRET))
+    server.listen(PORT, address=LISTEN)
+    logger.info("Порт %s открыт через %.0f мс", PORT, (time.perf_counter() - STARTED_AT) * 1000)
+
+    await app.initialize()
+    if app.post_init:  # run_polling/run_webhook вызывают их сами, здесь — мы
+        await app.post_init(app)
+    await app.start()
+    hook = asyncio.create_task(_set_webhook(app, webhook_url(WEBHOOK_PUBLIC_URL), WEBHOOK_SECRET))
+    logger.info("Бот готов через %.0f мс после старта", (time.perf_counter() - STARTED_AT) * 1000)
+
+    try:
+        await stop.wait()
+    finally:
+        server.stop()
+        hook.cancel()
+        try:  # app.stop() ждёт все апдейты из очереди — не дольше отведённого на остановку
+            await asyncio.wait_for(app.stop(), SHUTDOWN_STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Апдейты не обработаны за %.0f с, остановка без них", SHUTDOWN_STOP_TIMEOUT)
+        if app.post_stop:
+            await app.post_stop(app)
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
@@ -0,0 +1,53 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, Iterable
+
+from .game import GameState
+from .models import Rank
+
+# Карта — один байт: индекс ранга в RANKS
+RANKS = (Rank.K, Rank.Q, Rank.J, Rank.TR)
+CODES = {r: i for i, r in enumerate(RANKS)}
+
+# 8K, 8Q, 8J, 4TR — в том же порядке, что и _fresh_deck
+_FRESH = bytes([0] * 8 + [1] * 8 + [2] * 8 + [3] * 4)
+
+
+def _fresh_compact_deck() -> bytearray:
+    return bytearray(_FRESH)
+
+
+@dataclass(slots=True)
+class CompactGameState(GameState):
+    """
+    GameState, где колода и руки — bytearray кодов рангов вместо списков Card.
+    Правила, порядок карт и расход случайности те же, поэтому play/accuse/
+    hand_str/status ведут себя идентично GameState.
+    """
+    deck: bytearray = field(default_factory=_fresh_compact_deck)
+    hands: Dict[int, bytearray] = field(default_factory=dict)
+
+    @staticmethod
+    def _new_deck() -> bytearray:
+        return bytearray(_FRESH)
+
+    @staticmethod
+    def _cards(ranks: Iterable[Rank] = ()) -> bytearray:
+        return bytearray(CODES[r] for r in ranks)
+
+    @staticmethod
+    def _card(rank: Rank) -> int:
+        return CODES[rank]
+
+    @staticmethod
+    def _rank(card: int) -> Rank:
+        return RANKS[card]
+
+    def _take(self, n: int) -> bytearray:
+        # срез вместо поштучного pop(); reverse() сохраняет порядок «снятия с верха»
+        deck = self.deck
+        cut = max(0, len(deck) - n)
+        hand = deck[cut:]
+        del deck[cut:]
+        hand.reverse()
+        return hand
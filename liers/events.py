@@ -0,0 +1,416 @@
+"""Журнал ходов партии и детерминированное воспроизведение.
+
+Каждое изменение GameState (new, join, start, play, accuse, stop) записывается
+событием вместе со всеми случайными числами, которые оно израсходовало:
+RecordingRandomness запоминает результаты randbelow (на нём построены shuffle
+и choice), а при воспроизведении TapeRandomness выдаёт их обратно. Поэтому
+replay(events[:k]) восстанавливает состояние партии после любого k-го события.
+Событие new хранит движок партии (ENGINES) и число колод, чтобы replay
+создавал тот же класс, что и бот.
+
+Формат на диске — байты, по файлу на чат, только дописывание:
+    MAGIC, затем записи: код вида, поля вида (varint), число розыгрышей, розыгрыши.
+Целые — zigzag-varint, имя — длина + UTF-8, ранг — индекс в RANKS.
+Недописанная последняя запись (процесс упал посреди flush) при чтении отбрасывается.
+"""
+from __future__ import annotations
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, Type
+
+from .compact import CompactGameState
+from .game import GameState
+from .lobby import LargeLobbyGameState
+from .models import Rank
+from .rng import Randomness
+
+MAGIC = b"LEV1"
+
+RANKS = (Rank.K, Rank.Q, Rank.J, Rank.TR)
+_RANK_CODE = {r: i for i, r in enumerate(RANKS)}
+
+KINDS = ("new", "join", "start", "play", "accuse", "stop")
+_KIND_CODE = {k: i for i, k in enumerate(KINDS)}
+# new с движком: имя движка и число колод. Старые журналы пишут new без полей (код 0)
+_NEW_ENGINE = len(KINDS)
+
+# Движки партии по имени (как GAME_ENGINE бота)
+ENGINES: Dict[str, Type[GameState]] = {
+    "classic": GameState, "compact": CompactGameState, "large": LargeLobbyGameState,
+}
+_ENGINE_NAME = {cls: name for name, cls in ENGINES.items()}
+
+
+class Event(NamedTuple):
+    kind: str
+    uid: int = 0
+    index: int = 0                 # play: индекс карты в руке; new: число колод (large)
+    rank: Optional[Rank] = None    # play: заявленный ранг
+    name: str = ""                 # join: имя игрока; new: движок (ключ ENGINES)
+    draws: Tuple[int, ...] = ()    # результаты randbelow, израсходованные событием
+
+
+class RecordingRandomness(Randomness):
+    """Берёт числа у inner и запоминает их до take()."""
+
+    def __init__(self, inner: Randomness) -> None:
+        self.inner = inner
+        self.draws: List[int] = []
+
+    def randbelow(self, n: int) -> int:
+        value = self.inner.randbelow(n)
+        self.draws.append(value)
+        return value
+
+    def take(self) -> Tuple[int, ...]:
+        draws, self.draws = tuple(self.draws), []
+        return draws
+
+    def getstate(self) -> Optional[tuple]:
+        inner = self.inner.getstate()
+        return None if inner is None else (inner, len(self.draws))
+
+    def setstate(self, state: tuple) -> None:
+        inner, n = state
+        self.inner.setstate(inner)
+        del self.draws[n:]
+
+
+class ReplayError(ValueError):
+    """Журнал не соответствует правилам (повреждён или записан другой версией игры)."""
+
+
+class TapeRandomness(Randomness):
+    """Выдаёт заранее записанные результаты randbelow."""
+
+    def __init__(self, draws: Sequence[int] = ()) -> None:
+        self.load(draws)
+
+    def load(self, draws: Sequence[int]) -> None:
+        self._tape = draws
+        self._pos = 0
+
+    def getstate(self) -> tuple:
+        return self._tape, self._pos
+
+    def setstate(self, state: tuple) -> None:
+        self._tape, self._pos = state
+
+    def randbelow(self, n: int) -> int:
+        if self._pos >= len(self._tape):
+            raise ReplayError("в журнале не хватает случайных чисел")
+        value = self._tape[self._pos]
+        self._pos += 1
+        if not 0 <= value < n:
+            raise ReplayError(f"записанное число {value} вне [0, {n})")
+        return value
+
+    @property
+    def exhausted(self) -> bool:
+        return self._pos == len(self._tape)
+
+
+class Journal:
+    """Подключается к GameState (gs.journal) и передаёт его события в sink(chat_id, Event)."""
+
+    def __init__(self, chat_id: int, sink: Callable[[int, Event], None], rng: Randomness) -> None:
+        self.chat_id = chat_id
+        self.sink = sink
+        self.rng = RecordingRandomness(rng)
+        self.engine = ("", 0)  # движок и колоды подключённой партии — для события new
+
+    def attach(self, gs: GameState) -> GameState:
+        gs.rng = self.rng
+        gs.journal = self
+        self.engine = _ENGINE_NAME.get(type(gs), ""), getattr(gs, "decks", 0)
+        return gs
+
+    def record(self, kind: str, uid: int = 0, index: int = 0, rank: Optional[Rank] = None, name: str = "") -> None:
+        if kind == "new" and not name:
+            name, index = self.engine
+        self.sink(self.chat_id, Event(kind, uid, index, rank, name, self.rng.take()))
+
+
+# --- Воспроизведение ---
+
+def apply(gs: GameState, ev: Event) -> None:
+    """Применить событие (кроме new) к партии; gs.rng должен выдавать ev.draws."""
+    kind = ev.kind
+    if kind == "play":
+        gs.play(ev.uid, ev.index, ev.rank)
+    elif kind == "accuse":
+        gs.accuse(ev.uid)
+    elif kind == "join":
+        gs.add_player(ev.uid, ev.name)
+    elif kind == "start":
+        gs.start()
+    elif kind == "stop":
+        gs.stop()
+    else:
+        raise ReplayError(f"неизвестное событие {kind}")
+
+
+def _engine(i: int, ev: Event, cls: Optional[Type[GameState]]) -> Tuple[Type[GameState], dict]:
+    """Класс партии и его аргументы для события new (движок из журнала, иначе cls)."""
+    if not ev.name:
+        if cls is None:
+            raise ReplayError(f"событие {i} (new) не указывает движок: передайте cls")
+        return cls, {}
+    recorded = ENGINES.get(ev.name)
+    if recorded is None:
+        raise ReplayError(f"событие {i} (new): неизвестный движок {ev.name}")
+    if cls is not None and cls is not recorded:
+        raise ReplayError(f"событие {i} (new): партия записана движком {ev.name}, а не {cls.__name__}")
+    return recorded, ({"decks": ev.index} if ev.index else {})
+
+
+def replay(
+    chat_id: int, events: Iterable[Event], upto: Optional[int] = None, cls: Optional[Type[GameState]] = None
+) -> GameState:
+    """Состояние партии после первых upto событий (по умолчанию — после всех).
+
+    Событие new начинает партию заново (как /newgame), поэтому можно
+    передавать весь журнал чата. Движок берётся из события new; cls нужен
+    только для журналов, где он не записан (и для событий до первого new).
+    """
+    tape = TapeRandomness()
+    gs = cls(chat_id=chat_id, rng=tape) if cls is not None else None
+    for i, ev in enumerate(events):
+        if upto is not None and i >= upto:
+            break
+        if ev.kind == "new":
+            engine, extra = _engine(i, ev, cls)
+            gs = engine(chat_id=chat_id, rng=tape, **extra)
+            continue
+        if gs is None:
+            raise ReplayError(f"событие {i} ({ev.kind}) до new: движок неизвестен, передайте cls")
+        tape.load(ev.draws)
+        try:
+            apply(gs, ev)
+        except ValueError as e:
+            raise ReplayError(f"событие {i} ({ev.kind}) не применяется: {e}") from e
+        if not tape.exhausted:
+            raise ReplayError(f"событие {i} ({ev.kind}) израсходовало не все записанные числа")
+    if gs is None:
+        raise ReplayError("в журнале нет событий: движок неизвестен, передайте cls")
+    return gs
+
+
+# --- Кодирование ---
+
+def _put(out: bytearray, value: int) -> None:
+    v = (value << 1) ^ (value >> 63) if value < 0 else value << 1  # zigzag
+    while v >= 0x80:
+        out.append((v & 0x7F) | 0x80)
+        v >>= 7
+    out.append(v)
+
+
+def _get(buf: bytes, pos: int) -> Tuple[int, int]:
+    v = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        v |= (b & 0x7F) << shift
+        if b < 0x80:
+            break
+        shift += 7
+    return (v >> 1) ^ -(v & 1), pos
+
+
+def encode(events: Iterable[Event], out: Optional[bytearray] = None) -> bytearray:
+    """Дописать события в out (без MAGIC)."""
+    out = bytearray() if out is None else out
+    for ev in events:
+        kind = ev.kind
+        if kind == "new" and ev.name:
+            out.append(_NEW_ENGINE)
+            name = ev.name.encode()
+            _put(out, len(name))
+            out += name
+            _put(out, ev.index)
+        else:
+            out.append(_KIND_CODE[kind])
+        if kind == "play":
+            _put(out, ev.uid)
+            _put(out, ev.index)
+            out.append(_RANK_CODE[ev.rank])
+        elif kind == "accuse":
+            _put(out, ev.uid)
+        elif kind == "join":
+            _put(out, ev.uid)
+            name = ev.name.encode()
+            _put(out, len(name))
+            out += name
+        _put(out, len(ev.draws))
+        for d in ev.draws:
+            _put(out, d)
+    return out
+
+
+class _Truncated(Exception):
+    """Запись обрывается на конце буфера."""
+
+
+def _byte(buf: bytes, pos: int) -> int:
+    if pos >= len(buf):
+        raise _Truncated
+    return buf[pos]
+
+
+def _varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    try:
+        return _get(buf, pos)
+    except IndexError:
+        raise _Truncated from None
+
+
+def _text(buf: bytes, pos: int) -> Tuple[str, int]:
+    n, pos = _varint(buf, pos)
+    if n < 0:
+        raise ReplayError(f"отрицательная длина имени на байте {pos}")
+    if pos + n > len(buf):
+        raise _Truncated
+    try:
+        return buf[pos:pos + n].decode(), pos + n
+    except UnicodeDecodeError as e:
+        raise ReplayError(f"имя на байте {pos} — не UTF-8") from e
+
+
+def _record(buf: bytes, pos: int) -> Tuple[Event, int]:
+    code = _byte(buf, pos)
+    pos += 1
+    uid = index = 0
+    rank = None
+    name = ""
+    if code == _NEW_ENGINE:
+        kind = "new"
+        name, pos = _text(buf, pos)
+        index, pos = _varint(buf, pos)
+    elif code < len(KINDS):
+        kind = KINDS[code]
+    else:
+        raise ReplayError(f"неизвестный код события {code} на байте {pos - 1}")
+    if kind == "play":
+        uid, pos = _varint(buf, pos)
+        index, pos = _varint(buf, pos)
+        r = _byte(buf, pos)
+        if r >= len(RANKS):
+            raise ReplayError(f"неизвестный ранг {r} на байте {pos}")
+        rank = RANKS[r]
+        pos += 1
+    elif kind == "accuse":
+        uid, pos = _varint(buf, pos)
+    elif kind == "join":
+        uid, pos = _varint(buf, pos)
+        name, pos = _text(buf, pos)
+    n, pos = _varint(buf, pos)
+    draws = []
+    for _ in range(n):
+        d, pos = _varint(buf, pos)
+        draws.append(d)
+    return Event(kind, uid, index, rank, name, tuple(draws)), pos
+
+
+def _scan(buf: bytes) -> Tuple[List[Event], int]:
+    """События журнала и конец последней целой записи."""
+    if not buf.startswith(MAGIC):
+        raise ReplayError("это не журнал событий")
+    events: List[Event] = []
+    pos = len(MAGIC)
+    end = len(buf)
+    while pos < end:
+        try:
+            ev, nxt = _record(buf, pos)
+        except _Truncated:
+            break
+        events.append(ev)
+        pos = nxt
+    return events, pos
+
+
+def decode(buf: bytes) -> List[Event]:
+    """События журнала; недописанная последняя запись отбрасывается, испорченная — ReplayError."""
+    return _scan(buf)[0]
+
+
+class EventLog:
+    """
+    Журналы партий по чатам: append() копит закодированные события в памяти,
+    flush() дописывает их в <directory>/<chat_id>.lev (одна запись на чат за flush).
+    Без directory журнал живёт только в памяти (тесты, симуляции).
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self.directory = directory
+        self._pending: Dict[int, bytearray] = {}
+        self._memory: Dict[int, bytearray] = {}
+        self._checked: Set[int] = set()  # файлы, чей хвост уже проверен этим процессом
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def append(self, chat_id: int, ev: Event) -> None:
+        buf = self._pending.get(chat_id)
+        if buf is None:
+            buf = self._pending[chat_id] = bytearray()
+        encode((ev,), buf)
+
+    def journal(self, chat_id: int, rng: Randomness) -> Journal:
+        return Journal(chat_id, self.append, rng)
+
+    def path(self, chat_id: int) -> str:
+        return os.path.join(self.directory, f"{chat_id}.lev")
+
+    def flush(self) -> int:
+        """Записать накопленное; возвращает число байт."""
+        pending, self._pending = self._pending, {}
+        written = 0
+        for chat_id, buf in pending.items():
+            written += len(buf)
+            if not self.directory:
+                self._memory.setdefault(chat_id, bytearray(MAGIC)).extend(buf)
+                continue
+            path = self.path(chat_id)
+            if chat_id not in self._checked:
+                self._cut_tail(path)
+                self._checked.add(chat_id)
+            with open(path, "ab") as f:
+                if f.tell() == 0:
+                    f.write(MAGIC)
+                f.write(buf)
+        return written
+
+    @staticmethod
+    def _cut_tail(path: str) -> None:
+        """Отрезать недописанную запись (процесс упал посреди flush), чтобы новые не склеились с ней."""
+        try:
+            with open(path, "r+b") as f:
+                data = f.read()
+                if len(data) < len(MAGIC) and MAGIC.startswith(data):
+                    f.truncate(0)  # оборвался даже заголовок
+                    return
+                try:
+                    _, end = _scan(data)
+                except ReplayError:
+                    return  # испорчен не хвост — не трогаем, read() сообщит об ошибке
+                if end < len(data):
+                    f.truncate(end)
+        except FileNotFoundError:
+            pass
+
+    def read(self, chat_id: int) -> List[Event]:
+        """Все записанные события чата (после flush)."""
+        if not self.directory:
+            return decode(bytes(self._memory.get(chat_id, MAGIC)))
+        try:
+            with open(self.path(chat_id), "rb") as f:
+                return decode(f.read())
+        except FileNotFoundError:
+            return []
+
+    def chats(self) -> Iterator[int]:
+        if not self.directory:
+            yield from self._memory
+            return
+        for entry in os.listdir(self.directory):
+            if entry.endswith(".lev"):
+                yield int(entry[:-4])
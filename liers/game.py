@@ -1,8 +1,18 @@
 from __future__ import annotations
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple
-import secrets
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from .models import Rank, Card, Player
+from .rng import Randomness, SYSTEM_RNG
+from .timing import timed
+
+
+# Ранги, которые могут стать темой (козырь — нет)
+TOPICS = (Rank.K, Rank.Q, Rank.J)
+# Состав одной колоды: K, Q, J, TR
+DECK = (8, 8, 8, 4)
+# Карт в руке при раздаче и доборе
+HAND_SIZE = 5
 
 
 def _fresh_deck() -> List[Card]:
@@ -15,14 +25,35 @@ def _fresh_deck() -> List[Card]:
     return deck
 
 
-@dataclass
+@dataclass(slots=True)
 class LastPlay:
     player_id: int
     actual_rank: Rank
     claimed_rank: Rank
+    hand_size: int = 5  # карт в руке заявившего перед ходом (после redeal — не обязательно 5)
+
+
+@dataclass(slots=True)
+class Fork:
+    """Точка отката для GameState.restore(): копии изменяемых частей партии и позиция генератора.
 
+    Карты, игроки и LastPlay на месте не меняются, поэтому копируются только
+    контейнеры (списки/bytearray и словари), а не их содержимое.
+    """
+    players: List[Player]
+    started: bool
+    deck: Any
+    hands: Dict[int, Any]
+    topic: Optional[Rank]
+    idx: int
+    last_play: Optional[LastPlay]
+    alive: Dict[int, bool]
+    revolvers: Dict[int, int]
+    rng: Optional[tuple]  # None — генератор не откатывается
+    extra: Any = None  # состояние подклассов (кольцо живых в LargeLobbyGameState)
 
-@dataclass
+
+@dataclass(slots=True)
 class GameState:
     chat_id: int
     players: List[Player] = field(default_factory=list)
@@ -34,10 +65,45 @@ class GameState:
     last_play: Optional[LastPlay] = None
     alive: Dict[int, bool] = field(default_factory=dict)
     revolvers: Dict[int, int] = field(default_factory=dict)  # per-player remaining chambers (start 6)
+    rng: Randomness = field(default=SYSTEM_RNG, repr=False, compare=False)
+    # Журнал ходов (liers.events.Journal): если подключён, каждое изменение записывается событием
+    journal: Any = field(default=None, repr=False, compare=False)
+    # Номер изменения: растёт при каждом изменении партии; status() и hand_str() кешируются по нему
+    version: int = field(default=0, repr=False, compare=False)
+    _status: Optional[Tuple[int, str]] = field(default=None, repr=False, compare=False)
+    _hand_text: Dict[int, Tuple[int, str]] = field(default_factory=dict, repr=False, compare=False)
+
+    # --- Представление карт (переопределяется в CompactGameState) ---
+    @staticmethod
+    def _new_deck():
+        return _fresh_deck()
+
+    @staticmethod
+    def _cards(ranks=()):
+        """Пустая (или заполненная рангами) колода/рука."""
+        return [Card(rank=r) for r in ranks]
+
+    @staticmethod
+    def _card(rank: Rank):
+        return Card(rank=rank)
+
+    @staticmethod
+    def _rank(card) -> Rank:
+        return card.rank
+
+    def _take(self, n: int):
+        """Снять до n карт с верха колоды."""
+        hand = self._cards()
+        for _ in range(n):
+            if not self.deck:
+                break
+            hand.append(self.deck.pop())
+        return hand
 
     def reset(self):
+        self.version += 1
         self.started = False
-        self.deck = _fresh_deck()
+        self.deck = self._new_deck()
         self.hands.clear()
         self.current_topic = None
         self.current_idx = 0
@@ -49,54 +115,73 @@ class GameState:
     def add_player(self, uid: int, username: str):
         if any(p.user_id == uid for p in self.players):
             return
+        self.version += 1
         self.players.append(Player(uid, username or str(uid)))
         self.alive[uid] = True
         self.revolvers[uid] = 6
+        if self.journal is not None:
+            self.journal.record("join", uid, name=self.players[-1].username)
 
     def remove_dead(self):
+        self.version += 1
         self.players = [p for p in self.players if self.alive.get(p.user_id, False)]
         if self.current_idx >= len(self.players):
             self.current_idx = 0
 
+    def _kill(self, uid: int) -> None:
+        """Игрок выбыл после выстрела."""
+        self.alive[uid] = False
+        self.remove_dead()
+
+    def _sole_survivor(self) -> Optional[Player]:
+        """Последний живой игрок, если остался ровно один."""
+        alive_players = [p for p in self.players if self.alive.get(p.user_id, False)]
+        return alive_players[0] if len(alive_players) == 1 else None
+
     # --- Раздача и старт ---
+    @timed("start")
     def start(self):
         if self.started:
             raise ValueError("Игра уже начата.")
         if len(self.players) < 2:
             raise ValueError("Нужно минимум 2 игрока.")
-        self.reset()
-        if len(self.players) * 5 > len(self.deck):
+        self.reset()  # меняет version
+        if len(self.players) * HAND_SIZE > len(self.deck):
             raise ValueError("Максимум 5 игроков для этой колоды (28 карт по 5 на игрока).")
-        # Перетасовка через secrets (криптоустойчивый рандом)
-        deck = self.deck
-        for i in range(len(deck) - 1, 0, -1):
-            j = secrets.randbelow(i + 1)
-            deck[i], deck[j] = deck[j], deck[i]
+        # Перетасовка криптостойким буферизованным генератором
+        self.rng.shuffle(self.deck)
         # Раздача по 5 карт
         for p in self.players:
-            self.hands[p.user_id] = [self.deck.pop() for _ in range(5)]
+            self.hands[p.user_id] = self._take(HAND_SIZE)
         # Тема
-        self.current_topic = secrets.choice([Rank.K, Rank.Q, Rank.J])
+        self.current_topic = self.rng.choice(TOPICS)
         # Стартовый игрок
-        self.current_idx = secrets.randbelow(len(self.players))
+        self.current_idx = self.rng.randbelow(len(self.players))
         self.started = True
         self.last_play = None
+        if self.journal is not None:
+            self.journal.record("start")
+
+    def deck_composition(self) -> Tuple[int, int, int, int]:
+        """Сколько карт K, Q, J, TR во всей игре (в колоде, руках и на столе)."""
+        return DECK
 
     def draw_if_possible(self, uid: int):
         # Добор при пустой руке
         if not self.hands[uid] and self.deck:
+            self.version += 1
             # если колода кончилась — новая сдача
-            to_draw = min(5, len(self.deck))
-            self.hands[uid] = [self.deck.pop() for _ in range(to_draw)]
+            self.hands[uid] = self._take(HAND_SIZE)
             # при новой фазе добора можно обновить тему
             if self.current_topic is None:
-                self.current_topic = secrets.choice([Rank.K, Rank.Q, Rank.J])
+                self.current_topic = self.rng.choice(TOPICS)
 
     # --- Ход и обвинение ---
     def _topup_player_to_five(self, uid: int) -> None:
         """Добрать карты этому игроку до 5, если в колоде есть карты."""
-        hand = self.hands.setdefault(uid, [])
-        while len(hand) < 5 and self.deck:
+        self.version += 1
+        hand = self.hands.setdefault(uid, self._cards())
+        while len(hand) < HAND_SIZE and self.deck:
             hand.append(self.deck.pop())
 
     def _topup_alive_to_five(self) -> None:
@@ -105,33 +190,29 @@ class GameState:
             if self.alive.get(p.user_id, False):
                 self._topup_player_to_five(p.user_id)
 
+    @timed("redeal")
     def _redeal_alive_to_five(self, last_play_rank: Optional[Rank] = None) -> None:
         """Полная замена рук: собрать все карты обратно в колоду, перемешать и раздать по 5 живым."""
+        self.version += 1
         # Собрать все карты из рук в колоду
         for uid, hand in list(self.hands.items()):
             if hand:
                 self.deck.extend(hand)
-                self.hands[uid] = []
+                self.hands[uid] = self._cards()
         # Вернуть последнюю сыгранную карту в колоду (если есть)
         if last_play_rank is not None:
-            self.deck.append(Card(rank=last_play_rank))
+            self.deck.append(self._card(last_play_rank))
         # Перетасовать колоду
-        deck = self.deck
-        for i in range(len(deck) - 1, 0, -1):
-            j = secrets.randbelow(i + 1)
-            deck[i], deck[j] = deck[j], deck[i]
+        self.rng.shuffle(self.deck)
         # Раздать по 5 живым игрокам
         for p in self.players:
             if self.alive.get(p.user_id, False):
-                self.hands[p.user_id] = []
-                for _ in range(5):
-                    if not self.deck:
-                        break
-                    self.hands[p.user_id].append(self.deck.pop())
+                self.hands[p.user_id] = self._take(HAND_SIZE)
 
     def current_player(self) -> Player:
         return self.players[self.current_idx]
 
+    @timed("play")
     def play(self, uid: int, hand_index: int, claimed_rank: Rank) -> LastPlay:
         if not self.started:
             raise ValueError("Игра не начата.")
@@ -142,12 +223,18 @@ class GameState:
         hand = self.hands.get(uid, [])
         if hand_index < 0 or hand_index >= len(hand):
             raise ValueError("Неверный индекс карты.")
+        self.version += 1
+        hand_size = len(hand)
         actual_card = hand.pop(hand_index)
-        self.last_play = LastPlay(player_id=uid, actual_rank=actual_card.rank, claimed_rank=claimed_rank)
+        self.last_play = LastPlay(
+            player_id=uid, actual_rank=self._rank(actual_card), claimed_rank=claimed_rank, hand_size=hand_size
+        )
         # Переход хода к следующему живому
         self.current_idx = self._next_alive_idx(self.current_idx)
         # добор при необходимости
         self.draw_if_possible(uid)
+        if self.journal is not None:
+            self.journal.record("play", uid, hand_index, claimed_rank)
         return self.last_play
 
     def _next_alive_idx(self, idx: int) -> int:
@@ -159,6 +246,7 @@ class GameState:
                 return idx
         return idx  # если остался один, вернём как есть
 
+    @timed("accuse")
     def accuse(self, accuser_uid: int) -> Tuple[str, bool, Optional[int]]:
         """
         Возвращает: (сообщение, выстрел_случился, погибший_uid|None)
@@ -170,6 +258,7 @@ class GameState:
         # обвинять может только текущий по очереди (следующий после игрока, который уже походил)
         if accuser_uid != self.current_player().user_id:
             raise ValueError("Обвинять может только следующий игрок по очереди.")
+        self.version += 1
 
         lp = self.last_play
         # Особое правило темы: если фактическая карта совпадает с темой,
@@ -185,14 +274,13 @@ class GameState:
         remaining = self.revolvers.get(punished_uid, 6)
         if remaining < 1:
             remaining = 1
-        bullet = secrets.randbelow(remaining) == 0
+        bullet = self.rng.randbelow(remaining) == 0
         died_uid: Optional[int] = None
         if bullet:
-            self.alive[punished_uid] = False
             died_uid = punished_uid
             # Перезарядим барабан наказанного (если он выжил бы в будущем)
             self.revolvers[punished_uid] = 6
-            self.remove_dead()
+            self._kill(punished_uid)
         else:
             # Щелчок — шанс для этого игрока повышается
             next_remaining = max(1, remaining - 1)
@@ -200,16 +288,15 @@ class GameState:
 
         # После обвинения «вскрылись» — сбрасываем last_play
         self.last_play = None
-        self.current_topic = secrets.choice([Rank.K, Rank.Q, Rank.J])
+        self.current_topic = self.rng.choice(TOPICS)
 
         # После обвинения полностью меняем руки: возвращаем все карты в колоду, тасуем и раздаём по 5 живым
         self._redeal_alive_to_five(last_play_rank=lp.actual_rank)
 
         # Проверка конца игры
-        alive_players = [p for p in self.players if self.alive.get(p.user_id, False)]
+        winner = self._sole_survivor()
         winner_text = ""
-        if len(alive_players) == 1:
-            winner = alive_players[0]
+        if winner is not None:
             self.started = False
             winner_text = f"\n🏆 Победитель: @{winner.username}!"
 
@@ -226,6 +313,8 @@ class GameState:
             msg += f"\n🔫 Русская рулетка: щелчок... повезло @{self._name(punished_uid)}! (следующий шанс {hint})"
 
         msg += winner_text
+        if self.journal is not None:
+            self.journal.record("accuse", accuser_uid)
         return msg, bullet, died_uid
 
     def _name(self, uid: int) -> str:
@@ -235,35 +324,142 @@ class GameState:
         return str(uid)
 
     def status(self) -> str:
+        """Текст статуса; пока партия не менялась (version тот же), отдаётся готовая строка."""
+        cached = self._status
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        text = self._render_status()
+        self._status = (self.version, text)
+        return text
+
+    def _render_status(self) -> str:
         if not self.players:
             return "Лобби пустое. Используйте /join."
-        alive_marks = {uid: ("Жив(а)" if self.alive.get(uid, False) else "Выбыл(а)") for uid in self.alive}
-        order = " → ".join([f"@{p.username}({alive_marks.get(p.user_id,'')})" for p in self.players])
-        cur = self.current_player().username if self.started else "—"
+        marks = {True: "Жив(а)", False: "Выбыл(а)"}
+        order = " → ".join([
+            f"@{p.username}({marks[self.alive[p.user_id]] if p.user_id in self.alive else ''})" for p in self.players
+        ])
+        cur_player = self.current_player() if self.started else None
+        cur = cur_player.username if cur_player is not None else "—"
         topic = self.current_topic.value if self.current_topic else "—"
         pending = ""
         if self.last_play:
             pending = f"\nПоследний ход: @{self._name(self.last_play.player_id)} заявил {self.last_play.claimed_rank} (карта скрыта)."
         # вероятность для текущего игрока
-        cur_uid = self.current_player().user_id if self.started else None
-        odds = self.revolvers.get(cur_uid, 6) if cur_uid is not None else None
+        odds = self.revolvers.get(cur_player.user_id, 6) if cur_player is not None else None
         odds_line = f"\nШанс текущего игрока: 1/{odds}" if odds else ""
         return f"Игроки: {order}\nТема: {topic}\nХод: @{cur}{pending}{odds_line}"
 
     def hand_str(self, uid: int) -> str:
-        cards = self.hands.get(uid, [])
+        cached = self._hand_text.get(uid)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        cards = self.hands.get(uid)
         if not cards:
-            return "Рука пуста."
-        return "Ваша рука:\n" + "\n".join([f"{i}: {c.rank}" for i, c in enumerate(cards)])
+            text = "Рука пуста."
+        else:
+            text = "Ваша рука:\n" + "\n".join([f"{i}: {self._rank(c)}" for i, c in enumerate(cards)])
+        self._hand_text[uid] = (self.version, text)
+        return text
+
+    # --- Проба ходов ---
+    def fork(self) -> Fork:
+        """Запомнить партию, чтобы вернуться к ней restore(); один Fork можно восстанавливать много раз.
+
+        Позиция генератора откатывается, только если он детерминированный
+        (SeededRandomness, симуляции, воспроизведение журнала); поток SYSTEM_RNG
+        не откатывается. Журнал, если подключён, продолжает записывать события —
+        для пробных ходов есть trial().
+        """
+        return Fork(
+            self.players[:], self.started, self.deck[:], {uid: h[:] for uid, h in self.hands.items()},
+            self.current_topic, self.current_idx, self.last_play, self.alive.copy(), self.revolvers.copy(),
+            self.rng.getstate(), self._fork_extra(),
+        )
+
+    def restore(self, f: Fork) -> None:
+        """Вернуть партию (и позицию детерминированного генератора) к состоянию на момент fork()."""
+        self.version += 1  # номера версий не откатываются: иначе кеш отрисовки отдал бы текст пробного хода
+        self.players = f.players[:]
+        self.started = f.started
+        self.deck = f.deck[:]
+        self.hands = {uid: h[:] for uid, h in f.hands.items()}
+        self.current_topic = f.topic
+        self.current_idx = f.idx
+        self.last_play = f.last_play
+        self.alive = f.alive.copy()
+        self.revolvers = f.revolvers.copy()
+        if f.rng is not None:
+            self.rng.setstate(f.rng)
+        self._restore_extra(f.extra)
+
+    def _fork_extra(self) -> Any:
+        return None
+
+    def _restore_extra(self, extra: Any) -> None:
+        pass
+
+    @contextmanager
+    def trial(self, rng: Optional[Randomness] = None) -> Iterator["GameState"]:
+        """Пробные ходы: `with gs.trial(): gs.play(...)` — после блока партия та же, в журнал ничего не попало.
+
+        Случайность внутри блока — из отдельного одноразового генератора (или rng):
+        генератор партии не тронут, и проба не подсматривает его будущие числа.
+        """
+        f = self.fork()
+        journal, own = self.journal, self.rng
+        self.journal, self.rng = None, rng if rng is not None else Randomness(words=16)
+        try:
+            yield self
+        finally:
+            self.journal, self.rng = journal, own
+            self.restore(f)
+
+    # --- Сохранение ---
+    def to_dict(self) -> dict:
+        """Компактное JSON-совместимое представление (для хранилища состояния бота)."""
+        return {
+            "chat_id": self.chat_id,
+            "players": [[p.user_id, p.username] for p in self.players],
+            "started": self.started,
+            "deck": [self._rank(c).value for c in self.deck],
+            "hands": [[uid, [self._rank(c).value for c in hand]] for uid, hand in self.hands.items()],
+            "topic": self.current_topic.value if self.current_topic else None,
+            "idx": self.current_idx,
+            "last": [self.last_play.player_id, self.last_play.actual_rank.value, self.last_play.claimed_rank.value,
+                     self.last_play.hand_size]
+            if self.last_play else None,
+            "alive": [[uid, a] for uid, a in self.alive.items()],
+            "revolvers": [[uid, r] for uid, r in self.revolvers.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "GameState":
+        lp = d.get("last")
+        return cls(
+            chat_id=d["chat_id"],
+            players=[Player(uid, name) for uid, name in d["players"]],
+            started=d["started"],
+            deck=cls._cards(Rank(r) for r in d["deck"]),
+            hands={uid: cls._cards(Rank(r) for r in hand) for uid, hand in d["hands"]},
+            current_topic=Rank(d["topic"]) if d["topic"] else None,
+            current_idx=d["idx"],
+            last_play=LastPlay(lp[0], Rank(lp[1]), Rank(lp[2]), *lp[3:]) if lp else None,  # старые снимки — без размера руки
+            alive={uid: a for uid, a in d["alive"]},
+            revolvers={uid: r for uid, r in d["revolvers"]},
+        )
 
     def stop(self) -> str:
         """Принудительно завершить игру."""
+        self.version += 1
         self.started = False
-        self.deck = []
+        self.deck = self._cards()
         self.hands.clear()
         self.current_topic = None
         self.current_idx = 0
         self.last_play = None
         self.alive.clear()
         self.revolvers.clear()
+        if self.journal is not None:
+            self.journal.record("stop")
         return "❌ Игра остановлена администратором."
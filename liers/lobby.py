@@ -0,0 +1,156 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from .compact import CompactGameState, _FRESH
+from .game import DECK, HAND_SIZE
+from .models import Player
+
+
+def decks_for(players: int) -> int:
+    """Сколько колод по 28 карт нужно, чтобы раздать всем по 5 и осталось на добор."""
+    cards = players * HAND_SIZE
+    return max(1, cards // len(_FRESH) + 1)
+
+
+@dataclass(slots=True)
+class LargeLobbyGameState(CompactGameState):
+    """
+    Игра на 20+ игроков: колода из нескольких стандартных (по 28 карт),
+    индекс user_id -> Player и кольцо живых игроков (соседи по кругу в
+    _next/_prev), поэтому передача хода, выбывание и поиск имени — O(1).
+
+    Выбывший во время партии только вынимается из кольца и остаётся в players
+    (на своём месте, с пометкой в alive), чтобы не пересчитывать места; если
+    выбыл игрок, чей сейчас ход, ход переходит к следующему живому, иначе
+    остаётся у текущего. Из players выбывшие вырезаются, как в GameState, в
+    remove_dead() и при новой раздаче (reset), поэтому следующая партия
+    начинается без них.
+    """
+    decks: int = 0  # колод в игре; 0 — сколько нужно, чтобы раздать всем по 5 и осталось на добор
+    _by_id: Dict[int, Player] = field(default_factory=dict, repr=False, compare=False)
+    _seat: Dict[int, int] = field(default_factory=dict, repr=False, compare=False)  # uid -> индекс в players
+    _next: Dict[int, int] = field(default_factory=dict, repr=False, compare=False)
+    _prev: Dict[int, int] = field(default_factory=dict, repr=False, compare=False)
+    _head: Optional[int] = field(default=None, repr=False, compare=False)  # любой живой игрок
+
+    def __post_init__(self) -> None:
+        self._index()
+
+    # --- Кольцо живых ---
+    def _index(self) -> None:
+        self._by_id = {p.user_id: p for p in self.players}
+        self._seat = {p.user_id: i for i, p in enumerate(self.players)}
+        self._next.clear()
+        self._prev.clear()
+        self._head = None
+        for p in self.players:
+            if self.alive.get(p.user_id, False):
+                self._link(p.user_id)
+
+    def _link(self, uid: int) -> None:
+        """Вставить в кольцо последним по кругу."""
+        head = self._head
+        if head is None:
+            self._next[uid] = self._prev[uid] = self._head = uid
+            return
+        last = self._prev[head]
+        self._next[last] = uid
+        self._prev[uid] = last
+        self._next[uid] = head
+        self._prev[head] = uid
+
+    def _unlink(self, uid: int) -> None:
+        nxt = self._next.pop(uid)
+        prv = self._prev.pop(uid)
+        if nxt == uid:
+            self._head = None
+            return
+        self._next[prv] = nxt
+        self._prev[nxt] = prv
+        if self._head == uid:
+            self._head = nxt
+
+    # --- Колода ---
+    def decks_needed(self) -> int:
+        return self.decks or decks_for(len(self.players))
+
+    def _new_deck(self) -> bytearray:
+        return bytearray(_FRESH * self.decks_needed())
+
+    def deck_composition(self) -> Tuple[int, int, int, int]:
+        n = self.decks_needed()
+        return tuple(c * n for c in DECK)  # type: ignore[return-value]
+
+    # --- Переопределения GameState ---
+    def add_player(self, uid: int, username: str):
+        if uid in self._by_id:
+            return
+        CompactGameState.add_player(self, uid, username)
+        player = self.players[-1]
+        self._by_id[uid] = player
+        self._seat[uid] = len(self.players) - 1
+        self._link(uid)
+
+    def reset(self):
+        # выбывшие в прошлой партии (после /stop alive пуст — остаются все)
+        self.players = [p for p in self.players if self.alive.get(p.user_id) is not False]
+        CompactGameState.reset(self)
+        self._index()
+
+    def remove_dead(self):
+        """Вырезать выбывших из players; места пересчитываются, ход — у того же игрока."""
+        self.version += 1
+        cur = self.players[self.current_idx].user_id if self.current_idx < len(self.players) else None
+        self.players = [p for p in self.players if self.alive.get(p.user_id, False)]
+        self._by_id = {p.user_id: p for p in self.players}
+        self._seat = {p.user_id: i for i, p in enumerate(self.players)}
+        self.current_idx = self._seat.get(cur, 0)
+
+    def _kill(self, uid: int) -> None:
+        self.alive[uid] = False
+        if uid not in self._next:
+            return
+        nxt = self._next[uid]
+        self._unlink(uid)
+        if self.players and self.players[self.current_idx].user_id == uid and nxt != uid:
+            self.current_idx = self._seat[nxt]
+
+    def _sole_survivor(self) -> Optional[Player]:
+        head = self._head
+        if head is not None and self._next[head] == head:
+            return self._by_id[head]
+        return None
+
+    def _next_alive_idx(self, idx: int) -> int:
+        uid = self.players[idx].user_id
+        if uid not in self._next:
+            return CompactGameState._next_alive_idx(self, idx)
+        return self._seat[self._next[uid]]
+
+    def _name(self, uid: int) -> str:
+        p = self._by_id.get(uid)
+        return p.username if p is not None else str(uid)
+
+    def _fork_extra(self):
+        return (self.decks, self._by_id.copy(), self._seat.copy(), self._next.copy(), self._prev.copy(), self._head)
+
+    def _restore_extra(self, extra) -> None:
+        self.decks, by_id, seat, nxt, prv, self._head = extra
+        self._by_id, self._seat, self._next, self._prev = by_id.copy(), seat.copy(), nxt.copy(), prv.copy()
+
+    def stop(self) -> str:
+        msg = CompactGameState.stop(self)
+        self._index()
+        return msg
+
+    def to_dict(self) -> dict:
+        d = CompactGameState.to_dict(self)
+        d["decks"] = self.decks
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "LargeLobbyGameState":
+        gs = CompactGameState.from_dict.__func__(cls, d)
+        gs.decks = d.get("decks", 0)
+        return gs
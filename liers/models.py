@@ -24,12 +24,12 @@ class Rank(str, Enum):
         return mapping[s]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Card:
     rank: Rank
 
 
-@dataclass
+@dataclass(slots=True)
 class Player:
     user_id: int
     username: str  # может быть None → подставим имя/ID
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""Оценка шансов при обвинении: ложь ли заявка, кого накажут, риск погибнуть.
+
+Точно (без предположений о стратегии) считается только held — вероятность,
+что у заявившего перед ходом был заявленный ранг, т.е. заявка могла быть
+честной. Остальное — расчёт по модели с одной предполагаемой стратегией
+заявившего; настоящий игрок может блефовать иначе.
+
+Модель. Карты, которых игрок не видит, — все карты игры (по умолчанию одна
+колода 8K/8Q/8J/4TR, в больших лобби — несколько) минус его рука;
+рука заявившего — случайные h из них (многомерное гипергеометрическое).
+Заявивший кладёт заявленный ранг, если он есть, иначе карту темы (за неё
+не наказывают), иначе любую другую. Тогда:
+    ложь                  — в его руке нет заявленного ранга;
+    наказан обвинитель     — есть заявленный ранг или тема;
+    риск обвинителя       — P(наказан обвинитель) / патронов у обвинителя.
+
+Распределение составов руки считается динамикой по рангам
+(hand_distribution) и кешируется по состоянию «сколько каких карт не видно,
+сколько в руке», а ответы — по (состояние, тема, заявка). После прогрева
+каждый запрос — поиск в словаре.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import lru_cache
+from math import comb
+from typing import Iterable, Tuple
+
+from .compact import CODES
+from .game import DECK, HAND_SIZE
+from .models import Rank
+
+FULL = DECK  # K, Q, J, TR — одна колода
+
+Counts = Tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class Odds:
+    """held — точная вероятность; остальное — оценки по модели из описания модуля."""
+    held: float              # у заявившего был заявленный ранг (гипергеометрическое, без модели)
+    lie: float               # заявка ложная
+    accuser_punished: float  # выстрел достанется обвинителю (честная заявка или карта темы)
+    accuser_death: float     # обвинитель погибнет, если обвинит
+    claimer_death: float     # заявивший погибнет, если его обвинят
+
+
+def unseen(hand: Iterable[Rank], full: Counts = FULL) -> Counts:
+    """Сколько карт каждого ранга не видно владельцу руки (full — все карты игры)."""
+    pool = list(full)
+    for r in hand:
+        pool[CODES[r]] -= 1
+    if min(pool) < 0:
+        raise ValueError("в руке больше карт ранга, чем в колоде")
+    return tuple(pool)  # type: ignore[return-value]
+
+
+@lru_cache(maxsize=None)
+def hand_distribution(pool: Counts, h: int) -> Tuple[Tuple[Counts, float], ...]:
+    """Все составы руки из h карт, вытянутых из pool, с вероятностями."""
+    total = comb(sum(pool), h)
+    if total == 0:
+        raise ValueError("столько карт не набрать")
+    out = []
+
+    def walk(i: int, left: int, prefix: Tuple[int, ...], ways: int) -> None:
+        if i == len(pool) - 1:
+            if left <= pool[i]:
+                out.append((prefix + (left,), ways * comb(pool[i], left) / total))
+            return
+        for k in range(min(left, pool[i]) + 1):
+            walk(i + 1, left - k, prefix + (k,), ways * comb(pool[i], k))
+
+    walk(0, h, (), 1)
+    return tuple(out)
+
+
+def held(pool: Counts, h: int, rank: int) -> float:
+    """P(среди h карт из pool есть хотя бы одна ранга rank) = 1 − C(N − n, h) / C(N, h)."""
+    n = sum(pool)
+    return 1 - comb(n - pool[rank], h) / comb(n, h)
+
+
+@lru_cache(maxsize=None)
+def _claim(pool: Counts, h: int, topic: int, claimed: int) -> Tuple[float, float]:
+    lie = punished = 0.0
+    for comp, p in hand_distribution(pool, h):
+        if comp[claimed]:
+            punished += p
+        else:
+            lie += p
+            if comp[topic]:
+                punished += p
+    return lie, punished
+
+
+def odds(
+    hand: Iterable[Rank], topic: Rank, claimed: Rank, chambers: int = 6,
+    claimer_hand: int = HAND_SIZE, claimer_chambers: int = 6, full: Counts = FULL,
+) -> Odds:
+    """Шансы для игрока с рукой hand, который решает, обвинять ли заявку claimed."""
+    pool = unseen(hand, full)
+    h = min(claimer_hand, sum(pool))
+    lie, punished = _claim(pool, h, CODES[topic], CODES[claimed])
+    return Odds(
+        held=held(pool, h, CODES[claimed]),
+        lie=lie,
+        accuser_punished=punished,
+        accuser_death=punished / max(chambers, 1),
+        claimer_death=(1 - punished) / max(claimer_chambers, 1),
+    )
+
+
+def cache_size() -> int:
+    return hand_distribution.cache_info().currsize + _claim.cache_info().currsize
@@ -0,0 +1,176 @@
+"""Компьютерные игроки: решения по таблице, посчитанной заранее (policy.bin).
+
+Ход — функция (состав руки, тема): какой ранг положить и что заявить.
+Обвинение — функция (состав руки, тема, заявленный ранг, патроны в барабане
+компьютера): обвинять или нет. Состав руки — число K, Q, J, TR (всего ≤ 5),
+таких составов 126, так что вся таблица — ~9,5 КБ. Решение во время игры —
+одно чтение байта по индексу, без перебора.
+
+Таблица посчитана для одной колоды (FULL). В играх из нескольких колод
+(LargeLobbyGameState) не видимых компьютеру карт больше, поэтому решение об
+обвинении считается на месте по составу колоды игры — это несколько
+арифметических операций.
+
+Таблица лежит рядом с модулем и отображается в память (mmap) при первом
+решении, а не при импорте. Пересчитать её:
+
+    python -m liers.policy [--out liers/policy.bin]
+"""
+from __future__ import annotations
+import argparse
+import mmap
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+from .compact import CODES, RANKS
+from .game import DECK, HAND_SIZE, TOPICS, GameState
+from .models import Rank
+
+MAGIC = b"LPOL\x01\x00\x00\x00"
+PATH = os.path.join(os.path.dirname(__file__), "policy.bin")
+
+FULL = DECK  # состав колоды, для которой посчитана таблица: K, Q, J, TR
+CHAMBERS = 6
+# Сколько патронов считаем у обвиняемого: его барабан в ключ таблицы не входит
+OPPONENT_CHAMBERS = 6
+
+# Все составы руки (k, q, j, tr) с суммой ≤ 5 и их номера
+COMPOSITIONS = [
+    (k, q, j, t)
+    for k in range(HAND_SIZE + 1) for q in range(HAND_SIZE + 1 - k)
+    for j in range(HAND_SIZE + 1 - k - q) for t in range(HAND_SIZE + 1 - k - q - j)
+]
+_COMP_INDEX: Dict[Tuple[int, int, int, int], int] = {c: i for i, c in enumerate(COMPOSITIONS)}
+_TOPIC_INDEX = {CODES[r]: i for i, r in enumerate(TOPICS)}
+
+_PLAY_AT = len(MAGIC)
+_ACCUSE_AT = _PLAY_AT + len(COMPOSITIONS) * len(TOPICS)
+SIZE = _ACCUSE_AT + len(COMPOSITIONS) * len(TOPICS) * len(RANKS) * CHAMBERS
+
+
+# --- Расчёт таблицы (офлайн) ---
+
+def choose_play(comp: Sequence[int], topic: int) -> Tuple[int, int]:
+    """(код ранга карты, код заявленного ранга) для руки comp.
+
+    Наказания за ход нет, если карта совпадает с темой или с заявкой, поэтому
+    компьютер не блефует: кладёт карту темы, если есть, иначе самый частый
+    обычный ранг (козыри — напоследок) и заявляет его же.
+    """
+    if comp[topic]:
+        return topic, topic
+    plain = [c for c in range(3) if comp[c]]
+    if plain:
+        best = max(plain, key=lambda c: comp[c])
+        return best, best
+    return CODES[Rank.TR], CODES[Rank.TR]
+
+
+def accuser_punished(comp: Sequence[int], topic: int, claimed: int, full: Sequence[int] = FULL) -> float:
+    """Вероятность, что обвинение обернётся против обвинителя.
+
+    Карта соперника считается случайной среди не видимых компьютеру (все карты
+    игры full минус своя рука); обвинитель наказан, если она совпала с заявкой или с темой.
+    """
+    unseen = [full[c] - comp[c] for c in range(4)]
+    bad = unseen[claimed] + (unseen[topic] if topic != claimed else 0)
+    return bad / sum(unseen)
+
+
+def choose_accuse(comp: Sequence[int], topic: int, claimed: int, chambers: int, full: Sequence[int] = FULL) -> bool:
+    """Обвинять, если ожидаемый риск соперника выше собственного (1/chambers при провале)."""
+    p = accuser_punished(comp, topic, claimed, full)
+    return (1 - p) / OPPONENT_CHAMBERS > p / chambers
+
+
+def build() -> bytes:
+    out = bytearray(MAGIC)
+    for comp in COMPOSITIONS:
+        for topic in TOPICS:
+            actual, claim = choose_play(comp, CODES[topic])
+            out.append(actual << 2 | claim)
+    for comp in COMPOSITIONS:
+        for topic in TOPICS:
+            for claimed in range(len(RANKS)):
+                for chambers in range(1, CHAMBERS + 1):
+                    out.append(choose_accuse(comp, CODES[topic], claimed, chambers))
+    assert len(out) == SIZE
+    return bytes(out)
+
+
+# --- Решения во время игры ---
+
+class PolicyTable:
+    """Таблица решений поверх байтов (mmap файла или bytes)."""
+
+    def __init__(self, data) -> None:
+        if len(data) != SIZE or data[:len(MAGIC)] != MAGIC:
+            raise ValueError("policy.bin повреждён или от другой версии — пересчитайте: python -m liers.policy")
+        self.data = data
+
+    @classmethod
+    def open(cls, path: str = PATH) -> "PolicyTable":
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def play(self, comp: Sequence[int], topic: Rank) -> Tuple[int, int]:
+        b = self.data[_PLAY_AT + _COMP_INDEX[tuple(comp)] * 3 + _TOPIC_INDEX[CODES[topic]]]
+        return b >> 2, b & 3
+
+    def accuse(self, comp: Sequence[int], topic: Rank, claimed: Rank, chambers: int) -> bool:
+        chambers = min(max(chambers, 1), CHAMBERS)
+        i = ((_COMP_INDEX[tuple(comp)] * 3 + _TOPIC_INDEX[CODES[topic]]) * 4 + CODES[claimed]) * CHAMBERS
+        return bool(self.data[_ACCUSE_AT + i + chambers - 1])
+
+
+_TABLE: Optional[PolicyTable] = None
+
+
+def table() -> PolicyTable:
+    """Таблица процесса; файл отображается в память при первом обращении."""
+    global _TABLE
+    if _TABLE is None:
+        _TABLE = PolicyTable.open()
+    return _TABLE
+
+
+def decide(gs: GameState, uid: int) -> Optional[Tuple[str, int, Optional[Rank]]]:
+    """Решение компьютера uid, чей сейчас ход: ("play", индекс, заявка), ("accuse", 0, None) или None."""
+    hand = [gs._rank(c) for c in gs.hands.get(uid, ())]
+    lp = gs.last_play
+    if not hand:
+        return ("accuse", 0, None) if lp is not None else None  # ходить нечем
+    if gs.current_topic is None:
+        return None
+    comp = [0, 0, 0, 0]
+    for r in hand:
+        comp[CODES[r]] += 1
+    t = table()
+    if lp is not None:
+        chambers = gs.revolvers.get(uid, CHAMBERS)
+        full = gs.deck_composition()
+        if full == FULL:
+            accuse = t.accuse(comp, gs.current_topic, lp.claimed_rank, chambers)
+        else:
+            chambers = min(max(chambers, 1), CHAMBERS)
+            accuse = choose_accuse(comp, CODES[gs.current_topic], CODES[lp.claimed_rank], chambers, full)
+        if accuse:
+            return "accuse", 0, None
+    actual, claim = t.play(comp, gs.current_topic)
+    return "play", hand.index(RANKS[actual]), RANKS[claim]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", default=PATH)
+    args = ap.parse_args()
+    data = build()
+    with open(args.out, "wb") as f:
+        f.write(data)
+    accuse = sum(data[_ACCUSE_AT:])
+    print(f"{args.out}: {len(data)} байт, {len(COMPOSITIONS)} составов руки, "
+          f"обвинять в {accuse} из {SIZE - _ACCUSE_AT} положений")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import hashlib
+import os
+import struct
+from typing import Callable, MutableSequence, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+_WORD = 1 << 32
+
+
+class Randomness:
+    """
+    Источник случайности для игры: энтропия берётся у ОС пачками (os.urandom),
+    а ограниченные целые, перетасовки и выбор выдаются из буфера 32-битных слов.
+    randbelow — без смещения (отбрасывание хвоста), поэтому криптостойкость
+    та же, что у secrets.randbelow, но без системного вызова на каждое число.
+    """
+
+    def __init__(self, source: Callable[[int], bytes] = os.urandom, words: int = 1024) -> None:
+        self._source = source
+        self._words = words
+        self._buf: tuple = ()
+        self._pos = 0
+
+    def getstate(self) -> Optional[tuple]:
+        """Позиция в потоке, чтобы setstate() снова выдал те же числа, или None — откат невозможен.
+
+        Поток из энтропии ОС не откатывается: иначе пробный ход показал бы, какие
+        числа (выстрел, раздача) достанутся настоящему. Откат есть только у
+        детерминированных генераторов симуляций и тестов.
+        """
+        return None
+
+    def setstate(self, state: tuple) -> None:
+        raise ValueError("позиция этого генератора не откатывается")
+
+    def _refill(self) -> None:
+        self._buf = struct.unpack(f"<{self._words}I", self._source(4 * self._words))
+        self._pos = 0
+
+    def _word(self) -> int:
+        if self._pos >= len(self._buf):
+            self._refill()
+        w = self._buf[self._pos]
+        self._pos += 1
+        return w
+
+    def randbelow(self, n: int) -> int:
+        """Равномерное целое из [0, n)."""
+        if n <= 0:
+            raise ValueError("n должно быть положительным")
+        if n > _WORD:
+            return self._randbelow_big(n)
+        limit = _WORD - _WORD % n  # всё, что выше, даёт смещение — отбрасываем
+        while True:
+            w = self._word()
+            if w < limit:
+                return w % n
+
+    def _randbelow_big(self, n: int) -> int:
+        k = n.bit_length()
+        words = (k + 31) // 32
+        while True:
+            r = 0
+            for _ in range(words):
+                r = (r << 32) | self._word()
+            r >>= words * 32 - k
+            if r < n:
+                return r
+
+    def choice(self, seq: Sequence[T]) -> T:
+        if not seq:
+            raise IndexError("выбор из пустой последовательности")
+        return seq[self.randbelow(len(seq))]
+
+    def shuffle(self, seq: MutableSequence) -> None:
+        """Fisher–Yates на месте (тот же порядок обменов, что был в GameState)."""
+        for i in range(len(seq) - 1, 0, -1):
+            j = self.randbelow(i + 1)
+            seq[i], seq[j] = seq[j], seq[i]
+
+
+class SeededRandomness(Randomness):
+    """Детерминированный режим для тестов и симуляций: поток BLAKE2b(seed, счётчик)."""
+
+    def __init__(self, seed: int, words: int = 1024) -> None:
+        self.seed = seed
+        self._key = hashlib.blake2b(str(seed).encode(), digest_size=32).digest()
+        self._counter = 0
+        super().__init__(self._stream, words)
+
+    def getstate(self) -> tuple:
+        return self._buf, self._pos, self._counter
+
+    def setstate(self, state: tuple) -> None:
+        self._buf, self._pos, self._counter = state
+
+    def _stream(self, n: int) -> bytes:
+        out = bytearray()
+        while len(out) < n:
+            out += hashlib.blake2b(self._counter.to_bytes(8, "little"), key=self._key).digest()
+            self._counter += 1
+        return bytes(out[:n])
+
+
+# Общий источник для всех игр процесса
+SYSTEM_RNG = Randomness()
@@ -0,0 +1,593 @@
+"""Безголовая Монте-Карло симуляция правил Liar's Deck.
+
+Два движка с одинаковым результатом на одном seed:
+- reference — настоящий GameState (play/accuse) по одной игре, а с lobby=True —
+  LargeLobbyGameState (колод — decks_for(игроков), после выбывания ход не сдвигается);
+- fast — пакетный векторизованный путь на NumPy (опциональная зависимость),
+  повторяющий те же правила для тысяч игр сразу. Состав колоды и размер руки
+  берутся из liers.game.
+
+Случайность — счётный генератор (splitmix64 от seed, номера игры и номера
+вызова), поэтому итог не зависит от размера пакета и числа процессов,
+а быстрый путь можно сверить с GameState партия в партию.
+
+    python -m liers.sim --games 1000000 --players 4 --policies honest,bluff,accuse:0.3
+    python -m liers.sim --games 10000 --players 30 --lobby
+"""
+from __future__ import annotations
+import argparse
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .compact import CODES, RANKS
+from .game import DECK, HAND_SIZE, GameState
+from .lobby import LargeLobbyGameState, decks_for
+from .rng import Randomness
+
+try:
+    import numpy as np
+except ImportError:  # быстрый путь недоступен, reference работает и без NumPy
+    np = None
+
+MASK = (1 << 64) - 1
+GOLDEN = 0x9E3779B97F4A7C15
+_FRESH = [code for code, n in enumerate(DECK) for _ in range(n)]  # одна колода, коды как в liers.compact
+MAX_PLAYERS = len(_FRESH) // HAND_SIZE  # GameState: всем по руке из одной колоды
+_U53 = 2.0 ** -53
+
+
+def _fin(z: int) -> int:
+    """Финализатор splitmix64 (биекция на 64-битных словах)."""
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK
+    return z ^ (z >> 31)
+
+
+class CounterRandomness(Randomness):
+    """
+    Детерминированный генератор для симуляции: i-е число игры game —
+    fin(fin(seed) + game·φ) + i·φ. Не криптостойкий; randbelow(n) = ⌊u·n⌋.
+    """
+
+    def __init__(self, seed: int, game: int) -> None:
+        super().__init__()
+        self._h = _fin((_fin(seed & MASK) + game * GOLDEN) & MASK)
+        self.cursor = 0
+
+    def uniform(self) -> float:
+        z = _fin((self._h + self.cursor * GOLDEN) & MASK)
+        self.cursor += 1
+        return (z >> 11) * _U53
+
+    def getstate(self) -> tuple:
+        return (self.cursor,)
+
+    def setstate(self, state: tuple) -> None:
+        (self.cursor,) = state
+
+    def randbelow(self, n: int) -> int:
+        if n <= 0:
+            raise ValueError("n должно быть положительным")
+        return int(self.uniform() * n)
+
+
+# --- Стратегии игроков ---
+class Policy:
+    """Стратегия: какую карту сыграть и заявить, и обвинять ли (u — равномерное [0, 1))."""
+    name = "policy"
+
+    def play(self, hand: Sequence[int], topic: int) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    def accuse(self, u: float) -> bool:
+        return False
+
+    # Векторные версии для быстрого пути: hands (m, 5), hlen (m,), topic (m,)
+    def play_batch(self, hands, hlen, topic):
+        raise NotImplementedError(f"{type(self).__name__} не поддерживает быстрый путь")
+
+    def accuse_batch(self, u):
+        return np.zeros(u.shape, dtype=bool)
+
+
+class AlwaysHonest(Policy):
+    """Кладёт карту темы и заявляет тему; если её нет — первую карту с честным рангом."""
+    name = "honest"
+
+    def play(self, hand, topic):
+        for i, c in enumerate(hand):
+            if c == topic:
+                return i, topic
+        return 0, hand[0]
+
+    def play_batch(self, hands, hlen, topic):
+        valid = np.arange(HAND_SIZE) < hlen[:, None]
+        match = (hands == topic[:, None]) & valid
+        has = match.any(axis=1)
+        idx = np.where(has, match.argmax(axis=1), 0)
+        return idx, np.where(has, topic, hands[:, 0])
+
+
+class AlwaysBluff(Policy):
+    """Всегда заявляет тему, а кладёт по возможности карту не той масти."""
+    name = "bluff"
+
+    def play(self, hand, topic):
+        for i, c in enumerate(hand):
+            if c != topic:
+                return i, topic
+        return 0, topic
+
+    def play_batch(self, hands, hlen, topic):
+        valid = np.arange(HAND_SIZE) < hlen[:, None]
+        other = (hands != topic[:, None]) & valid
+        idx = np.where(other.any(axis=1), other.argmax(axis=1), 0)
+        return idx, topic.copy()
+
+
+class AccuseWithProbability(Policy):
+    """Обвиняет с вероятностью p, а ходит как base."""
+
+    def __init__(self, p: float, base: Optional[Policy] = None) -> None:
+        self.p = p
+        self.base = base or AlwaysHonest()
+        self.name = f"accuse:{p:g}"
+
+    def play(self, hand, topic):
+        return self.base.play(hand, topic)
+
+    def accuse(self, u):
+        return u < self.p
+
+    def play_batch(self, hands, hlen, topic):
+        return self.base.play_batch(hands, hlen, topic)
+
+    def accuse_batch(self, u):
+        return u < self.p
+
+
+def parse_policy(spec: str) -> Policy:
+    """honest | bluff | accuse:<p>[:honest|bluff]"""
+    parts = spec.split(":")
+    if parts[0] == "honest":
+        return AlwaysHonest()
+    if parts[0] == "bluff":
+        return AlwaysBluff()
+    if parts[0] == "accuse" and len(parts) in (2, 3):
+        base = parse_policy(parts[2]) if len(parts) == 3 else None
+        return AccuseWithProbability(float(parts[1]), base)
+    raise ValueError(f"Неизвестная стратегия: {spec}")
+
+
+# --- Результаты ---
+@dataclass
+class SimResult:
+    players: int
+    policies: List[str]
+    games: int = 0
+    wins: List[int] = field(default_factory=list)  # по местам
+    stalled: int = 0      # ход невозможен: руки и колода пусты, обвинять нечего
+    unfinished: int = 0   # упёрлись в max_turns
+    accusations: int = 0
+    deaths: int = 0
+    lengths: Counter = field(default_factory=Counter)  # ходов в партии -> число партий
+    records: Optional[List[tuple]] = None  # по партиям, если keep_records
+
+    def __post_init__(self) -> None:
+        if not self.wins:
+            self.wins = [0] * self.players
+
+    def merge(self, other: "SimResult") -> "SimResult":
+        self.games += other.games
+        self.wins = [a + b for a, b in zip(self.wins, other.wins)]
+        self.stalled += other.stalled
+        self.unfinished += other.unfinished
+        self.accusations += other.accusations
+        self.deaths += other.deaths
+        self.lengths.update(other.lengths)
+        if self.records is not None and other.records is not None:
+            self.records += other.records
+        return self
+
+    @property
+    def win_rates(self) -> List[float]:
+        return [w / self.games if self.games else 0.0 for w in self.wins]
+
+    def win_rates_by_policy(self) -> Dict[str, float]:
+        by: Dict[str, List[int]] = {}
+        for seat, w in enumerate(self.wins):
+            name = self.policies[seat % len(self.policies)]
+            acc = by.setdefault(name, [0, 0])
+            acc[0] += w
+            acc[1] += 1
+        return {k: w / (n * self.games) if self.games else 0.0 for k, (w, n) in by.items()}
+
+    @property
+    def deaths_per_accusation(self) -> float:
+        return self.deaths / self.accusations if self.accusations else 0.0
+
+    def length_quantiles(self, qs: Sequence[float] = (0.5, 0.9, 0.99)) -> List[int]:
+        out = []
+        total = sum(self.lengths.values())
+        for q in qs:
+            seen = 0
+            for turns in sorted(self.lengths):
+                seen += self.lengths[turns]
+                if seen >= q * total:
+                    out.append(turns)
+                    break
+        return out
+
+    def add_game(self, winner: int, turns: int, accusations: int, deaths: int, stalled: bool) -> None:
+        self.games += 1
+        if winner >= 0:
+            self.wins[winner] += 1
+        elif stalled:
+            self.stalled += 1
+        else:
+            self.unfinished += 1
+        self.accusations += accusations
+        self.deaths += deaths
+        self.lengths[turns] += 1
+
+
+# --- Эталон: настоящий GameState ---
+def play_reference_game(
+    game: int, seed: int, policies: Sequence[Policy], players: int, max_turns: int, lobby: bool = False
+) -> tuple:
+    """
+    Одна партия на GameState (LargeLobbyGameState, если lobby).
+    Возвращает (победитель|-1, ходов, обвинений, смертей, застряла, барабаны).
+    """
+    rng = CounterRandomness(seed, game)
+    gs = (LargeLobbyGameState if lobby else GameState)(chat_id=game, rng=rng)
+    for seat in range(players):
+        gs.add_player(seat, f"p{seat}")
+    gs.start()
+    turns = accusations = deaths = 0
+    stalled = False
+    while gs.started and turns < max_turns:
+        uid = gs.current_player().user_id
+        policy = policies[uid % len(policies)]
+        hand = [CODES[gs._rank(c)] for c in gs.hands.get(uid, ())]
+        if gs.last_play is not None and (not hand or policy.accuse(rng.uniform())):
+            _, shot, _ = gs.accuse(uid)
+            accusations += 1
+            deaths += shot
+        elif not hand:
+            stalled = True
+            break
+        else:
+            idx, claim = policy.play(hand, CODES[gs.current_topic])
+            gs.play(uid, idx, RANKS[claim])
+        turns += 1
+    survivors = [p.user_id for p in gs.players if gs.alive.get(p.user_id)]  # в лобби выбывшие остаются в players
+    winner = survivors[0] if not gs.started and len(survivors) == 1 else -1
+    revolvers = tuple(gs.revolvers[s] for s in range(players))
+    return winner, turns, accusations, deaths, stalled, revolvers
+
+
+def _run_reference(first: int, count: int, seed: int, policies, players: int, max_turns: int, keep: bool, lobby: bool):
+    res = SimResult(players, [p.name for p in policies], records=[] if keep else None)
+    for game in range(first, first + count):
+        rec = play_reference_game(game, seed, policies, players, max_turns, lobby)
+        res.add_game(*rec[:5])
+        if keep:
+            res.records.append(rec)
+    return res
+
+
+# --- Быстрый путь: NumPy, пакет игр за раз ---
+def _fin_np(z):
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+class _Batch:
+    """
+    Состояние пакета из B игр в массивах; повторяет GameState шаг в шаг.
+
+    cur — как current_idx: у GameState позиция среди живых (выбывшие вырезаются
+    из списка), у лобби (lobby=True) — место за столом.
+    """
+
+    def __init__(self, first: int, count: int, seed: int, players: int, lobby: bool = False) -> None:
+        B, P = count, players
+        self.B, self.P = B, P
+        self.lobby = lobby
+        fresh = _FRESH * (decks_for(players) if lobby else 1)
+        self.size = len(fresh)
+        games = np.arange(first, first + count, dtype=np.uint64)
+        key = np.uint64(_fin(seed & MASK))
+        with np.errstate(over="ignore"):
+            self.h = _fin_np(key + games * np.uint64(GOLDEN))
+        self.cursor = np.zeros(B, dtype=np.uint64)
+        self.deck = np.tile(np.array(fresh, dtype=np.int8), (B, 1))
+        self.dlen = np.full(B, self.size, dtype=np.int64)
+        self.hands = np.zeros((B, P, HAND_SIZE), dtype=np.int8)
+        self.hlen = np.zeros((B, P), dtype=np.int64)
+        self.alive = np.ones((B, P), dtype=bool)
+        self.n_alive = np.full(B, P, dtype=np.int64)
+        self.rev = np.full((B, P), 6, dtype=np.int64)
+        self.topic = np.zeros(B, dtype=np.int64)
+        self.cur = np.zeros(B, dtype=np.int64)
+        self.last_player = np.full(B, -1, dtype=np.int64)
+        self.last_actual = np.zeros(B, dtype=np.int64)
+        self.last_claim = np.zeros(B, dtype=np.int64)
+
+    def draw(self, g):
+        with np.errstate(over="ignore"):
+            z = _fin_np(self.h[g] + self.cursor[g] * np.uint64(GOLDEN))
+        self.cursor[g] += np.uint64(1)
+        return (z >> np.uint64(11)).astype(np.float64) * _U53
+
+    def randbelow(self, g, n):
+        return (self.draw(g) * n).astype(np.int64)
+
+    def shuffle(self, g) -> None:
+        deck, dlen = self.deck, self.dlen
+        for i in range(self.size - 1, 0, -1):
+            gg = g[dlen[g] > i]
+            if not gg.size:
+                continue
+            j = self.randbelow(gg, i + 1)
+            tmp = deck[gg, i].copy()
+            deck[gg, i] = deck[gg, j]
+            deck[gg, j] = tmp
+
+    def take(self, g, seat) -> None:
+        """_take(HAND_SIZE): снять до HAND_SIZE карт с конца колоды в (пустую) руку."""
+        for _ in range(HAND_SIZE):
+            m = self.dlen[g] > 0
+            gg, ss = g[m], seat[m]
+            if not gg.size:
+                return
+            self.hands[gg, ss, self.hlen[gg, ss]] = self.deck[gg, self.dlen[gg] - 1]
+            self.dlen[gg] -= 1
+            self.hlen[gg, ss] += 1
+
+    def deal_alive(self, g) -> None:
+        for s in range(self.P):
+            gg = g[self.alive[g, s]]
+            self.take(gg, np.full(gg.size, s))
+
+    def start(self) -> None:
+        g = np.arange(self.B)
+        self.shuffle(g)
+        self.deal_alive(g)
+        self.topic[g] = self.randbelow(g, 3)
+        self.cur[g] = self.randbelow(g, self.P)
+
+    def seat_at(self, g):
+        """Место игрока, чей ход (как self.players[current_idx])."""
+        if self.lobby:
+            return self.cur[g]
+        order = np.argsort(~self.alive[g], axis=1, kind="stable")
+        return order[np.arange(g.size), self.cur[g]]
+
+    def next_alive(self, g, seat):
+        """Следующее по кругу живое место после seat (кольцо _next лобби)."""
+        cand = (seat[:, None] + np.arange(1, self.P + 1)) % self.P
+        ok = self.alive[g[:, None], cand]
+        return cand[np.arange(g.size), ok.argmax(axis=1)]
+
+    def play(self, g, seat, idx, claim) -> None:
+        hands, hlen = self.hands, self.hlen
+        actual = hands[g, seat, idx].astype(np.int64)
+        n = hlen[g, seat]
+        for k in range(HAND_SIZE - 1):
+            m = (k >= idx) & (k < n - 1)
+            hands[g[m], seat[m], k] = hands[g[m], seat[m], k + 1]
+        hlen[g, seat] -= 1
+        self.last_player[g] = seat
+        self.last_actual[g] = actual
+        self.last_claim[g] = claim
+        if self.lobby:
+            self.cur[g] = self.next_alive(g, seat)
+        else:
+            self.cur[g] = (self.cur[g] + 1) % self.n_alive[g]
+        # draw_if_possible
+        m = (hlen[g, seat] == 0) & (self.dlen[g] > 0)
+        self.take(g[m], seat[m])
+
+    def accuse(self, g, accuser):
+        """Возвращает маску выстрелов."""
+        actual, claim = self.last_actual[g], self.last_claim[g]
+        punished = np.where(
+            actual == self.topic[g], accuser, np.where(actual != claim, self.last_player[g], accuser)
+        )
+        remaining = np.maximum(self.rev[g, punished], 1)
+        bullet = self.randbelow(g, remaining) == 0
+        gb, pb = g[bullet], punished[bullet]
+        self.alive[gb, pb] = False
+        self.rev[gb, pb] = 6
+        self.n_alive[gb] -= 1
+        if self.lobby:  # ход сдвигается, только если выбыл тот, чей он
+            gc = gb[(pb == self.cur[gb]) & (self.n_alive[gb] > 0)]
+            self.cur[gc] = self.next_alive(gc, self.cur[gc])
+        else:
+            self.cur[gb] = np.where(self.cur[gb] >= self.n_alive[gb], 0, self.cur[gb])
+        gs, ps = g[~bullet], punished[~bullet]
+        self.rev[gs, ps] = np.maximum(1, remaining[~bullet] - 1)
+        self.last_player[g] = -1
+        self.topic[g] = self.randbelow(g, 3)
+        self.redeal(g, actual)
+        return bullet
+
+    def redeal(self, g, last_actual) -> None:
+        deck, dlen = self.deck, self.dlen
+        for s in range(self.P):
+            for k in range(HAND_SIZE):
+                gg = g[self.hlen[g, s] > k]
+                deck[gg, dlen[gg]] = self.hands[gg, s, k]
+                dlen[gg] += 1
+        self.hlen[g] = 0
+        deck[g, dlen[g]] = last_actual
+        dlen[g] += 1
+        self.shuffle(g)
+        self.deal_alive(g)
+
+
+def _run_fast(first: int, count: int, seed: int, policies, players: int, max_turns: int, keep: bool, lobby: bool):
+    if np is None:
+        raise RuntimeError("Быстрый путь требует NumPy: pip install numpy (или engine='reference')")
+    b = _Batch(first, count, seed, players, lobby)
+    b.start()
+    B = count
+    active = np.ones(B, dtype=bool)
+    turns = np.zeros(B, dtype=np.int64)
+    accusations = np.zeros(B, dtype=np.int64)
+    deaths = np.zeros(B, dtype=np.int64)
+    stalled = np.zeros(B, dtype=bool)
+    winner = np.full(B, -1, dtype=np.int64)
+    n_pol = len(policies)
+
+    while True:
+        g = np.flatnonzero(active)
+        if not g.size:
+            break
+        seat = b.seat_at(g)
+        hl = b.hlen[g, seat]
+        has_last = b.last_player[g] >= 0
+        pid = seat % n_pol
+
+        stuck = ~has_last & (hl == 0)
+        stalled[g[stuck]] = True
+        active[g[stuck]] = False
+
+        accuse = has_last & (hl == 0)
+        ask = np.flatnonzero(has_last & (hl > 0))
+        if ask.size:
+            u = b.draw(g[ask])
+            decision = np.zeros(ask.size, dtype=bool)
+            for k, pol in enumerate(policies):
+                m = pid[ask] == k
+                if m.any():
+                    decision[m] = pol.accuse_batch(u[m])
+            accuse[ask] = decision
+        do_play = (hl > 0) & ~accuse
+
+        pg = np.flatnonzero(do_play)
+        if pg.size:
+            gp, sp = g[pg], seat[pg]
+            idx = np.zeros(pg.size, dtype=np.int64)
+            claim = np.zeros(pg.size, dtype=np.int64)
+            for k, pol in enumerate(policies):
+                m = pid[pg] == k
+                if m.any():
+                    i, c = pol.play_batch(b.hands[gp[m], sp[m]], b.hlen[gp[m], sp[m]], b.topic[gp[m]])
+                    idx[m], claim[m] = i, c
+            b.play(gp, sp, idx, claim)
+
+        ag = np.flatnonzero(accuse)
+        if ag.size:
+            ga = g[ag]
+            shot = b.accuse(ga, seat[ag])
+            accusations[ga] += 1
+            deaths[ga] += shot
+            done = ga[b.n_alive[ga] == 1]
+            winner[done] = b.alive[done].argmax(axis=1)
+            active[done] = False
+
+        moved = g[do_play | accuse]
+        turns[moved] += 1
+        active &= turns < max_turns
+
+    res = SimResult(players, [p.name for p in policies], records=[] if keep else None)
+    res.games = B
+    res.wins = np.bincount(winner[winner >= 0], minlength=players).tolist()
+    res.stalled = int(stalled.sum())
+    res.unfinished = int(((winner < 0) & ~stalled).sum())
+    res.accusations = int(accusations.sum())
+    res.deaths = int(deaths.sum())
+    values, counts = np.unique(turns, return_counts=True)
+    res.lengths = Counter(dict(zip(values.tolist(), counts.tolist())))
+    if keep:
+        res.records = [
+            (int(winner[i]), int(turns[i]), int(accusations[i]), int(deaths[i]), bool(stalled[i]),
+             tuple(int(r) for r in b.rev[i]))
+            for i in range(B)
+        ]
+    return res
+
+
+def _run_chunk(args) -> SimResult:
+    engine, first, count, seed, policies, players, max_turns, keep, lobby = args
+    run = _run_fast if engine == "fast" else _run_reference
+    return run(first, count, seed, policies, players, max_turns, keep, lobby)
+
+
+def simulate(
+    games: int,
+    players: int = 4,
+    policies: Sequence[Policy] = (),
+    seed: int = 0,
+    engine: Optional[str] = None,
+    batch: int = 20000,
+    processes: int = 1,
+    max_turns: int = 1000,
+    keep_records: bool = False,
+    lobby: bool = False,
+) -> SimResult:
+    """
+    Сыграть `games` партий. Место i играет стратегией policies[i % len(policies)].
+    engine: "fast" (NumPy, по умолчанию если установлен) или "reference" (GameState).
+    processes > 1 — раскидать пакеты по ядрам; результат от этого не меняется.
+    lobby — правила LargeLobbyGameState (любое число игроков от 2, несколько колод).
+    """
+    if players < 2 or (not lobby and players > MAX_PLAYERS):
+        raise ValueError(f"Игроков должно быть 2..{MAX_PLAYERS} (больше — с lobby=True).")
+    policies = list(policies) or [AlwaysHonest()]
+    engine = engine or ("fast" if np is not None else "reference")
+    chunks = [
+        (engine, first, min(batch, games - first), seed, policies, players, max_turns, keep_records, lobby)
+        for first in range(0, games, batch)
+    ]
+    result = SimResult(players, [p.name for p in policies], records=[] if keep_records else None)
+    if processes > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            parts = list(pool.map(_run_chunk, chunks))
+    else:
+        parts = [_run_chunk(c) for c in chunks]
+    for part in parts:
+        result.merge(part)
+    return result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Монте-Карло симуляция Liar's Deck")
+    ap.add_argument("--games", type=int, default=100000)
+    ap.add_argument("--players", type=int, default=4)
+    ap.add_argument("--policies", default="honest,bluff,accuse:0.3", help="через запятую, по местам по кругу")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--engine", choices=("fast", "reference"))
+    ap.add_argument("--batch", type=int, default=20000)
+    ap.add_argument("--processes", type=int, default=1)
+    ap.add_argument("--max-turns", type=int, default=1000)
+    ap.add_argument("--lobby", action="store_true", help="правила большого лобби (LargeLobbyGameState)")
+    args = ap.parse_args()
+
+    policies = [parse_policy(s) for s in args.policies.split(",")]
+    t0 = time.perf_counter()
+    res = simulate(
+        args.games, args.players, policies, seed=args.seed, engine=args.engine,
+        batch=args.batch, processes=args.processes, max_turns=args.max_turns, lobby=args.lobby,
+    )
+    dt = time.perf_counter() - t0
+    print(f"{res.games} партий за {dt:.1f} с ({res.games / dt:.0f} партий/с)")
+    for seat, rate in enumerate(res.win_rates):
+        print(f"  место {seat} ({res.policies[seat % len(res.policies)]}): побед {rate:.1%}")
+    for name, rate in res.win_rates_by_policy().items():
+        print(f"  стратегия {name}: побед на место {rate:.1%}")
+    p50, p90, p99 = res.length_quantiles()
+    print(f"  длина партии (ходов): p50 {p50}, p90 {p90}, p99 {p99}")
+    print(f"  смертей на обвинение: {res.deaths_per_accusation:.3f}")
+    print(f"  застряли: {res.stalled}, не доиграны: {res.unfinished}")
+
+
+if __name__ == "__main__":
+    main()
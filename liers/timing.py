@@ -0,0 +1,32 @@
+from __future__ import annotations
+import functools
+import time
+from typing import Callable, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+# Кому сообщать длительность операций ядра: observer(имя, секунды).
+# Ядро ничего не знает о метриках бота — тот подключает себя через set_observer.
+_observer: Optional[Callable[[str, float], None]] = None
+
+
+def set_observer(observer: Optional[Callable[[str, float], None]]) -> None:
+    global _observer
+    _observer = observer
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Декоратор: замерить вызов и передать observer. Без observer — одна проверка на None."""
+    def decorate(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            observer = _observer
+            if observer is None:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observer(name, time.perf_counter() - t0)
+        return wrapper  # type: ignore[return-value]
+    return decorate
@@ -0,0 +1,12 @@
+import sys
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _fresh_update_ids():
+    """Тесты нумеруют апдейты и сообщения с 1: окна повторов бота от прошлого теста не нужны."""
+    yield
+    bot_main = sys.modules.get("bot.main")
+    if bot_main is not None:
+        bot_main.SEEN.clear()
@@ -0,0 +1,135 @@
+import asyncio
+import itertools
+import os
+
+import pytest
+
+os.environ.setdefault("BOT_TOKEN", "123:TEST")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("OUTBOX", "0")
+
+from telegram import Update  # noqa: E402
+
+from bot import board  # noqa: E402
+from bot import main as bot_main  # noqa: E402
+from bot.storage import Eviction  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram, callback_update, command_update  # noqa: E402
+from liers.models import Rank  # noqa: E402
+
+CHAT = -4242
+PLAYERS = (31, 32, 33)
+
+
+def test_callback_data_roundtrip():
+    for i in range(board.HAND_SIZE):
+        for rank in Rank.all_ranks():
+            data = board.encode("play", i, rank)
+            assert len(data) == 3 and board.parse(data) == ("play", i, rank)
+    for action in ("join", "start", "accuse", "hand"):
+        assert board.parse(board.encode(action)) == (action, 0, None)
+    for bad in (None, "", "p9X", "zz", "p" + "1" * 10):
+        with pytest.raises(ValueError):
+            board.parse(bad)
+
+
+def group_calls(stub):
+    return [c.method for c in stub.calls if int(c.params.get("chat_id", 0) or 0) == CHAT]
+
+
+def test_board_game_via_buttons(monkeypatch):
+    monkeypatch.setattr(bot_main, "BOARD_MODE", True)
+    monkeypatch.setattr(bot_main.BOARD, "debounce", 0)
+    stub = StubTelegram()
+    ids = itertools.count(1)
+
+    async def scenario():
+        app = bot_main.build_app(request=StubRequest(stub))
+        await app.initialize()
+
+        async def feed(data):
+            await app.process_update(Update.de_json(data, app.bot))
+            await bot_main.BOARD.flush()
+
+        async def press(uid, data, message_id=None):
+            mid = message_id or bot_main.BOARD_MSG[CHAT][0]
+            await feed(callback_update(next(ids), uid, CHAT, mid, data))
+
+        try:
+            await feed(command_update(next(ids), PLAYERS[0], CHAT, "/newgame"))
+            assert group_calls(stub) == ["sendMessage", "pinChatMessage"]
+            board_id, text, kind = bot_main.BOARD_MSG[CHAT]
+            assert kind == board.LOBBY and "Лобби пустое" in text
+
+            for uid in PLAYERS:
+                await press(uid, "j")
+            await press(PLAYERS[0], "s")
+            gs = bot_main.GAMES[CHAT]
+            assert gs.started and bot_main.BOARD_MSG[CHAT][2] == board.GAME
+
+            uid = gs.current_player().user_id
+            await press(uid, board.encode("play", 0, Rank.K))
+            assert gs.last_play is not None and gs.last_play.claimed_rank == Rank.K
+            assert "заявил K" in stub.messages[(CHAT, board_id)]
+
+            # кнопка со старой доски и чужой ход не меняют игру
+            before = gs.to_dict()
+            await press(gs.current_player().user_id, "a", message_id=board_id + 1000)
+            await press(uid, board.encode("play", 0, Rank.Q))
+            assert gs.to_dict() == before
+
+            await press(gs.current_player().user_id, "a")
+            assert gs.last_play is None
+            answers = [c for c in stub.calls if c.method == "answerCallbackQuery"]
+            assert len(answers) == 8
+            assert any("устарела" in c.params.get("text", "") for c in answers)
+
+            # одно сообщение в группе на всю игру — дальше только правки
+            calls = group_calls(stub)
+            assert calls.count("sendMessage") == 1
+            assert calls.count("editMessageText") == 6  # 3 join, start, play, accuse
+
+            # итог остаётся на доске, а строка события забывается вместе с игрой
+            await feed(command_update(next(ids), PLAYERS[0], CHAT, "/stop"))
+            assert bot_main.BOARD_MSG[CHAT][2] is None and "остановлена" in bot_main.BOARD_MSG[CHAT][1]
+            assert CHAT not in bot_main.BOARD_NOTES
+        finally:
+            await app.shutdown()
+
+    asyncio.run(scenario())
+    bot_main.GAMES.pop(CHAT, None)
+    bot_main.BOARD_MSG.pop(CHAT, None)
+    bot_main.PLAYER_GAMES.drop(CHAT)
+
+
+def test_board_note_is_dropped_with_evicted_game():
+    gs = bot_main._new_game(CHAT)
+    gs.add_player(PLAYERS[0], "p")
+    bot_main.GAMES[CHAT] = gs
+    bot_main.BOARD_NOTES[CHAT] = "@p присоединился."
+    bot_main.STORE.flush()
+    try:
+        assert bot_main.GAMES.evict(Eviction(ttl=-1, max_entries=0, spill=True)) == 1
+        assert CHAT not in bot_main.BOARD_NOTES and CHAT in bot_main.GAMES  # игра выгружена на диск
+    finally:
+        bot_main.GAMES.pop(CHAT, None)
+        bot_main.PLAYER_GAMES.drop(CHAT)
+
+
+def test_debounce_coalesces_and_skips_unchanged():
+    stub = StubTelegram()
+    store = {}
+    updater = board.BoardUpdater(store, debounce=0.01, pin=False)
+
+    async def scenario():
+        from telegram.ext import ExtBot
+        async with ExtBot("123:TEST", request=StubRequest(stub)) as bot:
+            for i in range(5):
+                updater.touch(bot, CHAT, lambda i=i: (f"ход {i}", board.GAME))
+            await updater.flush()
+            updater.touch(bot, CHAT, lambda: ("ход 4", board.GAME))
+            await updater.flush()
+
+    asyncio.run(scenario())
+    assert [c.method for c in stub.calls if c.method != "getMe"] == ["sendMessage"]
+    assert store[CHAT][1] == "ход 4"
+    assert updater.stats == {"coalesced": 4, "sent": 1, "unchanged": 1}
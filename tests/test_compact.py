@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from liers.compact import CompactGameState
+from liers.game import GameState
+from liers.models import Rank
+from liers.rng import SeededRandomness
+
+
+def play_out(cls, seed, n):
+    moves = random.Random(seed + 1)
+    gs = cls(chat_id=1, rng=SeededRandomness(seed))
+    for i in range(n):
+        gs.add_player(100 + i, f"user{i}")
+    gs.start()
+    log = [gs.status()] + [gs.hand_str(p.user_id) for p in gs.players]
+    for _ in range(200):
+        if not gs.started:
+            break
+        uid = gs.current_player().user_id
+        if gs.last_play and (not gs.hands[uid] or moves.random() < 0.4):
+            log.append(gs.accuse(uid))
+        elif gs.hands[uid]:
+            idx = moves.randrange(len(gs.hands[uid]))
+            log.append(gs.play(uid, idx, moves.choice(Rank.all_ranks())))
+        else:
+            break
+        log.append(gs.status())
+        log += [gs.hand_str(p.user_id) for p in gs.players]
+    return log, gs
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_compact_matches_classic(seed):
+    n = 2 + seed % 4
+    classic, a = play_out(GameState, seed, n)
+    compact, b = play_out(CompactGameState, seed, n)
+    assert classic == compact
+    assert a.to_dict() == b.to_dict()
+    assert CompactGameState.from_dict(a.to_dict()).to_dict() == a.to_dict()
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import random
+from collections import defaultdict
+
+os.environ.setdefault("BOT_TOKEN", "123:TEST")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("OUTBOX", "0")  # лимиты Telegram здесь только замедлили бы прогон
+
+from telegram import Update  # noqa: E402
+from telegram.ext import CommandHandler  # noqa: E402
+
+from bot import main as bot_main  # noqa: E402
+from bot.concurrency import ChatSerializingProcessor  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram, command_update  # noqa: E402
+from liers.game import GameState  # noqa: E402
+from liers.rng import SeededRandomness  # noqa: E402
+
+CHATS = [-(5000 + i) for i in range(40)]
+
+
+def players_of(chat):
+    return [-chat * 10 + i for i in range(3)]
+
+
+def test_interleaved_play_and_accuse_stay_consistent(monkeypatch):
+    calls = []  # (chat_id, method, args) успешных вызовов движка
+
+    def recording(name):
+        original = getattr(GameState, name)
+
+        def wrapper(self, *args):
+            result = original(self, *args)
+            calls.append((self.chat_id, name, args))
+            return result
+        return wrapper
+
+    monkeypatch.setattr(GameState, "play", recording("play"))
+    monkeypatch.setattr(GameState, "accuse", recording("accuse"))
+
+    entered = defaultdict(list)  # chat -> update_id в порядке входа в обработчик
+    running = defaultdict(int)
+    overlaps = []
+    peak = [0, 0]  # сейчас / максимум обработчиков разных чатов одновременно
+
+    def guarded(callback):
+        async def run(update, context):
+            chat = update.effective_chat.id
+            entered[chat].append(update.update_id)
+            if running[chat]:
+                overlaps.append(chat)
+            running[chat] += 1
+            peak[0] += 1
+            peak[1] = max(peak)
+            try:
+                return await callback(update, context)
+            finally:
+                running[chat] -= 1
+                peak[0] -= 1
+        return run
+
+    async def scenario():
+        stub = StubTelegram(latency=0.001)
+        app = bot_main.build_app(request=StubRequest(stub))
+        for h in app.handlers[0]:
+            if isinstance(h, CommandHandler):
+                h.callback = guarded(h.callback)
+        await app.initialize()
+        ids = iter(range(1, 10**6))
+
+        def upd(uid, chat, text):
+            return Update.de_json(command_update(next(ids), uid, chat, text), app.bot)
+
+        for chat in CHATS:
+            await app.process_update(upd(players_of(chat)[0], chat, "/newgame"))
+            for uid in players_of(chat):
+                await app.process_update(upd(uid, chat, "/join"))
+            bot_main.GAMES[chat].rng = SeededRandomness(chat)
+            await app.process_update(upd(players_of(chat)[0], chat, "/startgame"))
+        entered.clear()
+
+        rnd = random.Random(9)
+        submitted = defaultdict(list)
+        updates = []
+        for _ in range(12):
+            for chat in CHATS:
+                uid = rnd.choice(players_of(chat))
+                u = upd(uid, chat, rnd.choice(["/play 0 K", "/play 1 Q", "/accuse"]))
+                submitted[chat].append(u.update_id)
+                updates.append(u)
+        proc = app.update_processor
+        await asyncio.gather(*(proc.process_update(u, app.process_update(u)) for u in updates))
+        await app.shutdown()
+        return submitted
+
+    submitted = asyncio.run(scenario())
+    monkeypatch.undo()
+
+    assert not overlaps
+    assert peak[1] > 1  # разные чаты шли параллельно
+    for chat in CHATS:
+        assert entered[chat] == submitted[chat]
+
+    # Последовательное применение тех же ходов даёт то же состояние
+    assert any(name == "accuse" for _, name, _ in calls)
+    for chat in CHATS:
+        replay = GameState(chat_id=chat, rng=SeededRandomness(chat))
+        for uid in players_of(chat):
+            replay.add_player(uid, f"user{uid}")
+        replay.start()
+        for c, name, args in calls:
+            if c == chat:
+                getattr(replay, name)(*args)
+        live = bot_main.GAMES[chat]
+        assert replay.to_dict() == live.to_dict()
+        for hand in live.hands.values():
+            assert len(hand) <= 5
+
+
+def test_burst_in_one_chat_does_not_starve_others():
+    proc = ChatSerializingProcessor(max_concurrent_updates=4)
+    done = []
+    in_flight = [0, 0]  # сейчас / максимум
+
+    async def handler(chat, i):
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight)
+        await asyncio.sleep(0.005)
+        in_flight[0] -= 1
+        done.append((chat, i))
+
+    async def scenario():
+        def upd(i, chat):
+            return Update.de_json(command_update(i, 1, chat, "/status"), None)
+
+        burst = [proc.process_update(upd(i, -1), handler(-1, i)) for i in range(40)]
+        others = [proc.process_update(upd(100 + c, c), handler(c, 0)) for c in range(-2, -8, -1)]
+        await asyncio.gather(*burst, *others)
+
+    asyncio.run(scenario())
+    first = [chat for chat, _ in done[:10]]
+    assert set(range(-2, -8, -1)) <= set(first)  # не ждут, пока разберётся очередь чата -1
+    assert [i for chat, i in done if chat == -1] == list(range(40))
+    assert 1 < in_flight[1] <= 4
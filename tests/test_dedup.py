@@ -0,0 +1,140 @@
+import asyncio
+import itertools
+import os
+import random
+
+os.environ.setdefault("BOT_TOKEN", "123:TEST")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("OUTBOX", "0")
+
+from telegram import Update  # noqa: E402
+
+from bot import main as bot_main  # noqa: E402
+from bot.dedup import Deduplicator, ReplayWindow  # noqa: E402
+from bot.storage import Eviction, SQLiteBackend, StateStore  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram, command_update  # noqa: E402
+from liers.rng import SeededRandomness  # noqa: E402
+
+CHAT = -7373
+PLAYERS = (51, 52, 53)
+
+
+class Model:
+    """То же окно на множестве: эталон для ReplayWindow."""
+
+    def __init__(self, size, restart):
+        self.size, self.restart, self.top, self.seen = size, restart, -1, set()
+
+    def add(self, n):
+        if n > self.top:
+            self.top = n
+        elif self.top - n >= self.size:
+            if not self.restart:
+                return False
+            self.top, self.seen = n, set()
+        elif n in self.seen:
+            return False
+        self.seen = {m for m in self.seen if m > self.top - self.size} | {n}
+        return True
+
+
+def test_window_matches_model():
+    rnd = random.Random(3)
+    for size in (8, 64, 256):
+        for restart in (False, True):
+            w, m = ReplayWindow(size, restart), Model(size, restart)
+            n = 1000
+            for _ in range(5000):
+                n += rnd.choice((0, 1, 1, 2, 7, size - 1, size, 3 * size))
+                x = n - rnd.randrange(2 * size) if rnd.random() < 0.4 else n
+                assert w.add(x) == m.add(x), (size, restart, x)
+            assert ReplayWindow.from_list(w.to_list()).to_list() == w.to_list()
+
+
+def test_restart_is_duplicate_but_edit_is_not(tmp_path):
+    path = str(tmp_path / "state.db")
+
+    def open_seen():
+        store = StateStore(SQLiteBackend(path))
+        return store, store.map("seen", dump=ReplayWindow.to_list, load=ReplayWindow.from_list, spill=False)
+
+    store, seen = open_seen()
+    d = Deduplicator(seen)
+    msg = command_update(10, PLAYERS[0], CHAT, "/accuse")
+    assert d.duplicate(Update.de_json(msg, None)) is None
+    assert d.duplicate(Update.de_json(msg, None)) == "update_id"
+    # правка — новый апдейт с тем же message_id: не повтор, а её повторная доставка — повтор
+    edited = {"update_id": 11, "edited_message": dict(msg["message"], text="/accuse", edit_date=1)}
+    assert d.duplicate(Update.de_json(edited, None)) is None
+    assert d.duplicate(Update.de_json(edited, None)) == "update_id"
+    store.close()
+
+    # после перезапуска окно update_id пустое, а окна чатов загружаются из базы
+    store, seen = open_seen()
+    try:
+        assert CHAT in seen
+        restarted = Deduplicator(seen)
+        assert restarted.duplicate(Update.de_json(msg, None)) == "message"
+        assert restarted.duplicate(Update.de_json(command_update(12, PLAYERS[0], CHAT, "/play 0 K"), None)) is None
+        # простаивающее окно при выгрузке удаляется из базы, а не копится
+        assert seen.evict(Eviction(ttl=-1, max_entries=0, spill=True)) == 1
+        store.flush()
+    finally:
+        store.close()
+    store, seen = open_seen()
+    assert CHAT not in seen
+    store.close()
+
+
+def play(stream_copies):
+    """Одна и та же партия; каждый апдейт доставлен stream_copies() раз, часть — одновременно."""
+    stub = StubTelegram()
+    rnd = random.Random(5)
+    ids = itertools.count(1)
+
+    async def scenario():
+        app = bot_main.build_app(request=StubRequest(stub))
+        await app.initialize()
+
+        async def deliver(uid, text):
+            data = command_update(next(ids), uid, CHAT, text)
+            copies = [app.process_update(Update.de_json(data, app.bot)) for _ in range(stream_copies(rnd))]
+            await asyncio.gather(*copies[:2])  # первые два — вперемешку, как при повторе во время обработки
+            for c in copies[2:]:
+                await c
+
+        try:
+            await deliver(PLAYERS[0], "/newgame")
+            for uid in PLAYERS:
+                await deliver(uid, "/join")
+            bot_main.GAMES[CHAT].rng = SeededRandomness(11)
+            await deliver(PLAYERS[0], "/startgame")
+            gs = bot_main.GAMES[CHAT]
+            for i in range(20):
+                if not gs.started:
+                    break
+                uid = gs.current_player().user_id
+                await deliver(uid, "/accuse" if gs.last_play is not None and i % 2 else f"/play 0 {'KQJ'[i % 3]}")
+            return gs.to_dict()
+        finally:
+            await app.shutdown()
+
+    try:
+        return asyncio.run(scenario()), stub
+    finally:
+        bot_main.GAMES.pop(CHAT, None)
+        bot_main.PLAYER_GAMES.drop(CHAT)
+        bot_main.SEEN.clear()
+
+
+def replies(stub):
+    return [c.params["text"] for c in stub.calls if c.method == "sendMessage" and int(c.params["chat_id"]) == CHAT]
+
+
+def test_duplicated_stream_plays_like_clean_one():
+    clean, clean_stub = play(lambda rnd: 1)
+    duplicated, dup_stub = play(lambda rnd: rnd.choice((2, 3)))
+    assert duplicated == clean
+    assert replies(dup_stub) == replies(clean_stub)
+    assert not any(t.startswith("Нельзя") for t in replies(dup_stub))
+    assert sum("Русская рулетка" in t for t in replies(dup_stub)) >= 1
@@ -0,0 +1,147 @@
+import random
+
+import pytest
+
+from liers.compact import CompactGameState
+from liers.events import MAGIC, Event, EventLog, ReplayError, decode, encode, replay
+from liers.game import GameState
+from liers.lobby import LargeLobbyGameState
+from liers.models import Rank
+from liers.rng import SeededRandomness
+
+CHAT = -100500
+
+
+def play_logged(seed, log, cls=CompactGameState, players=4, max_moves=300):
+    """Сыграть партию случайными ходами; вернуть снимки to_dict после каждого события."""
+    moves = random.Random(seed)
+    gs = cls(chat_id=CHAT)
+    log.journal(CHAT, SeededRandomness(seed)).attach(gs).journal.record("new")
+    snapshots = [gs.to_dict()]
+    for i in range(players):
+        gs.add_player(1000 + i, f"игрок{i}" if i else "")
+        snapshots.append(gs.to_dict())
+    gs.start()
+    snapshots.append(gs.to_dict())
+    for _ in range(max_moves):
+        if not gs.started:
+            break
+        uid = gs.current_player().user_id
+        hand = gs.hands.get(uid)
+        if gs.last_play is not None and (not hand or moves.random() < 0.3):
+            gs.accuse(uid)
+        elif hand:
+            gs.play(uid, moves.randrange(len(hand)), moves.choice([Rank.K, Rank.Q, Rank.J]))
+        else:
+            gs.stop()
+        snapshots.append(gs.to_dict())
+    return snapshots
+
+
+@pytest.mark.parametrize("cls", [GameState, CompactGameState])
+@pytest.mark.parametrize("seed", range(4))
+def test_replay_every_offset(seed, cls):
+    log = EventLog()
+    snapshots = play_logged(seed, log, cls)
+    log.flush()
+    events = log.read(CHAT)
+    assert len(events) == len(snapshots)
+    for k in range(1, len(events) + 1):
+        assert replay(CHAT, events, upto=k, cls=cls).to_dict() == snapshots[k - 1]
+
+
+def test_encoding_roundtrip():
+    events = [
+        Event("new"),
+        Event("join", -5, name="Ёжик 🦔"),
+        Event("join", 2 ** 40, name=""),
+        Event("start", draws=(27, 0, 300, 2 ** 33)),
+        Event("play", 7, 4, Rank.TR, draws=(1,)),
+        Event("accuse", 7),
+        Event("stop"),
+    ]
+    assert decode(MAGIC + encode(events)) == events
+    with pytest.raises(ReplayError):
+        decode(b"junk")
+
+
+def test_file_log_appends_batches(tmp_path):
+    log = EventLog(str(tmp_path))
+    snapshots = play_logged(1, log, max_moves=10)
+    assert log.read(CHAT) == []  # до flush на диске ничего нет
+    log.flush()
+    play_logged(2, log, max_moves=10)  # /newgame в том же чате — журнал дописывается
+    log.flush()
+    events = log.read(CHAT)
+    assert list(log.chats()) == [CHAT]
+    new_at = [i for i, ev in enumerate(events) if ev.kind == "new"]
+    assert len(new_at) == 2
+    assert replay(CHAT, events, upto=new_at[1], cls=CompactGameState).to_dict() == snapshots[-1]
+
+
+def test_replay_rejects_tampered_draws():
+    log = EventLog()
+    play_logged(3, log, max_moves=5)
+    log.flush()
+    events = log.read(CHAT)
+    start = next(i for i, ev in enumerate(events) if ev.kind == "start")
+    events[start] = events[start]._replace(draws=events[start].draws[:-1])
+    with pytest.raises(ReplayError):
+        replay(CHAT, events)
+
+
+def test_replay_takes_engine_from_log():
+    log = EventLog()
+    gs = LargeLobbyGameState(chat_id=CHAT, decks=3)
+    log.journal(CHAT, SeededRandomness(5)).attach(gs).journal.record("new")
+    for uid in range(1, 10):
+        gs.add_player(uid, f"p{uid}")
+    gs.start()
+    gs.play(gs.current_player().user_id, 0, Rank.K)
+    log.flush()
+    events = log.read(CHAT)
+    assert events[0] == Event("new", index=3, name="large")
+    assert replay(CHAT, events).to_dict() == gs.to_dict()
+    with pytest.raises(ReplayError):
+        replay(CHAT, events, cls=GameState)  # не тот движок — не молча другая партия
+    with pytest.raises(ReplayError):
+        replay(CHAT, [Event("new")] + events[1:])  # старый журнал без движка: нужен cls
+    assert replay(CHAT, [Event("new")] + events[1:], cls=LargeLobbyGameState, upto=3).players
+
+
+def test_truncated_tail_is_dropped():
+    events = [Event("new", name="compact"), Event("join", 5, name="Ёжик"), Event("start", draws=(300, 2)),
+              Event("play", 5, 1, Rank.Q, draws=(7,))]
+    buf = bytes(MAGIC + encode(events))
+    ends = {len(MAGIC + encode(events[:k])): k for k in range(len(events) + 1)}
+    complete = 0
+    for cut in range(len(MAGIC), len(buf) + 1):
+        complete = ends.get(cut, complete)
+        assert decode(buf[:cut]) == events[:complete]  # только целые записи
+    bad_kind = MAGIC + encode(events[:2]) + bytes([99])
+    bad_name = MAGIC + encode([Event("join", 5, name="ab")]).replace(b"ab", b"\xff\xfe")
+    for bad in (bad_kind, bad_name):
+        with pytest.raises(ReplayError):
+            decode(bad)
+
+
+def test_append_after_crash_cuts_broken_tail(tmp_path):
+    log = EventLog(str(tmp_path))
+    play_logged(1, log, max_moves=10)
+    log.flush()
+    whole = log.read(CHAT)
+    path = log.path(CHAT)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:  # процесс упал посреди записи последнего события
+        f.write(data[:-2])
+    kept = decode(data[:-2])
+    assert kept == whole[:len(kept)] and len(kept) < len(whole)
+
+    log = EventLog(str(tmp_path))  # перезапуск
+    snapshots = play_logged(2, log, max_moves=10)
+    log.flush()
+    events = log.read(CHAT)
+    assert events[:len(kept)] == kept
+    assert replay(CHAT, events[len(kept):]).to_dict() == snapshots[-1]
+    assert replay(CHAT, events).to_dict() == snapshots[-1]
@@ -0,0 +1,27 @@
+import asyncio
+
+from bot.fanout import fanout
+
+
+def test_fanout_respects_limit_and_tracks_failures():
+    running = 0
+    peak = 0
+    over = []  # превышения лимита (assert внутри задачи fanout поймал бы как ошибку отправки)
+
+    async def send(uid):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        if running > 4:
+            over.append(running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if uid == 3:
+            raise RuntimeError("blocked")
+
+    jobs = [(uid, (lambda u=uid: send(u))) for uid in range(8)]
+    res = asyncio.run(fanout(jobs, limit=4))
+    assert peak == 4 and not over
+    assert sorted(res.delivered) == [0, 1, 2, 4, 5, 6, 7]
+    assert list(res.failed) == [3]
+    assert set(res.latency) == set(range(8))
@@ -0,0 +1,119 @@
+import copy
+import random
+
+import pytest
+
+from liers.compact import CompactGameState
+from liers.events import EventLog, replay
+from liers.game import GameState, TOPICS
+from liers.lobby import LargeLobbyGameState
+from liers.rng import Randomness, SeededRandomness
+from liers.sim import CounterRandomness
+
+ENGINES = [(GameState, 5), (CompactGameState, 4), (LargeLobbyGameState, 9)]
+
+
+def new_game(cls, players, rng):
+    gs = cls(chat_id=1, rng=rng)
+    for uid in range(1, players + 1):
+        gs.add_player(uid, f"p{uid}")
+    gs.start()
+    return gs
+
+
+def random_move(gs, rnd):
+    """Случайный допустимый ход (или join/stop, если ходить некому)."""
+    if not gs.started:
+        gs.add_player(100 + rnd.randrange(50), "late")
+        return
+    uid = gs.current_player().user_id
+    r = rnd.random()
+    if gs.last_play is not None and r < 0.35:
+        gs.accuse(uid)
+    elif gs.hands.get(uid):
+        gs.play(uid, rnd.randrange(len(gs.hands[uid])), rnd.choice(TOPICS))
+    elif r < 0.9 and gs.last_play is not None:
+        gs.accuse(uid)
+    else:
+        gs.stop()
+
+
+def same(a, b):
+    assert a.to_dict() == b.to_dict()
+    assert a.status() == b.status()
+    if isinstance(a, LargeLobbyGameState):
+        assert (a._next, a._prev, a._head, a._seat) == (b._next, b._prev, b._head, b._seat)
+
+
+@pytest.mark.parametrize("cls,players", ENGINES)
+@pytest.mark.parametrize("rng", [SeededRandomness, lambda seed: CounterRandomness(seed, 3)])
+def test_fork_mutate_restore_gives_identical_state(cls, players, rng):
+    rnd = random.Random(players)
+    for seed in range(40):
+        gs = new_game(cls, players, rng(seed))
+        for _ in range(rnd.randrange(12)):
+            random_move(gs, rnd)
+        ref = copy.deepcopy(gs)
+        f = gs.fork()
+        for attempt in range(3):  # одну точку отката можно восстанавливать много раз
+            for _ in range(rnd.randrange(1, 25)):
+                random_move(gs, rnd)
+            gs.restore(f)
+            same(gs, ref)
+        # после отката партия и генератор идут дальше так же, как у нетронутой копии
+        steps = random.Random(seed), random.Random(seed)
+        for _ in range(30):
+            random_move(gs, steps[0])
+            random_move(ref, steps[1])
+            same(gs, ref)
+        assert [gs.rng.randbelow(1000) for _ in range(10)] == [ref.rng.randbelow(1000) for _ in range(10)]
+
+
+def test_restore_survives_rng_refill():
+    gs = new_game(GameState, 3, SeededRandomness(5, words=8))  # буфер кончается за пару ходов
+    ref = copy.deepcopy(gs)
+    f = gs.fork()
+    for _ in range(30):
+        gs.rng.randbelow(7)
+    gs.restore(f)
+    assert [gs.rng.randbelow(1000) for _ in range(40)] == [ref.rng.randbelow(1000) for _ in range(40)]
+
+
+def test_trial_keeps_journal_and_render_cache_honest(tmp_path):
+    log = EventLog(str(tmp_path))
+    gs = log.journal(1, SeededRandomness(9)).attach(GameState(chat_id=1))
+    gs.journal.record("new")
+    for uid in (1, 2, 3):
+        gs.add_player(uid, f"p{uid}")
+    gs.start()
+    before, text = gs.to_dict(), gs.status()
+    with gs.trial():
+        uid = gs.current_player().user_id
+        gs.play(uid, 0, gs.current_topic)
+        gs.accuse(gs.current_player().user_id)
+        assert gs.status() != text
+    assert gs.to_dict() == before and gs.status() == text
+    uid = gs.current_player().user_id
+    gs.play(uid, 1, gs.current_topic)  # настоящий ход после пробы
+    log.flush()
+    assert replay(1, log.read(1)).to_dict() == gs.to_dict()
+
+
+def counting_source():
+    counter = iter(range(1 << 30))
+    return lambda n: b"".join(next(counter).to_bytes(4, "little") for _ in range(n // 4))
+
+
+def test_live_rng_is_never_rewound():
+    gs = new_game(GameState, 3, Randomness(counting_source(), words=8))
+    assert gs.fork().rng is None
+    f = gs.fork()
+    tried = [gs.rng.randbelow(1 << 20) for _ in range(5)]
+    gs.restore(f)
+    assert [gs.rng.randbelow(1 << 20) for _ in range(5)] != tried  # числа пробы уже израсходованы
+
+    state = gs.rng._buf, gs.rng._pos
+    with gs.trial():
+        gs.play(gs.current_player().user_id, 0, TOPICS[0])
+        gs.accuse(gs.current_player().user_id)  # выстрел и новая раздача — из одноразового генератора
+    assert (gs.rng._buf, gs.rng._pos) == state  # проба не брала числа у генератора партии
@@ -0,0 +1,66 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault("BOT_TOKEN", "123:TEST")
+os.environ.setdefault("STATE_BACKEND", "memory")
+
+from telegram.ext import ExtBot  # noqa: E402
+
+from bot import main as bot_main  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram  # noqa: E402
+
+UID = 777
+
+
+def run_with_bot(scenario):
+    stub = StubTelegram()
+
+    async def go():
+        async with ExtBot("123:TEST", request=StubRequest(stub)) as bot:
+            return await scenario(SimpleNamespace(bot=bot), stub)
+    bot_main.LAST_HAND_MSG.pop(UID, None)
+    return asyncio.run(go())
+
+
+def methods(stub):
+    return [c.method for c in stub.calls if c.method != "getMe"]
+
+
+def test_edit_mode_edits_skips_and_falls_back(monkeypatch):
+    monkeypatch.setattr(bot_main, "HAND_DM_MODE", "edit")
+
+    async def scenario(ctx, stub):
+        send = bot_main._send_hand_dm
+        outcomes = [await send(ctx, UID, "K Q J"), await send(ctx, UID, "K Q J"), await send(ctx, UID, "K K")]
+        assert methods(stub) == ["sendMessage", "editMessageText"]
+        first_id = bot_main.LAST_HAND_MSG[UID][0]
+        assert stub.messages[(UID, first_id)] == "K K"
+
+        stub.messages.clear()  # пользователь удалил сообщение
+        outcomes.append(await send(ctx, UID, "Q"))
+        assert methods(stub)[2:] == ["editMessageText", "sendMessage"]
+        assert bot_main.LAST_HAND_MSG[UID][0] != first_id
+        return outcomes
+
+    outcomes = run_with_bot(scenario)
+    assert outcomes == ["sent", "unchanged", "edited", "resent"]
+    assert sum(bot_main.HAND_DM_SAVED[o] for o in outcomes) == 2
+
+
+def test_resend_mode_and_old_messages(monkeypatch):
+    monkeypatch.setattr(bot_main, "HAND_DM_MODE", "resend")
+
+    async def scenario(ctx, stub):
+        send = bot_main._send_hand_dm
+        outcomes = [await send(ctx, UID, "K"), await send(ctx, UID, "K")]
+        assert sorted(methods(stub)) == ["deleteMessage", "sendMessage", "sendMessage"]
+
+        monkeypatch.setattr(bot_main, "HAND_DM_MODE", "edit")
+        mid, text, _ = bot_main.LAST_HAND_MSG[UID]
+        bot_main.LAST_HAND_MSG[UID] = [mid, text, 0.0]  # отправлено слишком давно
+        outcomes.append(await send(ctx, UID, "Q"))
+        assert sorted(methods(stub)[3:]) == ["deleteMessage", "sendMessage"]
+        return outcomes
+
+    assert run_with_bot(scenario) == ["sent", "replaced", "replaced"]
@@ -0,0 +1,35 @@
+from bot.index import PlayerIndex
+from liers.game import GameState
+
+
+def lobby(chat_id, uids):
+    gs = GameState(chat_id=chat_id)
+    for uid in uids:
+        gs.add_player(uid, f"user{uid}")
+    return gs
+
+
+def test_index_follows_membership_changes():
+    idx = PlayerIndex()
+    a, b = lobby(1, [10, 11, 12]), lobby(2, [10, 20])
+    idx.sync(a)
+    idx.sync(b)
+    assert idx.games_of(10) == [1, 2]
+    assert idx.games_of(20) == [2]
+
+    # выбывание через remove_dead
+    a.alive[11] = False
+    a.remove_dead()
+    idx.sync(a)
+    assert idx.games_of(11) == []
+
+    # /stop
+    b.stop()
+    idx.sync(b)
+    assert idx.games_of(10) == [1]
+    assert idx.games_of(20) == []
+
+    # /newgame поверх старой игры
+    idx.sync(GameState(chat_id=1))
+    assert idx.games_of(10) == []
+    assert len(idx) == 0
@@ -0,0 +1,117 @@
+import random
+
+import pytest
+
+from liers.compact import CompactGameState
+from liers.lobby import LargeLobbyGameState
+from liers.rng import SeededRandomness
+
+
+def new_game(cls, n, seed):
+    gs = cls(chat_id=1, rng=SeededRandomness(seed))
+    for i in range(n):
+        gs.add_player(100 + i, f"user{i}")
+    gs.start()
+    return gs
+
+
+def ring(gs):
+    if gs._head is None:
+        return []
+    out, uid = [gs._head], gs._next[gs._head]
+    while uid != gs._head:
+        out.append(uid)
+        uid = gs._next[uid]
+    return out
+
+
+def check(gs):
+    alive = [p.user_id for p in gs.players if gs.alive.get(p.user_id)]
+    r = ring(gs)
+    assert sorted(r) == sorted(alive)
+    if r:  # порядок по кругу — порядок мест
+        k = alive.index(r[0])
+        assert r == alive[k:] + alive[:k]
+    if gs.started:
+        assert gs.alive[gs.current_player().user_id]
+
+
+@pytest.mark.parametrize("n", [7, 20, 100])
+def test_large_game_invariants(n):
+    moves = random.Random(n)
+    gs = new_game(LargeLobbyGameState, n, seed=n)
+    assert len(gs.deck) + n * 5 == gs.decks_needed() * 28 and all(len(h) == 5 for h in gs.hands.values())
+    deaths = 0
+    for _ in range(5000):
+        if not gs.started:
+            break
+        uid = gs.current_player().user_id
+        hand = gs.hands.get(uid)
+        if gs.last_play is not None and (not hand or moves.random() < 0.4):
+            _, _, died = gs.accuse(uid)
+            deaths += died is not None
+            if died is not None:
+                assert gs._name(died) == f"user{died - 100}"
+        elif hand:
+            gs.play(uid, 0, gs.current_topic)
+        else:
+            break
+        check(gs)
+    assert deaths > 0
+    restored = LargeLobbyGameState.from_dict(gs.to_dict())
+    assert restored.to_dict() == gs.to_dict() and ring(restored) == ring(gs)
+
+
+def test_same_as_compact_until_first_death():
+    for seed in range(10):
+        a, b = new_game(CompactGameState, 5, seed), new_game(LargeLobbyGameState, 5, seed)
+        while a.started:
+            uid = a.current_player().user_id
+            if a.last_play is not None:
+                _, _, died = a.accuse(uid)
+                b.accuse(uid)
+                if died is not None:
+                    break
+            elif a.hands.get(uid):
+                a.play(uid, 0, a.current_topic)
+                b.play(uid, 0, b.current_topic)
+            else:
+                break
+            assert {k: v for k, v in b.to_dict().items() if k != "decks"} == a.to_dict()
+
+
+def test_stop_and_rejoin():
+    gs = new_game(LargeLobbyGameState, 30, seed=1)
+    gs.stop()
+    assert ring(gs) == [] and gs._sole_survivor() is None
+    gs.add_player(100, "user0")  # уже сидит — ничего не меняется
+    assert len(gs.players) == 30
+
+
+def test_eliminated_players_are_pruned_like_game_state():
+    gs = new_game(LargeLobbyGameState, 6, seed=3)
+    cur = gs.current_player().user_id
+    dead = [p.user_id for p in gs.players if p.user_id != cur][:2]
+    for uid in dead:
+        gs._kill(uid)
+    assert len(gs.players) == 6  # во время партии места не пересчитываются
+    gs.remove_dead()
+    assert [p.user_id for p in gs.players if p.user_id in dead] == []
+    assert gs.current_player().user_id == cur and gs._seat == {p.user_id: i for i, p in enumerate(gs.players)}
+    check(gs)
+
+    # партия кончилась без remove_dead: новая раздача — без выбывших, как в GameState
+    a, b = new_game(CompactGameState, 4, seed=5), new_game(LargeLobbyGameState, 4, seed=5)
+    for g in (a, b):
+        g._kill(g.players[1].user_id)
+        g.started = False
+        g.add_player(200, "late")
+        g.start()
+    assert [p.user_id for p in b.players] == [p.user_id for p in a.players] == [100, 102, 103, 200]
+    check(b)
+
+    # после /stop никто не выбыл — в новой партии все
+    b.stop()
+    b.start()
+    assert len(b.players) == 4
+    check(b)
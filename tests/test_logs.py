@@ -0,0 +1,91 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+from types import SimpleNamespace
+
+os.environ.setdefault("BOT_TOKEN", "123:TEST")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("OUTBOX", "0")
+
+import pytest  # noqa: E402
+from telegram.error import Forbidden  # noqa: E402
+
+from bot import logs  # noqa: E402
+from bot import main as bot_main  # noqa: E402
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+@pytest.fixture
+def pipeline():
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    out = Collect()
+    p = logs.setup("INFO", "json", "command=3", outputs=[out], force=True)
+    yield p, out
+    p.stop()
+    root.handlers[:] = saved[0]
+    root.setLevel(saved[1])
+
+
+def test_structured_sampled_records(pipeline):
+    p, out = pipeline
+    log = logging.getLogger("liers-bot.test")
+    for i in range(7):
+        log.info("/play", extra={"event": "command", "command": "play", "chat_id": -1, "user_id": i, "latency_ms": 1.5})
+    log.warning("/play", extra={"event": "command", "command": "play", "user_id": 99, "outcome": "error"})
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        log.exception("сломалось")
+    assert p.flush()
+    records = [json.loads(line) for line in out.lines]
+    commands = [r for r in records if r.get("event") == "command"]
+    assert [r["user_id"] for r in commands] == [0, 3, 6, 99]  # каждая 3-я и все предупреждения
+    assert commands[0]["sampled"] == 3 and commands[0]["chat_id"] == -1 and commands[0]["latency_ms"] == 1.5
+    assert "ZeroDivisionError" in records[-1]["exc"]
+    assert p.stats == {"full": 0, "sampled_out.command": 4}
+
+
+def test_enqueue_never_blocks_or_formats():
+    h = logs._Enqueue(queue.Queue(2))
+    log = logging.getLogger("liers-bot.test.full")
+    log.addHandler(h)
+    log.propagate = False
+    try:
+        for i in range(5):
+            try:
+                raise ValueError(i)
+            except ValueError:
+                log.exception("ошибка %s", i)
+    finally:
+        log.removeHandler(h)
+        log.propagate = True
+    assert h.dropped == 3
+    record = h.queue.get_nowait()
+    assert record.msg == "ошибка 0" and record.args is None and record.exc_text is None
+
+
+def test_hand_dm_failure_is_logged(caplog):
+    class BlockedBot:
+        rate_limiter = None
+
+        async def send_message(self, chat_id, text, rate_limit_args=None):
+            raise Forbidden("Forbidden: bot can't initiate conversation with a user")
+
+    bot_main.LAST_HAND_MSG.pop(4242, None)
+    with caplog.at_level(logging.INFO, logger="liers-bot"):
+        asyncio.run(bot_main._show_hand(SimpleNamespace(bot=BlockedBot()), 4242, "K Q", chat_id=-5))
+    failed = [r for r in caplog.records if getattr(r, "event", None) == "hand_dm_failed"]
+    assert len(failed) == 1
+    assert (failed[0].user_id, failed[0].chat_id, failed[0].outcome) == (4242, -5, "Forbidden")
+    assert "initiate conversation" in failed[0].reason
@@ -0,0 +1,88 @@
+import asyncio
+import itertools
+import os
+
+import pytest
+
+os.environ.setdefault("BOT_TOKEN", "123:TEST")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("OUTBOX", "0")
+
+from telegram import Update  # noqa: E402
+
+from bot import main as bot_main  # noqa: E402
+from bot.metrics import Registry, instrument  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram, command_update  # noqa: E402
+from liers import timing  # noqa: E402
+from liers.game import GameState  # noqa: E402
+
+
+def test_text_format():
+    reg = Registry()
+    calls = reg.counter("x_calls_total", "calls", ["method"])
+    hist = reg.histogram("x_seconds", "latency", ["op"], buckets=(0.1, 1.0))
+    reg.collected("x_games", "games", "gauge", lambda: {(): 3})
+    calls.inc("send")
+    calls.inc("send", amount=2)
+    for v in (0.05, 0.5, 5.0):
+        hist.observe(v, "a")
+    text = reg.render()
+    assert '# TYPE x_calls_total counter\nx_calls_total{method="send"} 3' in text
+    assert 'x_seconds_bucket{op="a",le="0.1"} 1' in text
+    assert 'x_seconds_bucket{op="a",le="1.0"} 2' in text
+    assert 'x_seconds_bucket{op="a",le="+Inf"} 3' in text
+    assert 'x_seconds_sum{op="a"} 5.55' in text and 'x_seconds_count{op="a"} 3' in text
+    assert "# TYPE x_games gauge\nx_games 3" in text
+    with pytest.raises(ValueError):
+        reg.counter("x_calls_total", "again")
+
+
+def test_instrument_counts_errors():
+    async def boom(update, context):
+        raise RuntimeError
+
+    wrapped = instrument("boom_test", boom)
+    with pytest.raises(RuntimeError):
+        asyncio.run(wrapped(None, None))
+    from bot.metrics import COMMAND_ERRORS, COMMAND_SECONDS
+    assert COMMAND_ERRORS.values[("boom_test",)] == 1
+    assert sum(COMMAND_SECONDS.values[("boom_test",)][0]) == 1
+
+
+def test_core_timing_hook():
+    seen = []
+    timing.set_observer(lambda name, seconds: seen.append(name))
+    try:
+        gs = GameState(chat_id=1)
+        gs.add_player(1, "a")
+        gs.add_player(2, "b")
+        gs.start()
+        uid = gs.current_player().user_id
+        gs.play(uid, 0, gs.current_topic)
+        gs.accuse(gs.current_player().user_id)
+    finally:
+        timing.set_observer(None)
+    assert seen[:2] == ["start", "play"] and "accuse" in seen
+
+
+def test_handlers_report_metrics():
+    stub = StubTelegram()
+    ids = itertools.count(1)
+
+    async def scenario():
+        app = bot_main.build_app(request=StubRequest(stub))
+        await app.initialize()
+        try:
+            for uid, text in [(1, "/newgame"), (1, "/join"), (2, "/join"), (1, "/startgame")]:
+                await app.process_update(Update.de_json(command_update(next(ids), uid, -77, text), app.bot))
+        finally:
+            await app.shutdown()
+        return bot_main.REGISTRY.render()
+
+    text = asyncio.run(scenario())
+    assert 'liers_command_seconds_count{command="startgame"}' in text
+    assert 'liers_api_calls_total{method="sendMessage",code="200"}' in text
+    assert 'liers_core_seconds_count{op="start"}' in text
+    assert "liers_active_games " in text and "liers_live_players " in text
+    bot_main.GAMES.pop(-77, None)
+    bot_main.PLAYER_GAMES.drop(-77)
@@ -0,0 +1,129 @@
+import asyncio
+import itertools
+import os
+from math import isclose
+
+import pytest
+
+os.environ.setdefault("BOT_TOKEN", "123:TEST")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("OUTBOX", "0")
+
+from telegram import Update  # noqa: E402
+
+from bot import main as bot_main  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram, command_update  # noqa: E402
+from liers import odds  # noqa: E402
+from liers.game import GameState  # noqa: E402
+from liers.models import Rank  # noqa: E402
+from liers.rng import SeededRandomness  # noqa: E402
+
+K, Q, J, TR = Rank.K, Rank.Q, Rank.J, Rank.TR
+
+
+def brute(hand, topic, claimed, h):
+    """Перебор всех рук заявившего по отдельным картам."""
+    pool = []
+    for rank, n in zip((K, Q, J, TR), odds.unseen(hand)):
+        pool += [rank] * n
+    lie = punished = total = 0
+    for idx in itertools.combinations(range(len(pool)), h):
+        ranks = {pool[i] for i in idx}
+        total += 1
+        if claimed in ranks:
+            punished += 1
+        else:
+            lie += 1
+            punished += topic in ranks
+    return lie / total, punished / total
+
+
+def brute_held(hand, claimed, h, full=odds.FULL):
+    """Доля рук заявившего, где есть заявленный ранг, — перебором по картам."""
+    pool = [rank for rank, n in zip((K, Q, J, TR), odds.unseen(hand, full)) for _ in range(n)]
+    hands = list(itertools.combinations(pool, h))
+    return sum(claimed in c for c in hands) / len(hands)
+
+
+@pytest.mark.parametrize("hand,topic,claimed,h", [
+    ([], Q, Q, 5),
+    ([K, Q, J, J, TR], Q, K, 5),
+    ([TR, TR, TR], J, TR, 3),
+    ([K, K, K, K, K], K, Q, 1),
+])
+def test_matches_enumeration(hand, topic, claimed, h):
+    o = odds.odds(hand, topic, claimed, chambers=3, claimer_hand=h)
+    lie, punished = brute(hand, topic, claimed, h)
+    assert isclose(o.lie, lie) and isclose(o.accuser_punished, punished)
+    assert isclose(o.held, brute_held(hand, claimed, h))
+    assert isclose(o.accuser_death, punished / 3)
+    assert isclose(sum(p for _, p in odds.hand_distribution(odds.unseen(hand), h)), 1.0)
+
+
+def test_memoized():
+    odds.odds([K, Q], J, K)
+    before = odds.cache_size()
+    odds.odds([Q, K], J, K)  # тот же состав в другом порядке — то же состояние
+    assert odds.cache_size() == before
+    with pytest.raises(ValueError):
+        odds.unseen([TR] * 5)
+
+
+def test_claimer_hand_size_survives_refill_and_snapshot():
+    gs = GameState(chat_id=1, rng=SeededRandomness(4))
+    for uid in (1, 2, 3):
+        gs.add_player(uid, f"p{uid}")
+    gs.start()
+    uid = gs.current_player().user_id
+    del gs.hands[uid][1:]  # последняя карта: после хода рука доберётся до 5
+    lp = gs.play(uid, 0, gs.current_topic)
+    assert lp.hand_size == 1 and len(gs.hands[uid]) == 5
+    assert GameState.from_dict(gs.to_dict()).last_play == lp
+    old = gs.to_dict()
+    old["last"] = old["last"][:3]  # снимок до появления размера руки
+    assert GameState.from_dict(old).last_play.hand_size == 5
+    text = bot_main._odds_text(gs, gs.current_player().user_id)
+    o = odds.odds([gs._rank(c) for c in gs.hands[gs.current_player().user_id]], gs.current_topic, lp.claimed_rank,
+                  claimer_hand=1)
+    assert f"заявка ложная: {o.lie:.0%}" in text
+
+
+def test_large_lobby_counts_all_decks():
+    hand = [TR] * 5
+    with pytest.raises(ValueError):
+        odds.unseen(hand)  # в одной колоде столько козырей нет
+    assert odds.unseen(hand, full=(16, 16, 16, 8)) == (16, 16, 16, 3)
+    o = odds.odds(hand, Q, TR, full=(16, 16, 16, 8), claimer_hand=3)
+    assert 0 < o.lie < 1
+    assert isclose(o.held, brute_held(hand, TR, 3, full=(16, 16, 16, 8)))
+
+
+def test_odds_command():
+    stub = StubTelegram()
+    ids = itertools.count(1)
+    chat = -6161
+
+    async def scenario():
+        app = bot_main.build_app(request=StubRequest(stub))
+        await app.initialize()
+
+        async def send(uid, chat_id, text):
+            await app.process_update(Update.de_json(command_update(next(ids), uid, chat_id, text), app.bot))
+
+        try:
+            for uid, text in [(51, "/newgame"), (51, "/join"), (52, "/join"), (51, "/startgame")]:
+                await send(uid, chat, text)
+            gs = bot_main.GAMES[chat]
+            first = gs.current_player().user_id
+            await send(first, chat, f"/play 0 {gs.current_topic.value}")
+            accuser = gs.current_player().user_id
+            await send(accuser, accuser, "/odds")
+        finally:
+            await app.shutdown()
+        return stub.calls[-1].params["text"]
+
+    text = asyncio.run(scenario())
+    assert "заявка ложная" in text and "риск погибнуть, если обвините" in text
+    assert "Точно:" in text and "Оценка, если он блефует" in text
+    bot_main.GAMES.pop(chat, None)
+    bot_main.PLAYER_GAMES.drop(chat)
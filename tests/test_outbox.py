@@ -0,0 +1,134 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("BOT_TOKEN", "123:TEST")
+os.environ.setdefault("STATE_BACKEND", "memory")
+
+from telegram.error import RetryAfter  # noqa: E402
+from telegram.ext import ExtBot  # noqa: E402
+
+from bot import main as bot_main  # noqa: E402
+from bot.outbox import OutboxLimiter, Superseded, TokenBucket  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram  # noqa: E402
+
+
+def run(limiter, scenario):
+    async def go():
+        await limiter.initialize()
+        try:
+            return await scenario()
+        finally:
+            await limiter.shutdown()
+    return asyncio.run(go())
+
+
+def test_token_bucket():
+    b = TokenBucket(rate=20 / 60, burst=20, now=0.0)
+    for _ in range(20):
+        assert b.delay(0.0) == 0
+        b.take()
+    assert b.delay(0.0) == pytest.approx(3.0)  # 21-е сообщение в группу — через 3 с
+    assert b.delay(3.0) == 0
+
+
+def test_group_replies_go_before_dms_and_chats_are_throttled():
+    limiter = OutboxLimiter(global_rate=1000, private_rate=20, private_burst=1)
+    sent = []
+
+    async def send(chat_id, at):
+        async def callback():
+            sent.append((chat_id, asyncio.get_running_loop().time() - at))
+        return await limiter.process_request(callback, (), {}, "sendMessage", {"chat_id": chat_id}, None)
+
+    async def scenario():
+        at = asyncio.get_running_loop().time()
+        chats = [5, 5, 5, 6, -1, -2]
+        await asyncio.gather(*(send(c, at) for c in chats))
+
+    run(limiter, scenario)
+    assert [c for c, _ in sent][:2] == [-1, -2]
+    assert [c for c, _ in sent if c > 0][:2] == [5, 6]
+    times = [t for c, t in sent if c == 5]
+    assert times[1] - times[0] >= 0.04 and times[2] - times[1] >= 0.04  # 20/с на личный чат
+    assert limiter.metrics()["max_depth"] == 6 and limiter.stats.sent == 6
+
+
+def test_retry_after_and_supersede():
+    limiter = OutboxLimiter(backoff=0.01, max_retries=1)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise RetryAfter(0)
+        return True
+
+    async def always_flood():
+        raise RetryAfter(0)
+
+    async def scenario():
+        assert await limiter.process_request(flaky, (), {}, "sendMessage", {"chat_id": -1}, None)
+        with pytest.raises(RetryAfter):
+            await limiter.process_request(always_flood, (), {}, "sendMessage", {"chat_id": -1}, None)
+        with pytest.raises(Superseded):
+            await limiter.process_request(flaky, (), {}, "sendMessage", {"chat_id": 7}, {"superseded": lambda: True})
+
+    run(limiter, scenario)
+    assert limiter.stats.retried == 2 and limiter.stats.superseded == 1
+
+
+def test_pending_hand_is_coalesced(monkeypatch):
+    monkeypatch.setattr(bot_main, "HAND_DM_MODE", "edit")
+    uid = 888
+    bot_main.LAST_HAND_MSG.pop(uid, None)
+    stub = StubTelegram()
+
+    async def scenario():
+        limiter = OutboxLimiter(private_rate=20, private_burst=1)
+        async with ExtBot("123:TEST", request=StubRequest(stub), rate_limiter=limiter) as bot:
+            ctx = SimpleNamespace(bot=bot)
+            first = await bot_main._send_hand_dm(ctx, uid, "K")  # израсходовал токен чата
+            # вторая рука ждёт токен в очереди, третья её заменяет
+            second = asyncio.ensure_future(bot_main._send_hand_dm(ctx, uid, "Q"))
+            await asyncio.sleep(0)
+            third = await bot_main._send_hand_dm(ctx, uid, "J")
+            return [first, await second, third]
+
+    assert asyncio.run(scenario()) == ["sent", "coalesced", "edited"]
+    texts = [c.params.get("text") for c in stub.calls if c.method != "getMe"]
+    assert texts == ["K", "J"]
+
+
+def test_long_chat_queue_does_not_hold_other_chats():
+    limiter = OutboxLimiter(global_rate=1000, private_rate=100, private_burst=1)
+    sent = []
+
+    async def send(chat_id, n):
+        async def callback():
+            sent.append((chat_id, n))
+        return await limiter.process_request(callback, (), {}, "sendMessage", {"chat_id": chat_id}, None)
+
+    async def scenario():
+        await asyncio.gather(*(send(5, n) for n in range(30)), send(6, 0))
+
+    run(limiter, scenario)
+    assert sent[:2] == [(5, 0), (6, 0)]  # чат 6 не ждёт, пока разойдутся 30 сообщений чата 5
+    assert [n for c, n in sent if c == 5] == list(range(30))
+    assert limiter.depth == 0 and not limiter._ready and not limiter._sleeping
+
+
+def test_full_buckets_are_forgotten_lazily():
+    limiter = OutboxLimiter(max_buckets=3, private_rate=1, private_burst=1)
+    for chat in (1, 2, 3):
+        limiter._bucket(chat, 0.0).take()  # полными станут к t=1
+    limiter._bucket(4, 0.5)  # все ещё тратятся — забывать нечего
+    assert set(limiter._chats) == {1, 2, 3, 4}
+    limiter._bucket(1, 2.0).delay(2.0)
+    limiter._chats[1].take()  # чат 1 снова отправлял: полным станет к t=3
+    limiter._bucket(5, 2.5)
+    assert set(limiter._chats) == {1, 5}
+    limiter._bucket(6, 4.0)  # ведёр меньше max_buckets — не чистим
+    assert set(limiter._chats) == {1, 5, 6}
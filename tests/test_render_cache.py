@@ -0,0 +1,124 @@
+import asyncio
+import itertools
+import os
+import random
+
+import pytest
+
+os.environ.setdefault("BOT_TOKEN", "123:TEST")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("OUTBOX", "0")
+
+from telegram import Update  # noqa: E402
+
+from bot import main as bot_main  # noqa: E402
+from bot.storage import Eviction  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram, command_update  # noqa: E402
+from liers.compact import CompactGameState  # noqa: E402
+from liers.game import GameState, TOPICS  # noqa: E402
+from liers.lobby import LargeLobbyGameState  # noqa: E402
+from liers.rng import SeededRandomness  # noqa: E402
+
+CHAT = -6262
+
+
+def fresh_render(gs, uid):
+    """То же, что status()/hand_str(), но без кеша."""
+    gs._status = None
+    gs._hand_text.clear()
+    return gs.status(), gs.hand_str(uid)
+
+
+@pytest.mark.parametrize("cls,players", [(GameState, 4), (CompactGameState, 5), (LargeLobbyGameState, 12)])
+def test_cached_render_matches_fresh_render(cls, players):
+    rnd = random.Random(players)
+    for seed in range(30):
+        gs = cls(chat_id=1, rng=SeededRandomness(seed))
+        assert gs.status() == "Лобби пустое. Используйте /join."
+        for uid in range(1, players + 1):
+            gs.add_player(uid, f"p{uid}")
+            assert gs.status().count("@p") == uid  # кеш пустого лобби не отдаётся после join
+        gs.start()
+        for _ in range(200):
+            if not gs.started:
+                break
+            uid = gs.current_player().user_id
+            before = gs.version
+            if gs.last_play is not None and rnd.random() < 0.3:
+                gs.accuse(uid)
+            elif gs.hands.get(uid):
+                gs.play(uid, rnd.randrange(len(gs.hands[uid])), rnd.choice(TOPICS))
+            else:
+                gs.stop()
+            assert gs.version > before
+            view = rnd.choice([p.user_id for p in gs.players] or [uid])
+            cached = gs.status(), gs.hand_str(view)
+            assert gs.status() is cached[0]
+            assert fresh_render(gs, view) == cached
+
+
+def test_failed_move_keeps_cache():
+    gs = GameState(chat_id=1, rng=SeededRandomness(2))
+    for uid in (1, 2, 3):
+        gs.add_player(uid, f"p{uid}")
+    gs.add_player(1, "p1")  # уже в лобби: ничего не меняется
+    gs.start()
+    text, version = gs.status(), gs.version
+    other = next(p.user_id for p in gs.players if p.user_id != gs.current_player().user_id)
+    with pytest.raises(ValueError):
+        gs.play(other, 0, TOPICS[0])
+    with pytest.raises(ValueError):
+        gs.accuse(gs.current_player().user_id)
+    assert gs.version == version and gs.status() is text
+
+
+def test_status_is_not_repeated_while_previous_reply_is_visible():
+    stub = StubTelegram()
+    ids = itertools.count(1)
+
+    async def scenario():
+        app = bot_main.build_app(request=StubRequest(stub))
+        await app.initialize()
+
+        async def cmd(uid, text, message_id=None):
+            data = command_update(next(ids) if message_id is None else message_id, uid, CHAT, text)
+            await app.process_update(Update.de_json(data, app.bot))
+
+        def replies():
+            return sum(1 for c in stub.calls if c.method == "sendMessage" and int(c.params["chat_id"]) == CHAT)
+
+        try:
+            await cmd(71, "/newgame")
+            for uid in (71, 72, 73):
+                await cmd(uid, "/join")
+            bot_main.GAMES[CHAT].rng = SeededRandomness(8)
+            await cmd(71, "/startgame")
+            stub._ids = itertools.count(5000)  # как в Telegram: ответы бота и команды — одна нумерация чата
+            await cmd(71, "/status", 4999)
+            sent = replies()
+            await cmd(72, "/status", 5001)  # прошлый статус прямо над командой — только ссылка на него
+            assert replies() == sent + 1
+            pointer = stub.calls[-1].params
+            assert pointer["text"] != bot_main.GAMES[CHAT].status()
+            assert pointer["reply_parameters"]["message_id"] == 5000
+            gs = bot_main.GAMES[CHAT]
+            await cmd(gs.current_player().user_id, "/play 0 K", 5002)
+            await cmd(71, "/status", 5010)  # игра изменилась
+            assert replies() == sent + 3
+            assert stub.calls[-1].params["text"] == gs.status()
+            await cmd(71, "/status", 5100)  # не изменилась, но прошлый статус далеко вверху
+            assert replies() == sent + 4
+        finally:
+            await app.shutdown()
+
+    try:
+        asyncio.run(scenario())
+        assert bot_main.STATUS_STATS["unchanged"] >= 1
+        assert CHAT in bot_main.STATUS_MSG
+        bot_main.STORE.flush()
+        bot_main.STATUS_MSG.evict(Eviction(ttl=-1, max_entries=0, spill=False))
+        assert CHAT not in bot_main.STATUS_MSG  # выгружается, как и остальное состояние чата
+    finally:
+        bot_main.GAMES.pop(CHAT, None)
+        bot_main.PLAYER_GAMES.drop(CHAT)
+        bot_main.STATUS_MSG.pop(CHAT, None)
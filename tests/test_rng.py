@@ -0,0 +1,70 @@
+import itertools
+from collections import Counter
+
+import pytest
+
+from liers.rng import Randomness, SeededRandomness, SYSTEM_RNG
+
+# Критические значения хи-квадрат для p = 0.001
+CHI2_CRIT = {5: 20.52, 23: 49.73}
+
+
+def chi2(counts, expected):
+    return sum((c - expected) ** 2 / expected for c in counts)
+
+
+def test_seeded_mode_is_reproducible():
+    a, b = SeededRandomness(7), SeededRandomness(7)
+    assert [a.randbelow(28) for _ in range(5000)] == [b.randbelow(28) for _ in range(5000)]
+    assert [SeededRandomness(8).randbelow(28) for _ in range(10)] != [SeededRandomness(7).randbelow(28) for _ in range(10)]
+
+
+@pytest.mark.parametrize("rng", [SeededRandomness(1), Randomness()], ids=["seeded", "system"])
+def test_bounds(rng):
+    for n in (1, 2, 3, 6, 28, 2**32 - 1, 2**32 + 5, 10**30):
+        assert all(0 <= rng.randbelow(n) < n for _ in range(200))
+    with pytest.raises(ValueError):
+        rng.randbelow(0)
+
+
+def test_shuffle_permutations_uniform():
+    rng = SeededRandomness(2024)
+    perms = list(itertools.permutations(range(4)))
+    rounds = 24 * 1000
+    counts = Counter()
+    for _ in range(rounds):
+        deck = [0, 1, 2, 3]
+        rng.shuffle(deck)
+        counts[tuple(deck)] += 1
+    assert set(counts) == set(perms)
+    assert chi2([counts[p] for p in perms], rounds / 24) < CHI2_CRIT[23]
+
+
+def test_roulette_outcomes_uniform():
+    # Барабан 1/6 → 1/5 → … → 1/1: номер смертельного выстрела равномерен на 1..6
+    rng = SeededRandomness(99)
+    rounds = 6 * 5000
+    counts = Counter()
+    for _ in range(rounds):
+        remaining = 6
+        pull = 1
+        while rng.randbelow(remaining) != 0:
+            remaining -= 1
+            pull += 1
+        counts[pull] += 1
+    assert set(counts) == set(range(1, 7))
+    assert chi2([counts[i] for i in range(1, 7)], rounds / 6) < CHI2_CRIT[5]
+
+
+def test_system_rng_serves_from_buffer():
+    calls = []
+
+    def source(n):
+        calls.append(n)
+        return SYSTEM_RNG._source(n)
+
+    rng = Randomness(source, words=256)
+    for _ in range(1000):
+        rng.randbelow(6)
+    # ~1000 чисел из буферов по 256 слов — единицы обращений к ОС, а не тысяча
+    assert len(calls) <= 5
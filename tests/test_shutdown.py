@@ -0,0 +1,216 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+os.environ.setdefault("BOT_TOKEN", "123:TEST")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("OUTBOX", "0")
+
+from telegram import Update  # noqa: E402
+from telegram.ext import CallbackContext  # noqa: E402
+
+from bot import main as bot_main  # noqa: E402
+from bot import snapshot  # noqa: E402
+from bot.outbox import OutboxLimiter  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram, command_update  # noqa: E402
+from liers.rng import SeededRandomness  # noqa: E402
+
+CHAT = -5151
+PLAYERS = (61, 62, 63, 64, 65)
+
+
+def forget_everything():
+    """Как после перезапуска процесса с хранилищем в памяти."""
+    for m in bot_main.STORE.maps:
+        m.clear()
+    bot_main.STORE.flush()
+    bot_main.PLAYER_GAMES.drop(CHAT)
+    bot_main.HAND_PENDING.clear()
+
+
+def test_drain_stops_at_deadline():
+    limiter = OutboxLimiter(global_rate=2)
+
+    async def scenario():
+        await limiter.initialize()
+
+        async def callback():
+            return True
+        sends = [asyncio.ensure_future(limiter.process_request(callback, (), {}, "sendMessage", {"chat_id": c}, None))
+                 for c in range(1, 11)]
+        await asyncio.sleep(0)
+        t0 = time.monotonic()
+        left = await limiter.drain(0.3)
+        spent = time.monotonic() - t0
+        await limiter.shutdown()
+        await asyncio.gather(*sends, return_exceptions=True)
+        return left, spent
+
+    left, spent = asyncio.run(scenario())
+    assert 0 < left < 10
+    assert spent < 0.5
+
+
+def test_shutdown_snapshots_pending_hands_and_restart_resends_them(monkeypatch, tmp_path):
+    path = str(tmp_path / "snap.bin")
+    monkeypatch.setattr(bot_main, "SNAPSHOT_PATH", path)
+    monkeypatch.setattr(bot_main, "SHUTDOWN_DRAIN_TIMEOUT", 0.3)
+    monkeypatch.setattr(bot_main, "OUTBOX", True)
+    monkeypatch.setattr(bot_main, "HAND_DM_CONCURRENCY", 2)
+    stub = StubTelegram()
+
+    async def before_stop():
+        app = bot_main.build_app(request=StubRequest(stub))
+        await app.initialize()
+        ids = iter(range(1, 100))
+
+        async def cmd(uid, text):
+            await app.process_update(Update.de_json(command_update(next(ids), uid, CHAT, text), app.bot))
+
+        await cmd(PLAYERS[0], "/newgame")
+        for uid in PLAYERS:
+            await cmd(uid, "/join")
+        bot_main.GAMES[CHAT].rng = SeededRandomness(4)
+        stub.latency = 0.25  # руки пяти игроков по две за раз не успевают уйти
+        start = asyncio.ensure_future(cmd(PLAYERS[0], "/startgame"))
+        await asyncio.sleep(0.4)
+        t0 = time.monotonic()
+        await bot_main._post_stop(app)
+        spent = time.monotonic() - t0
+        start.cancel()
+        await app.shutdown()
+        await asyncio.gather(start, return_exceptions=True)
+        return spent
+
+    try:
+        spent = asyncio.run(before_stop())
+        assert spent < 0.3 + 0.2
+        delivered = {uid for uid in PLAYERS if uid in bot_main.LAST_HAND_MSG}
+        snap = snapshot.load(path)
+        pending = {uid for chat, uid in snap.pending_hands}
+        assert pending and delivered and pending == set(PLAYERS) - delivered
+        saved = bot_main.GAMES[CHAT].to_dict()
+
+        forget_everything()
+        monkeypatch.setattr(bot_main, "OUTBOX", False)
+        stub = StubTelegram()
+        asyncio.run(restart(stub))
+        assert bot_main.GAMES[CHAT].to_dict() == saved
+        assert bot_main.PLAYER_GAMES.games_of(PLAYERS[0]) == [CHAT]
+        resent = {int(c.params["chat_id"]): c.params["text"] for c in stub.calls if c.method == "sendMessage"}
+        assert set(resent) == pending
+        gs = bot_main.GAMES[CHAT]
+        assert all(t.endswith(gs.hand_str(uid)) for uid, t in resent.items())
+        assert not bot_main.HAND_PENDING
+        assert not os.path.exists(path)
+    finally:
+        forget_everything()
+
+
+async def restart(stub):
+    """Новый процесс: post_init загружает снимок и досылает руки."""
+    app = bot_main.build_app(request=StubRequest(stub))
+    await app.initialize()
+    try:
+        await bot_main._post_init(app)
+        await bot_main._RESEND
+    finally:
+        bot_main._EVICTOR.cancel()
+        await app.shutdown()
+
+
+def test_restore_of_many_games_is_fast(monkeypatch, tmp_path):
+    path = str(tmp_path / "snap.bin")
+    monkeypatch.setattr(bot_main, "SNAPSHOT_PATH", path)
+    for i in range(2000):
+        gs = bot_main._new_game(-10_000 - i)
+        gs.rng = SeededRandomness(i)
+        for uid in range(1, 5):
+            gs.add_player(i * 10 + uid, f"p{uid}")
+        gs.start()
+        bot_main.GAMES[gs.chat_id] = gs
+    saved = {k: bot_main.GAMES[k].to_dict() for k in (-10_000, -11_999)}
+    try:
+        t0 = time.perf_counter()
+        bot_main._save_snapshot()
+        save_s = time.perf_counter() - t0
+        size = os.path.getsize(path)
+        forget_everything()
+        t0 = time.perf_counter()
+        assert bot_main._restore_snapshot() == []
+        restore_s = time.perf_counter() - t0
+        assert len(bot_main.GAMES) == 2000
+        assert not any(m.pending_rows() for m in bot_main.STORE.maps)  # записаны до удаления снимка
+        assert {k: bot_main.GAMES[k].to_dict() for k in saved} == saved
+        assert size < 2000 * 400  # сжатый JSON: меньше 400 байт на игру с четырьмя руками
+        assert save_s < 2 and restore_s < 3, (save_s, restore_s)
+    finally:
+        forget_everything()
+
+
+def test_broken_snapshot_is_skipped(monkeypatch, tmp_path):
+    path = tmp_path / "snap.bin"
+    path.write_bytes(b"LSN1 not zlib")
+    monkeypatch.setattr(bot_main, "SNAPSHOT_PATH", str(path))
+    assert bot_main._restore_snapshot() == []
+    with pytest.raises(ValueError):
+        snapshot.load(str(path))
+
+
+def test_resend_waits_for_the_chat_lock():
+    stub = StubTelegram()
+    gs = bot_main._new_game(CHAT)
+    gs.rng = SeededRandomness(6)
+    for uid in PLAYERS[:3]:
+        gs.add_player(uid, f"p{uid}")
+    gs.start()
+    bot_main.GAMES[CHAT] = gs
+
+    async def scenario():
+        app = bot_main.build_app(request=StubRequest(stub))
+        await app.initialize()
+        try:
+            sent = lambda: [c for c in stub.calls if c.method == "sendMessage"]  # noqa: E731
+            async with app.update_processor.locks.hold(CHAT):  # как будто идёт команда этого чата
+                resend = asyncio.ensure_future(
+                    bot_main._resend_hands(CallbackContext(app), [(CHAT, uid) for uid in PLAYERS[:3]]))
+                await asyncio.sleep(0.05)
+                assert not sent()
+            await resend
+            return {int(c.params["chat_id"]): c.params["text"] for c in sent()}
+        finally:
+            await app.shutdown()
+
+    try:
+        resent = asyncio.run(scenario())
+        assert set(resent) == set(PLAYERS[:3])
+        assert all(t.endswith(gs.hand_str(uid)) for uid, t in resent.items())
+    finally:
+        forget_everything()
+
+
+def test_stop_drains_spectator_feeds(monkeypatch, tmp_path):
+    monkeypatch.setattr(bot_main, "SNAPSHOT_PATH", str(tmp_path / "snap.bin"))
+    monkeypatch.setattr(bot_main.SPECTATORS, "window", 60)  # без остановки строка ждала бы минуту
+    stub = StubTelegram()
+    viewer = 77
+
+    async def scenario():
+        app = bot_main.build_app(request=StubRequest(stub))
+        await app.initialize()
+        try:
+            bot_main.SPECTATORS.watch(CHAT, viewer)
+            bot_main.SPECTATORS.publish(app.bot, CHAT, "@p положил карту")
+            await bot_main._post_stop(app)
+        finally:
+            bot_main.SPECTATORS.unwatch(CHAT, viewer)
+            await app.shutdown()
+
+    try:
+        asyncio.run(scenario())
+        sent = [c.params["text"] for c in stub.calls if c.method == "sendMessage" and int(c.params["chat_id"]) == viewer]
+        assert sent and "положил карту" in sent[0]
+    finally:
+        forget_everything()
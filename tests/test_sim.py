@@ -0,0 +1,41 @@
+import pytest
+
+from liers.sim import AccuseWithProbability, AlwaysBluff, AlwaysHonest, simulate
+
+MIXES = [
+    [AlwaysHonest()],
+    [AlwaysBluff(), AccuseWithProbability(0.5)],
+    [AccuseWithProbability(0.2, AlwaysBluff()), AlwaysHonest(), AccuseWithProbability(0.8)],
+]
+
+
+@pytest.mark.parametrize("players,lobby", [
+    (2, False), (3, False), (4, False), (5, False),
+    (3, True), (6, True), (12, True),  # 12 игроков — три колоды
+])
+@pytest.mark.parametrize("mix", range(len(MIXES)))
+def test_fast_path_matches_gamestate(players, lobby, mix):
+    pytest.importorskip("numpy")
+    kw = dict(players=players, policies=MIXES[mix], seed=players * 10 + mix, keep_records=True, lobby=lobby)
+    ref = simulate(150, engine="reference", **kw)
+    fast = simulate(150, engine="fast", batch=64, **kw)
+    assert fast.records == ref.records
+    assert fast.wins == ref.wins
+    assert fast.lengths == ref.lengths
+
+
+def test_reference_stats_are_consistent():
+    res = simulate(60, players=3, policies=[AccuseWithProbability(0.5)], engine="reference", seed=1)
+    assert res.games == 60
+    assert sum(res.wins) + res.stalled + res.unfinished == 60
+    assert 0 < res.deaths <= res.accusations
+    # результат не зависит от нарезки на пакеты
+    again = simulate(60, players=3, policies=[AccuseWithProbability(0.5)], engine="reference", seed=1, batch=7)
+    assert again.wins == res.wins and again.lengths == res.lengths
+
+
+def test_player_limits():
+    with pytest.raises(ValueError):
+        simulate(1, players=6)  # в одну колоду шестому руки не хватит
+    res = simulate(5, players=40, lobby=True, engine="reference", seed=2)
+    assert res.games == 5 and sum(res.wins) + res.stalled + res.unfinished == 5
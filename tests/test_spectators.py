@@ -0,0 +1,159 @@
+import asyncio
+import itertools
+import os
+
+os.environ.setdefault("BOT_TOKEN", "123:TEST")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("OUTBOX", "0")
+
+from telegram import Update  # noqa: E402
+from telegram.error import Forbidden  # noqa: E402
+
+from bot import main as bot_main  # noqa: E402
+from bot.spectators import Broadcaster  # noqa: E402
+from bot.stub_api import StubRequest, StubTelegram, command_update  # noqa: E402
+
+
+class FakeBot:
+    rate_limiter = None
+
+    def __init__(self, blocked=()):
+        self.sent = []
+        self.blocked = set(blocked)
+
+    async def send_message(self, chat_id, text, rate_limit_args=None):
+        if chat_id in self.blocked:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        self.sent.append((chat_id, text))
+
+
+def test_batches_dedups_and_shares():
+    bot = FakeBot()
+    b = Broadcaster(window=0, interval=0)
+
+    async def scenario():
+        b.publish(bot, -1, "до подписки")  # без зрителей ничего не копится
+        for uid in range(10):
+            b.watch(-1, uid)
+        b.watch(-2, 0)
+        for line in ("ход 1", "ход 1", "ход 2"):
+            b.publish(bot, -1, line)
+        b.publish(bot, -2, "другая игра")
+        await b.flush()
+
+    asyncio.run(scenario())
+    assert len(bot.sent) == 10  # одно сообщение на зрителя, обе игры — вместе
+    text = dict(bot.sent)[0]
+    assert "ход 1\nход 2" in text and "другая игра" in text and "до подписки" not in text
+    assert dict(bot.sent)[5] == "👀 Группа -1\nход 1\nход 2"
+    assert b.stats["duplicate"] == 1 and b.stats["shared"] == 8
+
+
+def test_rate_limit_accumulates_and_truncates():
+    now = [0.0]
+    bot = FakeBot()
+    b = Broadcaster(window=0, interval=10, max_lines=3, clock=lambda: now[0])
+
+    async def scenario():
+        b.watch(-1, 7)
+        b.publish(bot, -1, "ход 0")
+        await asyncio.sleep(0)
+        b.pump()
+        await asyncio.sleep(0)
+        for i in range(1, 6):
+            b.publish(bot, -1, f"ход {i}")
+            b.pump()
+        assert len(bot.sent) == 1  # чаще interval зрителю не пишем
+        now[0] = 10
+        b.pump()
+        await b.flush()
+
+    asyncio.run(scenario())
+    assert [t for _, t in bot.sent] == ["👀 Группа -1\nход 0", "👀 Группа -1 (пропущено событий: 2)\nход 3\nход 4\nход 5"]
+
+
+def test_blocked_spectator_is_unsubscribed():
+    bot = FakeBot(blocked={2})
+    b = Broadcaster(window=0, interval=0)
+
+    async def scenario():
+        b.watch(-1, 1)
+        b.watch(-1, 2)
+        b.publish(bot, -1, "ход")
+        await b.flush()
+
+    asyncio.run(scenario())
+    assert bot.sent == [(1, "👀 Группа -1\nход")]
+    assert b.watchers(-1) == 1 and b.watching(2) == [] and b.stats["blocked"] == 1
+
+
+def test_finished_game_is_closed_after_last_lines():
+    now = [0.0]
+    bot = FakeBot()
+    b = Broadcaster(window=0, interval=10, clock=lambda: now[0])
+
+    async def scenario():
+        for chat_id, uid in ((-1, 1), (-2, 1), (-1, 2)):
+            b.watch(chat_id, uid)
+        b.publish(bot, -1, "ход")
+        b.pump()
+        await asyncio.sleep(0)
+        b.publish(bot, -1, "победитель")
+        b.close(-1)
+        b.pump()
+        assert b.watchers(-1) == 2  # последняя строка ещё ждёт interval — подписки живы
+        now[0] = 10
+        await b.drain()
+
+    asyncio.run(scenario())
+    assert [t for uid, t in bot.sent if uid == 2] == ["👀 Группа -1\nход", "👀 Группа -1\nпобедитель"]
+    assert b.watchers(-1) == 0 and b.watching(1) == [-2] and b.watching(2) == []
+    assert -1 not in b._feeds and not b._closing
+    b.close(-2)  # всё доставлено — удаляется сразу, без прохода
+    assert b.watching(1) == [] and not b._feeds and not b._cursors
+
+
+def test_evicted_game_drops_its_feed(monkeypatch):
+    spectators = Broadcaster(window=0, interval=0)
+    monkeypatch.setattr(bot_main, "SPECTATORS", spectators)
+    spectators.watch(-7272, 5)
+    bot_main._game_evicted(-7272, bot_main.GameState(chat_id=-7272), spilled=True)
+    assert spectators.watchers(-7272) == 0 and spectators.watching(5) == []
+
+
+def test_watch_feed_has_no_hands(monkeypatch):
+    chat, players, fan = -5151, (41, 42), 99
+    spectators = Broadcaster(window=0, interval=0)
+    monkeypatch.setattr(bot_main, "SPECTATORS", spectators)
+    stub = StubTelegram()
+    ids = itertools.count(1)
+
+    async def scenario():
+        app = bot_main.build_app(request=StubRequest(stub))
+        await app.initialize()
+
+        async def send(uid, text):
+            await app.process_update(Update.de_json(command_update(next(ids), uid, chat, text), app.bot))
+
+        try:
+            await send(fan, "/watch")
+            await send(fan, "/watch")
+            await send(players[0], "/newgame")
+            for uid in players:
+                await send(uid, "/join")
+            await send(players[0], "/startgame")
+            gs = bot_main.GAMES[chat]
+            await send(gs.current_player().user_id, "/play 0 K")
+            await send(gs.current_player().user_id, "/accuse")
+            await spectators.flush()
+        finally:
+            await app.shutdown()
+        return gs.started
+
+    going = asyncio.run(scenario())
+    bot_main.GAMES.pop(chat, None)
+    bot_main.PLAYER_GAMES.drop(chat)
+    feed = "\n".join(c.params["text"] for c in stub.calls if c.method == "sendMessage" and int(c.params["chat_id"]) == fan)
+    assert "Игра началась" in feed and "заявил K" in feed and "Русская рулетка" in feed
+    assert "Ваша рука" not in feed and "карт в руке" not in feed
+    assert spectators.watchers(chat) == (1 if going else 0)  # кончилась игра — кончилась и подписка
@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+
+from liers.game import GameState
+from bot.concurrency import KeyedLocks
+from bot.storage import Eviction, MemoryBackend, SQLiteBackend, StateBackend, StateStore
+
+
+def make_game(chat_id, n=3):
+    gs = GameState(chat_id=chat_id)
+    for i in range(n):
+        gs.add_player(100 + i, f"user{i}")
+    gs.start()
+    return gs
+
+
+def open_games(path):
+    store = StateStore(SQLiteBackend(str(path)))
+    games = store.map(
+        "game", dump=GameState.to_dict, load=GameState.from_dict, is_active=lambda g: g.started,
+        meta=lambda g: [p.user_id for p in g.players],
+    )
+    return store, games
+
+
+def test_game_roundtrip():
+    gs = make_game(1)
+    gs.play(gs.current_player().user_id, 0, gs.current_topic)
+    restored = GameState.from_dict(gs.to_dict())
+    assert restored == gs
+    assert restored.status() == gs.status()
+
+
+def test_sqlite_restores_active_games_lazily(tmp_path):
+    db = tmp_path / "state.db"
+    store, games = open_games(db)
+    games[1] = make_game(1)
+    games[2] = make_game(2)
+    games[3] = make_game(3)
+    games[3].stop()
+    assert store.flush() == 3
+    # без изменений — повторная запись не нужна
+    games.get(1)
+    assert store.flush() == 0
+    store.close()
+
+    store, games = open_games(db)
+    assert sorted(games) == [1, 2]  # остановленная игра не восстанавливается
+    assert games.loaded == 0
+    assert games.stored_meta()[2] == [100, 101, 102]
+    assert games[2].started and len(games[2].players) == 3
+    assert games.loaded == 1
+    store.close()
+
+
+def test_snapshot_restore_skips_finished_games(tmp_path):
+    store, games = open_games(tmp_path / "state.db")
+    live, done = make_game(1), make_game(2)
+    done.stop()
+    entries = {1: live.to_dict(), 2: done.to_dict()}
+    assert games.restore(entries) == 1
+    assert sorted(games) == [1]  # оконченную игру снимок не воскрешает
+    store.close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_eviction_ttl_lru_and_spill(tmp_path):
+    clock = FakeClock()
+    evicted = []
+    store = StateStore(SQLiteBackend(str(tmp_path / "state.db")))
+    games = store.map(
+        "game", dump=GameState.to_dict, load=GameState.from_dict, is_active=lambda g: g.started,
+        meta=lambda g: [p.user_id for p in g.players], clock=clock,
+        on_evict=lambda key, g, spilled: evicted.append((key, spilled)),
+    )
+    created = {}
+    for cid in range(1, 6):
+        games[cid] = created[cid] = make_game(cid)
+        clock.now += 1
+    games[2].stop()
+    games[1]  # 1 снова самая свежая; LRU-порядок: 3, 4, 5, 2, 1
+
+    policy = Eviction(ttl=100, max_entries=3, spill=True)
+    assert store.evict(policy) == 2
+    assert evicted == [(3, True), (4, True)]
+    assert games.loaded == 3 and 3 in games and games.stored_meta()[3] == [100, 101, 102]
+
+    clock.now += 200  # все простаивают дольше ttl
+    assert store.evict(policy) == 3
+    assert sorted(evicted[2:]) == [(1, True), (2, False), (5, True)]  # остановленная удаляется
+    assert games.evicted == {"spilled": 4, "dropped": 1}
+    assert games.loaded == 0 and sorted(games) == [1, 3, 4, 5]
+
+    # выгруженная игра загружается обратно с тем же состоянием
+    assert games[4].to_dict() == created[4].to_dict()
+    store.close()
+    _, games = open_games(tmp_path / "state.db")
+    assert sorted(games) == [1, 3, 4, 5]
+
+
+def test_eviction_without_spill_forgets():
+    clock = FakeClock()
+    store = StateStore(MemoryBackend())
+    msgs = store.map("hand_msg", mutable=False, clock=clock)
+    msgs[1] = 10
+    clock.now = 50
+    msgs[2] = 20
+    assert store.evict(Eviction(ttl=30, max_entries=100, spill=False)) == 1
+    assert dict(msgs) == {2: 20}
+    assert ("hand_msg", 1) not in store.backend.rows
+
+
+def test_eviction_skips_chats_with_handler_in_flight():
+    clock = FakeClock()
+    store = StateStore(MemoryBackend())
+    games = store.map("game", dump=GameState.to_dict, load=GameState.from_dict, is_active=lambda g: g.started, clock=clock)
+    for chat_id in (1, 2, 3):
+        games[chat_id] = make_game(chat_id)
+    clock.now = 100
+    locks = KeyedLocks()
+
+    async def scenario():
+        async with locks.hold(2):  # обработчик чата 2 ждёт сеть посреди хода
+            assert store.evict(Eviction(ttl=30, max_entries=0), locks) == 2
+            assert games.loaded == 1 and games.resident()[0].chat_id == 2
+        assert 2 not in locks
+        assert store.evict(Eviction(ttl=30, max_entries=0), locks) == 1
+
+    asyncio.run(scenario())
+    assert games.loaded == 0 and sorted(games) == [1, 2, 3]
+
+
+def test_deferred_map_is_written_with_other_changes():
+    store = StateStore(MemoryBackend())
+    games = store.map("game", mutable=False)
+    seen = store.map("seen", mutable=False, deferred=True)
+    seen[1] = "a"
+    assert store.flush(defer=True) == 0 and ("seen", 1) not in store.backend.rows
+    games[1] = "g"
+    seen[2] = "b"
+    assert store.flush(defer=True) == 3  # одной пачкой с игрой
+    seen[1] = "c"
+    assert store.flush(defer=True) == 0
+    assert store.flush() == 1 and store.backend.rows[("seen", 1)][1] == '"c"'
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        StateBackend()
+
+    class NoWrite(StateBackend):
+        def active_keys(self, kind):
+            return {}
+
+        def load(self, kind, key):
+            return None
+
+    with pytest.raises(TypeError):
+        NoWrite()